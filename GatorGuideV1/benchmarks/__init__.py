@@ -0,0 +1 @@
+"""Load-test and replay tooling for the advisor API (see benchmarks/loadtest.py)."""
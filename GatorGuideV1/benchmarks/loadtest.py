@@ -0,0 +1,420 @@
+"""
+Load test for the advisor API against local upstream stubs.
+
+Starts the stubs from benchmarks/stubs.py, points the OpenAI clients and tools at
+them through the environment, serves model/api.py with uvicorn in a background
+thread, and drives it over real HTTP with a concurrency ramp. Each step reports
+throughput, client-side latency percentiles, and per-stage / per-tool latency taken
+from the server's own /metrics histograms, as JSON that can be diffed between
+commits with --compare.
+
+Example:
+    python -m benchmarks.loadtest --ramp 1,8,32 --requests 100 --out bench.json
+    python -m benchmarks.loadtest --compare baseline.json bench.json
+
+Pass --url to drive an already running server (started against `python -m
+benchmarks.stubs`) instead; caches are then not cleared between steps.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.stubs import Stubs, add_stub_arguments, config_from_args
+
+DEFAULT_QUERIES = [
+    "Show me colleges in Washington",
+    "Affordable universities in Texas",
+    "Selective schools in California with low acceptance rates",
+    "Colleges in Oregon",
+    "What are good schools in Florida?",
+    "Universities in New York with in-state tuition under $20k",
+    "Tell me about MIT",
+    "How hard is it to get into UCLA?",
+    "Compare Stanford and UC Berkeley",
+    "Colleges in Colorado near the mountains",
+    "Small colleges in Vermont",
+    "Public universities in Michigan",
+    "How do I write a strong college essay?",
+    "What should I look for when choosing a college?",
+]
+
+# Histograms broken down per step, keyed by their label name
+BREAKDOWNS = {
+    "stages": ("gatorguide_stage_duration_seconds", "stage"),
+    "tools": ("gatorguide_tool_duration_seconds", "tool"),
+    "admission_wait": ("gatorguide_admission_wait_seconds", "priority"),
+}
+
+_SAMPLE_RE = re.compile(r"^(\w+?)(_bucket|_sum|_count)\{(.*)\} (\S+)$")
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of raw samples (q in 0-100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def parse_histograms(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Dict[str, Any]]:
+    """
+    Read histogram series from Prometheus text exposition.
+
+    Returns:
+        Dict: (metric name, labels without "le") -> {"buckets": [(le, cumulative)], "sum", "count"}
+    """
+    series: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Dict[str, Any]] = {}
+    for line in text.splitlines():
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        name, suffix, raw_labels, value = match.groups()
+        labels = dict(_LABEL_RE.findall(raw_labels))
+        le = labels.pop("le", None)
+        entry = series.setdefault((name, tuple(sorted(labels.items()))), {"buckets": [], "sum": 0.0, "count": 0})
+        if suffix == "_bucket":
+            entry["buckets"].append((float(le), float(value)))
+        elif suffix == "_sum":
+            entry["sum"] = float(value)
+        else:
+            entry["count"] = float(value)
+    return series
+
+
+def histogram_quantile(q: float, buckets: List[Tuple[float, float]]) -> Optional[float]:
+    """Estimate a quantile from cumulative buckets, interpolating linearly like Prometheus."""
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+    rank = q * buckets[-1][1]
+    lower, below = 0.0, 0.0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if math.isinf(bound):
+                return lower
+            if cumulative == below:
+                return bound
+            return lower + (bound - lower) * (rank - below) / (cumulative - below)
+        lower, below = bound, cumulative
+    return lower
+
+
+def histogram_delta(before: Dict, after: Dict, metric: str, label: str) -> Dict[str, Dict[str, Any]]:
+    """Per-label count, mean and estimated p50/p95/p99 for observations made between two scrapes."""
+    breakdown = {}
+    for (name, labels), entry in after.items():
+        if name != metric:
+            continue
+        previous = before.get((name, labels), {"buckets": [], "sum": 0.0, "count": 0})
+        earlier = dict(previous["buckets"])
+        buckets = [(le, cumulative - earlier.get(le, 0)) for le, cumulative in entry["buckets"]]
+        count = entry["count"] - previous["count"]
+        if count <= 0:
+            continue
+        breakdown[dict(labels).get(label, "")] = {
+            "count": int(count),
+            "mean_s": round((entry["sum"] - previous["sum"]) / count, 6),
+            "p50_s": _round(histogram_quantile(0.50, buckets)),
+            "p95_s": _round(histogram_quantile(0.95, buckets)),
+            "p99_s": _round(histogram_quantile(0.99, buckets)),
+        }
+    return dict(sorted(breakdown.items()))
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
+
+
+def serve_in_thread(host: str = "127.0.0.1") -> Tuple[Any, str]:
+    """Run model.api:app with uvicorn on an ephemeral port in a daemon thread."""
+    import socket
+
+    import uvicorn
+
+    from model.api import app
+
+    sock = socket.socket()
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("API server did not start")
+        time.sleep(0.05)
+    return server, f"http://{host}:{port}"
+
+
+def clear_caches() -> None:
+    """Start a step cold: drop cached Scorecard, weather and advisor responses, and breaker state."""
+    from model.agent import resilience
+    from model.agent.semantic_cache import response_cache
+    from model.agent.tools import scorecard_cache, weather_cache
+
+    scorecard_cache.clear()
+    weather_cache.clear()
+    response_cache.clear()
+    resilience.reset()
+
+
+async def run_step(
+    client: Any,
+    endpoint: str,
+    queries: List[str],
+    concurrency: int,
+    requests: int,
+    offset: int,
+    priority: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Send `requests` requests with `concurrency` in flight and summarize them."""
+    import httpx
+
+    latencies: List[float] = []
+    first_bytes: List[float] = []
+    tokens: List[int] = []
+    prompt_tokens = cached_tokens = llm_calls = 0
+    errors: Dict[str, int] = {}
+    pending = iter(range(requests))
+    headers = {"X-Priority": priority} if priority else {}
+
+    async def worker() -> None:
+        nonlocal prompt_tokens, cached_tokens, llm_calls
+        for n in pending:
+            query = queries[(offset + n) % len(queries)]
+            started = time.perf_counter()
+            try:
+                async with client.stream("POST", endpoint, json={"student_input": query}, headers=headers) as response:
+                    body = b""
+                    async for chunk in response.aiter_bytes():
+                        if not body:
+                            first_bytes.append(time.perf_counter() - started)
+                        body += chunk
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                    continue
+                usage = _response_usage(endpoint, body)
+                if usage:
+                    tokens.append(usage.get("total_tokens", 0))
+                    prompt_tokens += usage.get("prompt_tokens", 0)
+                    cached_tokens += usage.get("cached_tokens", 0)
+                    llm_calls += sum(stage.get("calls", 0) for stage in (usage.get("stages") or {}).values())
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ok = len(latencies) - sum(v for k, v in errors.items() if k.isdigit())
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": ok,
+        "errors": errors,
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(ok / elapsed, 3) if elapsed else None,
+        "latency_s": {
+            "mean": _round(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": _round(percentile(latencies, 50)),
+            "p95": _round(percentile(latencies, 95)),
+            "p99": _round(percentile(latencies, 99)),
+            "max": _round(max(latencies)) if latencies else None,
+        },
+        "first_byte_s": {
+            "p50": _round(percentile(first_bytes, 50)),
+            "p95": _round(percentile(first_bytes, 95)),
+        },
+        "tokens_per_request": round(sum(tokens) / len(tokens), 1) if tokens else None,
+        "prompt_tokens_per_request": round(prompt_tokens / len(tokens), 1) if tokens else None,
+        "llm_calls_per_request": round(llm_calls / len(tokens), 2) if tokens else None,
+        # Share of prompt tokens served from the provider's prefix cache
+        "cached_prompt_share": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else None,
+    }
+
+
+def _response_usage(endpoint: str, body: bytes) -> Optional[Dict[str, Any]]:
+    text = body.decode(errors="replace")
+    if endpoint.endswith("/stream"):
+        # The "done" event carries the same payload as /advisor
+        done = text.rsplit("event: done\ndata: ", 1)
+        text = done[1].split("\n", 1)[0] if len(done) == 2 else "{}"
+    try:
+        return json.loads(text).get("usage")
+    except ValueError:
+        return None
+
+
+async def run_ramp(args: argparse.Namespace, base_url: str, queries: List[str], stubs: Optional[Stubs]) -> List[Dict]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(args.ramp) + 8, max_keepalive_connections=max(args.ramp) + 8)
+    timeout = httpx.Timeout(args.timeout)
+    steps = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        offset = 0
+        for concurrency in args.ramp:
+            if stubs is not None and not args.warm:
+                clear_caches()
+            if args.warmup:
+                await run_step(client, args.endpoint, queries, concurrency, args.warmup, offset, args.priority)
+            before = parse_histograms((await client.get("/metrics")).text)
+            calls_before = stubs.calls() if stubs else {}
+            step = await run_step(client, args.endpoint, queries, concurrency, args.requests, offset, args.priority)
+            after = parse_histograms((await client.get("/metrics")).text)
+            for key, (metric, label) in BREAKDOWNS.items():
+                step[key] = histogram_delta(before, after, metric, label)
+            if stubs is not None:
+                step["upstream_calls"] = {
+                    name: count - calls_before.get(name, 0) for name, count in stubs.calls().items()
+                }
+            steps.append(step)
+            offset += args.requests
+            latency = step["latency_s"]
+            print(
+                f"c={concurrency:<4} {step['throughput_rps']} req/s  p50={latency['p50']}s  "
+                f"p95={latency['p95']}s  p99={latency['p99']}s  errors={sum(step['errors'].values())}",
+                file=sys.stderr,
+            )
+    return steps
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> int:
+    """
+    Print throughput and latency changes per concurrency step.
+
+    Returns:
+        int: 1 if any step's p95 latency grew by more than `threshold` (a fraction), else 0
+    """
+    with open(baseline_path) as f:
+        baseline = {step["concurrency"]: step for step in json.load(f)["steps"]}
+    with open(current_path) as f:
+        current = json.load(f)["steps"]
+
+    def change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+        return None if not old or new is None else (new - old) / old
+
+    regressed = False
+    print(f"{'conc':>5} {'rps':>16} {'p50':>16} {'p95':>16} {'p99':>16}")
+    for step in current:
+        old = baseline.get(step["concurrency"])
+        if old is None:
+            continue
+        cells = [
+            (old["throughput_rps"], step["throughput_rps"]),
+            *((old["latency_s"][q], step["latency_s"][q]) for q in ("p50", "p95", "p99")),
+        ]
+        print(f"{step['concurrency']:>5} " + " ".join(
+            f"{new!s:>8} ({change(prev, new) or 0:+.0%})" for prev, new in cells
+        ))
+        p95_change = change(old["latency_s"]["p95"], step["latency_s"]["p95"])
+        if p95_change is not None and p95_change > threshold:
+            regressed = True
+    return 1 if regressed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the advisor API against local upstream stubs")
+    parser.add_argument("--ramp", default="1,4,16", help="Comma-separated concurrency levels (default 1,4,16)")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per concurrency step")
+    parser.add_argument("--warmup", type=int, default=0, help="Unmeasured requests before each step")
+    parser.add_argument("--endpoint", default="/advisor", choices=["/advisor", "/advisor/stream"])
+    parser.add_argument("--queries", help="File with one student query per line (default: built-in set)")
+    parser.add_argument("--warm", action="store_true", help="Keep caches between steps (in-process server only)")
+    parser.add_argument("--url", help="Drive a running API server instead of starting one")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--priority", choices=["interactive", "batch"], help="Send this X-Priority header")
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Diff two reports and exit")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p95 regression that fails --compare")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    args.ramp = [int(c) for c in args.ramp.split(",") if c.strip()]
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    stubs = server = None
+    base_url = args.url
+    if base_url is None:
+        stubs = Stubs(config_from_args(args)).start()
+        # Must be set before model.* is imported: tools.py reads its URLs at import time
+        os.environ.update(stubs.env())
+        server, base_url = serve_in_thread()
+
+    try:
+        steps = asyncio.run(run_ramp(args, base_url, queries, stubs))
+    finally:
+        if server is not None:
+            server.should_exit = True
+        if stubs is not None:
+            stubs.stop()
+
+    report = {
+        "benchmark": "advisor_loadtest",
+        "version": 1,
+        "git_commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {
+            "endpoint": args.endpoint,
+            "ramp": args.ramp,
+            "requests_per_step": args.requests,
+            "warmup": args.warmup,
+            "warm_caches": args.warm or args.url is not None,
+            "external_server": args.url is not None,
+            "queries": len(queries),
+            "priority": args.priority,
+            "stubs": None if args.url else {
+                "llm_latency_ms": args.llm_latency_ms,
+                "llm_token_ms": args.llm_token_ms,
+                "llm_prompt_token_ms": args.llm_prompt_token_ms,
+                "scorecard_latency_ms": args.scorecard_latency_ms,
+                "weather_latency_ms": args.weather_latency_ms,
+                "jitter": args.jitter,
+                "seed": args.seed,
+                "fail_rate": args.fail_rate,
+                "slow_rate": args.slow_rate,
+                "slow_ms": args.slow_ms,
+                "fault_upstreams": args.fault_upstreams,
+            },
+        },
+        "steps": steps,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
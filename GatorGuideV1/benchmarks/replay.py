@@ -0,0 +1,455 @@
+"""
+Record and replay every HTTP exchange of advisor sessions for deterministic perf tests.
+
+`record` runs each query through run_advisor_agent_async() with a transport hook (see
+config.set_transport_hook()) that captures every OpenAI request and response and
+every Scorecard / Open-Meteo exchange, with the time to headers and the arrival time
+of each body chunk, into a JSON fixture. `run` serves those responses back from the
+fixture with the original timings (or scaled by --scale), so the model and upstreams
+always behave the same way. Any change in the measured numbers then comes from our code:
+
+- cpu_s: process CPU time spent on the session
+- upstream_wait_s: wall time with at least one replayed exchange in flight
+- added_wait_s: wall time explained by neither, i.e. waits our code added
+- alloc_peak_kb (with --allocations): peak traced Python memory during the session
+
+Example:
+    python -m benchmarks.replay record queries.txt --out fixtures/sessions.json
+    python -m benchmarks.replay run fixtures/sessions.json --repeat 5 --out replay.json
+    python -m benchmarks.replay run fixtures/sessions.json --baseline replay.json
+
+Requests are matched to recorded exchanges by method, path, query and body; a
+request our code now sends differently (e.g. a reworded prompt) falls back to the
+next unused exchange of the same kind (same endpoint and LLM stage), and is counted
+as "fallback".
+API keys are never written to fixtures.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+FIXTURE_VERSION = 1
+
+# Never persisted: credentials, and headers that differ on every call
+_SKIP_RESPONSE_HEADERS = {"set-cookie", "date", "openai-organization", "x-request-id", "cf-ray"}
+_SECRET_PARAMS = {"api_key"}
+
+
+def _httpx_module(request: Any) -> Any:
+    # OpenAI's client and the tool pools may use different httpx flavours (httpx / httpx2)
+    return sys.modules[type(request).__module__.split(".")[0]]
+
+
+def describe_request(request: Any, content: bytes) -> Dict[str, Any]:
+    """JSON-safe description of a request: method, URL without secrets, decoded body."""
+    parts = urlsplit(str(request.url))
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if k not in _SECRET_PARAMS))
+    try:
+        body: Any = json.loads(content) if content else None
+    except ValueError:
+        body = content.decode(errors="replace")
+    return {
+        "method": request.method,
+        "url": urlunsplit((parts.scheme, parts.netloc, parts.path, query, "")),
+        "body": body,
+    }
+
+
+def _path(url: str, query: bool) -> str:
+    # Hosts are left out so a fixture replays regardless of where upstreams pointed when recording
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if query else parts.path
+
+
+def exact_key(described: Dict[str, Any]) -> str:
+    payload = json.dumps([described["method"], _path(described["url"], True), described["body"]], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def loose_key(described: Dict[str, Any]) -> Tuple[str, str, str]:
+    """Method, endpoint and (for chat completions) the pipeline stage the call belongs to."""
+    body = described["body"]
+    kind = ""
+    if isinstance(body, dict) and "messages" in body:
+        schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("name")
+        selecting = body.get("tools") and body.get("tool_choice") != "none"
+        if selecting and not any(m.get("role") == "tool" for m in body["messages"]):
+            kind = "tool_selection"
+        else:
+            kind = schema or "completion"
+        kind += ":stream" if body.get("stream") else ""
+    return described["method"], _path(described["url"], False), kind
+
+
+class _ChunkStream:
+    """Async byte iterator handed to httpx as response content; runs `finalize` once when done."""
+
+    def __init__(self, chunks: Any, finalize: Any):
+        self._chunks = chunks
+        self._finalize = finalize
+        self._done = False
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._chunks:
+                yield chunk
+        finally:
+            await self.aclose()
+
+    async def aclose(self) -> None:
+        if not self._done:
+            self._done = True
+            await self._finalize()
+
+
+class _HookedTransport:
+    """Transport wrapper that forwards to the harness's current session handler."""
+
+    def __init__(self, harness: "Harness", inner: Any, upstream: str):
+        self.harness = harness
+        self.inner = inner
+        self.upstream = upstream
+
+    async def handle_async_request(self, request: Any) -> Any:
+        return await self.harness.handle(self, request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    async def __aenter__(self) -> "_HookedTransport":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+
+class Harness:
+    """Installs the transport hook; subclasses decide what happens to each request."""
+
+    def install(self) -> None:
+        from model.config import set_transport_hook
+
+        set_transport_hook(lambda transport, upstream: _HookedTransport(self, transport, upstream))
+
+    def uninstall(self) -> None:
+        from model.config import set_transport_hook
+
+        set_transport_hook(None)
+
+    async def handle(self, transport: _HookedTransport, request: Any) -> Any:
+        raise NotImplementedError
+
+
+class Recorder(Harness):
+    """Forwards requests upstream and appends each exchange to the current session."""
+
+    def __init__(self):
+        self.exchanges: List[Dict[str, Any]] = []
+
+    async def handle(self, transport: _HookedTransport, request: Any) -> Any:
+        content = await request.aread()
+        started = time.perf_counter()
+        response = await transport.inner.handle_async_request(request)
+        exchange = {
+            "upstream": transport.upstream,
+            "request": describe_request(request, content),
+            "response": {
+                "status": response.status_code,
+                "headers": [
+                    [k.decode(), v.decode()] for k, v in response.headers.raw
+                    if k.decode().lower() not in _SKIP_RESPONSE_HEADERS
+                ],
+                "ttfb_s": round(time.perf_counter() - started, 6),
+                "chunks": [],
+            },
+        }
+        session = self.exchanges
+
+        async def chunks():
+            async for chunk in response.aiter_raw():
+                exchange["response"]["chunks"].append(
+                    [round(time.perf_counter() - started, 6), base64.b64encode(chunk).decode()]
+                )
+                yield chunk
+
+        async def finalize() -> None:
+            await response.aclose()
+            session.append(exchange)
+
+        return _httpx_module(request).Response(
+            response.status_code,
+            headers=response.headers.raw,
+            content=_ChunkStream(chunks(), finalize),
+            extensions=response.extensions,
+            request=request,
+        )
+
+
+class Player(Harness):
+    """Answers requests from recorded exchanges, sleeping the recorded (scaled) delays."""
+
+    def __init__(self, scale: float = 1.0):
+        self.scale = scale
+        self.begin([])
+
+    def begin(self, exchanges: List[Dict[str, Any]]) -> None:
+        """Serve the given session's exchanges to the requests that follow."""
+        self._remaining = {id(e): e for e in exchanges}
+        self._exact: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._loose: Dict[Tuple[str, str, str], Deque[Dict[str, Any]]] = {}
+        for exchange in exchanges:
+            self._exact.setdefault(exact_key(exchange["request"]), deque()).append(exchange)
+            self._loose.setdefault(loose_key(exchange["request"]), deque()).append(exchange)
+        self.counts = {"matched": 0, "fallback": 0, "missing": 0}
+        self.intervals: List[Tuple[float, float]] = []
+
+    def _take(self, described: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        for index, key, outcome in (
+            (self._exact, exact_key(described), "matched"),
+            (self._loose, loose_key(described), "fallback"),
+        ):
+            candidates = index.get(key)
+            while candidates:
+                exchange = candidates.popleft()
+                if self._remaining.pop(id(exchange), None) is not None:
+                    self.counts[outcome] += 1
+                    return exchange
+        self.counts["missing"] += 1
+        return None
+
+    @property
+    def unused(self) -> int:
+        return len(self._remaining)
+
+    async def handle(self, transport: _HookedTransport, request: Any) -> Any:
+        httpx = _httpx_module(request)
+        described = describe_request(request, await request.aread())
+        exchange = self._take(described)
+        if exchange is None:
+            raise httpx.ConnectError(f"No recorded exchange for {described['method']} {described['url']}", request=request)
+
+        started = time.perf_counter()
+        recorded = exchange["response"]
+        await asyncio.sleep(recorded["ttfb_s"] * self.scale)
+
+        async def chunks():
+            for offset, data in recorded["chunks"]:
+                delay = started + offset * self.scale - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield base64.b64decode(data)
+
+        async def finalize() -> None:
+            self.intervals.append((started, time.perf_counter()))
+
+        return httpx.Response(
+            recorded["status"],
+            headers=[(k, v) for k, v in recorded["headers"]],
+            content=_ChunkStream(chunks(), finalize),
+            request=request,
+        )
+
+
+def covered_seconds(intervals: List[Tuple[float, float]]) -> float:
+    """Length of the union of (start, end) intervals, so concurrent exchanges count once."""
+    total, end = 0.0, float("-inf")
+    for start, stop in sorted(intervals):
+        if stop > end:
+            total += stop - max(start, end)
+            end = stop
+    return total
+
+
+def _result_summary(result: Any) -> Optional[Dict[str, Any]]:
+    if result is None:
+        return None
+    return {"schools": [school.name for school in result.schools or []]}
+
+
+async def _record(queries: List[str]) -> List[Dict[str, Any]]:
+    from benchmarks.loadtest import clear_caches
+    from model.agent.advisoragent import run_advisor_agent_async
+
+    recorder = Recorder()
+    recorder.install()
+    sessions = []
+    try:
+        for n, query in enumerate(queries):
+            clear_caches()
+            recorder.exchanges = []
+            started = time.perf_counter()
+            result = await run_advisor_agent_async(query)
+            sessions.append({
+                "name": f"{n:03d}",
+                "student_input": query,
+                "wall_s": round(time.perf_counter() - started, 6),
+                "result": _result_summary(result),
+                "exchanges": recorder.exchanges,
+            })
+            print(f"recorded {n:03d}: {len(recorder.exchanges)} exchanges  {query!r}", file=sys.stderr)
+    finally:
+        recorder.uninstall()
+    return sessions
+
+
+async def _replay(sessions: List[Dict[str, Any]], scale: float, repeat: int, allocations: bool) -> List[Dict]:
+    from benchmarks.loadtest import clear_caches
+    from model.agent.advisoragent import run_advisor_agent_async
+
+    player = Player(scale)
+    player.install()
+    report = []
+    try:
+        if sessions:
+            # Unmeasured warm-up: lazy imports, the name index and client pools
+            player.begin(sessions[0]["exchanges"])
+            await run_advisor_agent_async(sessions[0]["student_input"])
+        for session in sessions:
+            runs = []
+            for attempt in range(repeat + (1 if allocations else 0)):
+                traced = allocations and attempt == repeat
+                clear_caches()
+                player.begin(session["exchanges"])
+                if traced:
+                    tracemalloc.start()
+                wall, cpu = time.perf_counter(), time.process_time()
+                error = None
+                try:
+                    result = await run_advisor_agent_async(session["student_input"])
+                except Exception as e:
+                    result, error = None, f"{type(e).__name__}: {e}"
+                wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+                if traced:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    # tracemalloc slows everything down, so this extra run is not timed
+                    runs[-1]["alloc_peak_kb"] = round(peak / 1024, 1)
+                    continue
+                upstream = covered_seconds(player.intervals)
+                runs.append({
+                    "wall_s": wall,
+                    "cpu_s": cpu,
+                    "upstream_wait_s": upstream,
+                    "added_wait_s": max(0.0, wall - upstream - cpu),
+                    "exchanges": {**player.counts, "unused": player.unused},
+                    "same_result": _result_summary(result) == session.get("result"),
+                    "error": error,
+                })
+            entry: Dict[str, Any] = {"name": session["name"], "student_input": session["student_input"]}
+            for metric in ("wall_s", "cpu_s", "upstream_wait_s", "added_wait_s"):
+                entry[metric] = round(statistics.median(run[metric] for run in runs), 6)
+            last = runs[-1]
+            entry.update({k: last[k] for k in ("exchanges", "same_result", "error")})
+            if allocations:
+                entry["alloc_peak_kb"] = last.get("alloc_peak_kb")
+            report.append(entry)
+            print(
+                f"replayed {session['name']}: wall={entry['wall_s']:.3f}s cpu={entry['cpu_s']:.3f}s "
+                f"added_wait={entry['added_wait_s']:.3f}s {entry['exchanges']}",
+                file=sys.stderr,
+            )
+    finally:
+        player.uninstall()
+    return report
+
+
+def _totals(sessions: List[Dict[str, Any]]) -> Dict[str, float]:
+    totals = {
+        metric: round(sum(s[metric] for s in sessions), 6)
+        for metric in ("wall_s", "cpu_s", "upstream_wait_s", "added_wait_s")
+    }
+    peaks = [s["alloc_peak_kb"] for s in sessions if s.get("alloc_peak_kb") is not None]
+    if peaks:
+        totals["alloc_peak_kb_max"] = max(peaks)
+    return totals
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> int:
+    """
+    Print total CPU / wait changes against a baseline report.
+
+    Returns:
+        int: 1 if cpu_s or added_wait_s grew by more than `threshold` (a fraction), else 0
+    """
+    regressed = False
+    for metric, new in current["totals"].items():
+        old = baseline["totals"].get(metric)
+        change = (new - old) / old if old else 0.0
+        flag = metric in ("cpu_s", "added_wait_s") and change > threshold
+        regressed |= flag
+        print(f"{metric:>18} {old!s:>10} -> {new!s:>10} ({change:+.1%}){'  REGRESSION' if flag else ''}")
+    return 1 if regressed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from benchmarks.loadtest import git_commit
+
+    parser = argparse.ArgumentParser(description="Record and replay advisor sessions")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    record_cmd = subcommands.add_parser("record", help="Run queries against the configured upstreams and record them")
+    record_cmd.add_argument("queries", help="File with one student query per line")
+    record_cmd.add_argument("--out", required=True, help="Fixture output path")
+    run_cmd = subcommands.add_parser("run", help="Replay a fixture and measure our own overhead")
+    run_cmd.add_argument("fixture", help="Fixture written by `record`")
+    run_cmd.add_argument("--scale", type=float, default=1.0, help="Multiply recorded delays (0 = no waits)")
+    run_cmd.add_argument("--repeat", type=int, default=3, help="Runs per session; medians are reported")
+    run_cmd.add_argument("--allocations", action="store_true", help="Add an untimed tracemalloc run per session")
+    run_cmd.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    run_cmd.add_argument("--baseline", help="Report to compare against; exits 1 on a regression")
+    run_cmd.add_argument("--threshold", type=float, default=0.10, help="Allowed cpu_s / added_wait_s growth")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+        sessions = asyncio.run(_record(queries))
+        fixture = {
+            "version": FIXTURE_VERSION,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": git_commit(),
+            "sessions": sessions,
+        }
+        with open(args.out, "w") as f:
+            json.dump(fixture, f, indent=1)
+        print(f"Wrote {len(sessions)} sessions to {args.out}", file=sys.stderr)
+        return
+
+    with open(args.fixture) as f:
+        fixture = json.load(f)
+    if fixture.get("version") != FIXTURE_VERSION:
+        sys.exit(f"Unsupported fixture version: {fixture.get('version')}")
+    sessions = asyncio.run(_replay(fixture["sessions"], args.scale, max(args.repeat, 1), args.allocations))
+    report = {
+        "benchmark": "advisor_replay",
+        "version": 1,
+        "fixture": args.fixture,
+        "git_commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "sessions": sessions,
+        "totals": _totals(sessions),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            sys.exit(compare(json.load(f), report, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+"""
+Local stand-ins for the OpenAI, College Scorecard and Open-Meteo APIs.
+
+Each stub is a small threaded HTTP server that answers the requests the advisor
+makes: OpenAI chat completions (tool selection with tool calls, structured intent
+and advice, streamed or not), Scorecard /schools queries and Open-Meteo forecasts
+(single or multi-location). The OpenAI stub also models the provider's prompt-prefix
+cache, reporting `cached_tokens` for prompts that repeat an earlier prefix. Latencies
+are configurable, so a benchmark measures
+our own overhead and concurrency behaviour against upstreams that behave like the
+real ones without spending tokens or hitting rate limits.
+
+Faults can be injected too: a share of requests answered with 503, or stalled for
+extra time, on all stubs or only some (e.g. --fail-rate 1 --fault-upstreams weather
+to check that schools come back without weather once the breaker opens).
+
+Run them on their own to point a separately started API server at them:
+
+    python -m benchmarks.stubs --llm-latency-ms 400
+    python -m benchmarks.stubs --fail-rate 0.2 --slow-rate 0.05 --slow-ms 2000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+ADVICE_SENTENCES = [
+    "Each of these schools offers strong academics and an active campus community.",
+    "Compare the acceptance rates against your own profile to balance reach and safety schools.",
+    "In-state tuition is usually far lower, so check residency rules before applying.",
+    "Visiting campus or joining a virtual tour is the best way to judge fit.",
+]
+
+
+class StubConfig:
+    """
+    Simulated upstream behaviour.
+
+    Attributes:
+        llm_latency_ms (float): Time before an OpenAI response starts (time to first token)
+        llm_token_ms (float): Extra time per generated completion token
+        llm_prompt_token_ms (float): Extra time to first token per prompt token not
+            served from the prefix cache
+        scorecard_latency_ms (float): College Scorecard response time
+        weather_latency_ms (float): Open-Meteo response time
+        jitter (float): Uniform +/- fraction applied to every delay (0.2 = +/-20%)
+        advice_sentences (int): Length of the final advice text
+        seed (int): Seed for the jitter, so runs are repeatable
+        fail_rate (float): Share of requests answered with 503 instead of a result
+        slow_rate (float): Share of requests stalled for an extra slow_ms (tail latency)
+        slow_ms (float): Extra delay of a stalled request
+        fault_upstreams (Optional[List[str]]): Stubs the faults apply to ("openai",
+            "scorecard", "weather"); None for all
+    """
+
+    def __init__(
+        self,
+        llm_latency_ms: float = 300,
+        llm_token_ms: float = 2,
+        llm_prompt_token_ms: float = 0,
+        scorecard_latency_ms: float = 120,
+        weather_latency_ms: float = 60,
+        jitter: float = 0.2,
+        advice_sentences: int = 4,
+        seed: int = 0,
+        fail_rate: float = 0,
+        slow_rate: float = 0,
+        slow_ms: float = 0,
+        fault_upstreams: Optional[List[str]] = None,
+    ):
+        self.llm_latency_ms = llm_latency_ms
+        self.llm_token_ms = llm_token_ms
+        self.llm_prompt_token_ms = llm_prompt_token_ms
+        self.scorecard_latency_ms = scorecard_latency_ms
+        self.weather_latency_ms = weather_latency_ms
+        self.jitter = jitter
+        self.advice_sentences = advice_sentences
+        self.fail_rate = fail_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.fault_upstreams = fault_upstreams
+        self._random = random.Random(seed)
+        # Separate stream, so injecting faults leaves the latency jitter unchanged
+        self._faults = random.Random(seed + 1)
+        self._lock = threading.Lock()
+
+    def sleep(self, ms: float) -> None:
+        """Block the handler thread for `ms` milliseconds, with jitter."""
+        if ms <= 0:
+            return
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(ms * factor / 1000)
+
+    def inject_fault(self, upstream: str) -> bool:
+        """Stall this request if it draws a slow fault; True if it should fail with 503."""
+        if self.fault_upstreams is not None and upstream not in self.fault_upstreams:
+            return False
+        with self._lock:
+            slow = self._faults.random() < self.slow_rate
+            fail = self._faults.random() < self.fail_rate
+        if slow:
+            time.sleep(self.slow_ms / 1000)
+        return fail
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def prompt_text(body: Dict[str, Any]) -> str:
+    """The prompt as the provider sees it for caching: tools, response schema, then messages."""
+    return json.dumps(body.get("tools")) + json.dumps(body.get("response_format")) + json.dumps(body.get("messages", []))
+
+
+class PrefixCache:
+    """
+    Provider-style prompt cache: prompts of 1024+ tokens are cached in 128-token
+    steps, and a later prompt hits for the longest prefix it shares with them.
+    """
+
+    MIN_TOKENS = 1024
+    STEP_TOKENS = 128
+
+    def __init__(self):
+        self._seen: set = set()
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt: str) -> int:
+        """Cached tokens for this prompt; its own prefixes are cached for later calls."""
+        digest = hashlib.sha1()
+        hashes = []
+        start = 0
+        # ~4 characters per token, as in estimate_tokens()
+        for end in range(self.MIN_TOKENS * 4, len(prompt) + 1, self.STEP_TOKENS * 4):
+            digest.update(prompt[start:end].encode())
+            hashes.append(digest.copy().digest())
+            start = end
+        cached = 0
+        with self._lock:
+            for i, key in enumerate(hashes):
+                if key not in self._seen:
+                    break
+                cached = self.MIN_TOKENS + i * self.STEP_TOKENS
+            self._seen.update(hashes)
+        return cached
+
+
+def usage_block(body: Dict[str, Any], completion: str, cache: Optional[PrefixCache] = None) -> Dict[str, Any]:
+    """OpenAI-style usage; prompt tokens repeated from an earlier call's prefix count as cached."""
+    text = prompt_text(body)
+    prompt = estimate_tokens(text)
+    completion_tokens = estimate_tokens(completion)
+    cached = cache.lookup(text) if cache else 0
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached},
+    }
+
+
+def _state_location(state: str) -> Tuple[float, float]:
+    # Deterministic pseudo-coordinates inside the continental US
+    h = zlib.crc32(state.encode())
+    return 25 + (h % 2300) / 100, -124 + (h // 2300 % 5600) / 100
+
+
+def scorecard_rows(params: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Fake Scorecard results shaped like the real `fields` the tools request."""
+    state = (params.get("school.state") or "CA").upper()
+    name = params.get("school.name")
+    count = int(params.get("per_page") or 20)
+    lat, lon = _state_location(state)
+    rows = []
+    for i in range(count):
+        school = name if name and i == 0 else f"{name or state} College {i + 1}"
+        rows.append({
+            "school.name": school,
+            "school.city": f"City {i + 1}",
+            "school.state": state,
+            "location.lat": round(lat + i * 0.37, 4),
+            "location.lon": round(lon + i * 0.29, 4),
+            "latest.admissions.admission_rate.overall": round(0.15 + (i * 0.07) % 0.8, 4),
+            "latest.cost.tuition.in_state": 9000 + 1500 * i,
+            "latest.cost.tuition.out_of_state": 28000 + 2100 * i,
+        })
+    return rows
+
+
+def _last_user_text(messages: List[dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return str(message.get("content") or "")
+    return ""
+
+
+def _detect(text: str) -> Tuple[Optional[str], List[str]]:
+    # Same detection the fast intent path uses, so tool calls match the query
+    from model.agent.fast_intent import detect_schools, detect_state
+
+    return detect_state(text), detect_schools(text)
+
+
+def chat_reply(body: Dict[str, Any], config: StubConfig) -> Dict[str, Any]:
+    """Build the assistant message for a chat completion request."""
+    messages = body.get("messages", [])
+    schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("name")
+    text = _last_user_text(messages)
+
+    # Tool selection: call the tools the query needs; with none needed, answer below
+    calls: List[Tuple[str, Dict[str, Any]]] = []
+    choice = body.get("tool_choice")
+    if body.get("tools") and choice != "none" and not any(m.get("role") == "tool" for m in messages):
+        state, schools = _detect(text)
+        if schools:
+            calls = [("search_colleges", {"school_name": s, **({"state": state} if state else {})}) for s in schools]
+        elif state:
+            calls = [("state_search_colleges", {"state": state})]
+        allowed = body["tools"]
+        if isinstance(choice, dict) and choice.get("type") == "allowed_tools":
+            allowed = choice["allowed_tools"]["tools"]
+        names = {tool["function"]["name"] for tool in allowed}
+        calls = [call for call in calls if call[0] in names]
+    if calls:
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+                for i, (name, args) in enumerate(calls)
+            ],
+        }
+
+    if schema == "StudentIntent":
+        state, schools = _detect(text)
+        intent = {
+            "intent": "school_search" if state or schools else "general_advice",
+            "school_name": schools[0] if schools else None,
+            "state": state,
+            "confidence_score": 0.9,
+        }
+        return {"role": "assistant", "content": json.dumps(intent)}
+    if not schema:
+        return {"role": "assistant", "content": "I can help with college questions."}
+
+    picks: List[dict] = []
+    for message in messages:
+        if message.get("role") != "tool":
+            continue
+        try:
+            rows = json.loads(message.get("content") or "null")
+        except ValueError:
+            continue
+        if isinstance(rows, dict) and "columns" in rows:
+            # Compact tabular layout (model/agent/serialize.py)
+            rows = [dict(zip(rows["columns"], values)) for values in rows.get("rows", [])]
+        if isinstance(rows, list):
+            picks.extend(row for row in rows if isinstance(row, dict) and row.get("name"))
+    picks = [
+        {k: row.get(k) for k in ("name", "city", "state", "acceptance_rate", "tuition_in_state", "tuition_out_of_state")}
+        for row in picks[:3]
+    ]
+    advice = " ".join(ADVICE_SENTENCES[i % len(ADVICE_SENTENCES)] for i in range(config.advice_sentences))
+    return {"role": "assistant", "content": json.dumps({"response": advice, "schools": picks})}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    def _count(self, route: str) -> None:
+        with self.server.lock:
+            self.server.calls[route] = self.server.calls.get(route, 0) + 1
+
+    def _fault(self, route: str) -> bool:
+        """Answer 503 and return True if an injected fault fails this request."""
+        if not self.config.inject_fault(route):
+            return False
+        self._count(f"{route}_failed")
+        self._send_json({"error": {"message": "injected fault", "type": "server_error"}}, status=503)
+        return True
+
+    def _send_json(self, payload: Any, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        # Connection-pool warm-up
+        self.send_response(200)
+        self.send_header("content-length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path.endswith("/schools"):
+            self._count("scorecard")
+            if self._fault("scorecard"):
+                return
+            self.config.sleep(self.config.scorecard_latency_ms)
+            self._send_json({"metadata": {"total": 0}, "results": scorecard_rows(params)})
+        elif url.path.endswith("/forecast"):
+            self._count("weather")
+            if self._fault("weather"):
+                return
+            self.config.sleep(self.config.weather_latency_ms)
+            latitudes = str(params.get("latitude", "0")).split(",")
+            current = lambda lat: {"current": {"temperature_2m": round(30 - float(lat) / 3, 1), "wind_speed_10m": 9.5}}
+            self._send_json(current(latitudes[0]) if len(latitudes) == 1 else [current(lat) for lat in latitudes])
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self) -> None:
+        if not urlparse(self.path).path.endswith("/chat/completions"):
+            self._send_json({"error": {"message": "not found"}}, status=404)
+            return
+        self._count("openai")
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        if self._fault("openai"):
+            return
+        message = chat_reply(body, self.config)
+        content = message.get("content") or ""
+        usage = usage_block(body, content or json.dumps(message.get("tool_calls")), self.server.prefix_cache)
+        finish = "tool_calls" if message.get("tool_calls") else "stop"
+        base = {"id": "chatcmpl-stub", "created": int(time.time()), "model": body.get("model", "stub")}
+
+        uncached = usage["prompt_tokens"] - usage["prompt_tokens_details"]["cached_tokens"]
+        self.config.sleep(self.config.llm_latency_ms + self.config.llm_prompt_token_ms * uncached)
+        if not body.get("stream"):
+            self.config.sleep(self.config.llm_token_ms * usage["completion_tokens"])
+            self._send_json({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta: dict, finish_reason: Optional[str] = None, **extra: Any) -> None:
+            payload = {**base, "object": "chat.completion.chunk", **extra,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        # Roughly one token per 4 characters, sent a few tokens at a time
+        for piece in re.findall(r".{1,16}", content, flags=re.S):
+            self.config.sleep(self.config.llm_token_ms * estimate_tokens(piece))
+            chunk({"role": "assistant", "content": piece})
+        chunk({}, finish, usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once
+    request_queue_size = 256
+
+    def __init__(self, address: Tuple[str, int], config: StubConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.calls: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.prefix_cache = PrefixCache()
+
+    def handle_error(self, request: Any, client_address: Tuple[str, int]) -> None:
+        # Hedged and deadline-bound attempts are abandoned by the client mid-response
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class Stubs:
+    """
+    The three upstream stand-ins, each on its own port like the real hosts.
+
+    Example:
+        >>> with Stubs(StubConfig(llm_latency_ms=400)) as stubs:
+        ...     os.environ.update(stubs.env())
+        ...     ...  # import and run the API
+        >>> stubs.calls()
+        {'openai': 120, 'scorecard': 38, 'weather': 21}
+    """
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1"):
+        self.config = config or StubConfig()
+        self.servers = {name: StubServer((host, 0), self.config) for name in ("openai", "scorecard", "weather")}
+
+    def start(self) -> "Stubs":
+        # Query detection imports model.*, whose config builds an OpenAI client at import
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+        for server in self.servers.values():
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self) -> "Stubs":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables that point config.py's OpenAI clients and tools.py at the stubs."""
+        return {
+            "OPENAI_BASE_URL": f"{self.servers['openai'].url}/v1",
+            "OPENAI_API_KEY": "stub",
+            "COLLEGE_SCORECARD_URL": f"{self.servers['scorecard'].url}/ed/collegescorecard/v1/schools",
+            "COLLEGE_SCORECARD_API_KEY": "stub",
+            "OPEN_METEO_URL": f"{self.servers['weather'].url}/v1/forecast",
+            "SCORECARD_BACKEND": "api",
+        }
+
+    def calls(self) -> Dict[str, int]:
+        """Requests served per upstream so far."""
+        totals: Dict[str, int] = {}
+        for server in self.servers.values():
+            with server.lock:
+                for route, count in server.calls.items():
+                    totals[route] = totals.get(route, 0) + count
+        return totals
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Latency and fault-injection flags shared by the stub and load-test CLIs."""
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="OpenAI time to first token")
+    parser.add_argument("--llm-token-ms", type=float, default=2, help="OpenAI time per completion token")
+    parser.add_argument(
+        "--llm-prompt-token-ms", type=float, default=0, help="OpenAI time to first token per uncached prompt token"
+    )
+    parser.add_argument("--scorecard-latency-ms", type=float, default=120, help="Scorecard response time")
+    parser.add_argument("--weather-latency-ms", type=float, default=60, help="Open-Meteo response time")
+    parser.add_argument("--jitter", type=float, default=0.2, help="+/- fraction applied to every delay")
+    parser.add_argument("--seed", type=int, default=0, help="Jitter seed")
+    parser.add_argument("--fail-rate", type=float, default=0, help="Share of requests answered with 503")
+    parser.add_argument("--slow-rate", type=float, default=0, help="Share of requests stalled for --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=0, help="Extra delay of a stalled request")
+    parser.add_argument(
+        "--fault-upstreams", default=None, help="Comma-separated stubs to inject faults into (default all)"
+    )
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        llm_latency_ms=args.llm_latency_ms,
+        llm_token_ms=args.llm_token_ms,
+        llm_prompt_token_ms=args.llm_prompt_token_ms,
+        scorecard_latency_ms=args.scorecard_latency_ms,
+        weather_latency_ms=args.weather_latency_ms,
+        jitter=args.jitter,
+        seed=args.seed,
+        fail_rate=args.fail_rate,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        fault_upstreams=args.fault_upstreams.split(",") if args.fault_upstreams else None,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve local OpenAI, Scorecard and Open-Meteo stand-ins")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stubs = Stubs(config_from_args(args)).start()
+    print("Stubs running; start the API with:")
+    for name, value in stubs.env().items():
+        print(f"export {name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+import json
 import os
+import uuid
 import requests
 import streamlit as st
 
@@ -27,6 +29,11 @@ def init_state():
         st.session_state.api_base = get_api_base_url()
     if "timeout_s" not in st.session_state:
         st.session_state.timeout_s = get_default_timeout()
+    if "stream" not in st.session_state:
+        st.session_state.stream = os.environ.get("GATORGUIDE_STREAM", "1") == "1"
+    if "session_id" not in st.session_state:
+        # Lets the API answer follow-ups ("what about cheaper ones?") in context
+        st.session_state.session_id = uuid.uuid4().hex
 
 
 def render_sidebar():
@@ -45,11 +52,51 @@ def render_sidebar():
             step=5,
             help="Increase if the advisor takes longer to respond.",
         )
+        st.session_state.stream = st.checkbox(
+            "Stream responses",
+            value=st.session_state.stream,
+            help="Show schools and advice as they are found instead of waiting for the full answer.",
+        )
         st.caption(
-            "Messages are sent to the /advisor endpoint as student_input."
+            "Messages are sent to the /advisor (or /advisor/stream) endpoint as student_input."
         )
 
 
+def render_school_card(s):
+    name = s.get('name', 'Unknown')
+    city = s.get('city', '')
+    state = s.get('state', '')
+    acceptance = s.get('acceptance_rate')
+    tuition_in = s.get('tuition_in_state')
+    tuition_out = s.get('tuition_out_of_state')
+    weather = s.get('weather')
+    
+    # School header
+    st.markdown(f"##### {name}")
+    st.caption(f"📍 {city}, {state}")
+    
+    # Create columns for organized display
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if acceptance is not None:
+            # Handle both decimal (0.39) and percentage (39) formats
+            rate = acceptance if acceptance > 1 else acceptance * 100
+            st.metric("Acceptance Rate", f"{rate:.1f}%")
+        if tuition_in is not None:
+            st.metric("In-State Tuition", f"${tuition_in:,.0f}/yr")
+    
+    with col2:
+        if tuition_out is not None:
+            st.metric("Out-of-State Tuition", f"${tuition_out:,.0f}/yr")
+        if weather:
+            temp = weather.get('temperature_celsius')
+            if temp is not None:
+                st.metric("Current Weather", f"{temp}°C")
+    
+    st.divider()
+
+
 def render_chat_messages():
     for m in st.session_state.messages:
         with st.chat_message(m["role"]):
@@ -57,38 +104,22 @@ def render_chat_messages():
             if m.get("schools"):
                 st.markdown("**🎓 Suggested Schools**")
                 for s in m["schools"]:
-                    name = s.get('name', 'Unknown')
-                    city = s.get('city', '')
-                    state = s.get('state', '')
-                    acceptance = s.get('acceptance_rate')
-                    tuition_in = s.get('tuition_in_state')
-                    tuition_out = s.get('tuition_out_of_state')
-                    weather = s.get('weather')
-                    
-                    # School header
-                    st.markdown(f"##### {name}")
-                    st.caption(f"📍 {city}, {state}")
-                    
-                    # Create columns for organized display
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        if acceptance is not None:
-                            # Handle both decimal (0.39) and percentage (39) formats
-                            rate = acceptance if acceptance > 1 else acceptance * 100
-                            st.metric("Acceptance Rate", f"{rate:.1f}%")
-                        if tuition_in is not None:
-                            st.metric("In-State Tuition", f"${tuition_in:,.0f}/yr")
-                    
-                    with col2:
-                        if tuition_out is not None:
-                            st.metric("Out-of-State Tuition", f"${tuition_out:,.0f}/yr")
-                        if weather:
-                            temp = weather.get('temperature_celsius')
-                            if temp is not None:
-                                st.metric("Current Weather", f"{temp}°C")
-                    
-                    st.divider()
+                    render_school_card(s)
+
+
+def request_body(user_text: str, timeout_s: int) -> dict:
+    # Ask the backend to give up slightly before we do, so a slow upstream ends in an
+    # error (or the schools found so far) rather than a client-side read timeout
+    return {
+        "student_input": user_text,
+        "session_id": st.session_state.session_id,
+        "deadline_s": max(1, int(timeout_s) - 2),
+    }
+
+
+def busy_message(resp) -> str:
+    retry_after = resp.headers.get("Retry-After", "a few")
+    return f"The advisor is busy right now. Please try again in {retry_after} seconds."
 
 
 def call_advisor_api(api_base: str, user_text: str, timeout_s: int):
@@ -97,9 +128,11 @@ def call_advisor_api(api_base: str, user_text: str, timeout_s: int):
         # Separate connect/read timeouts: 10s connect, configurable read
         resp = requests.post(
             url,
-            json={"student_input": user_text},
+            json=request_body(user_text, timeout_s),
             timeout=(10, max(1, int(timeout_s))),
         )
+        if resp.status_code == 429:
+            return {"response": "", "schools": [], "error": busy_message(resp)}
         resp.raise_for_status()
         data = resp.json()
         return {
@@ -117,6 +150,83 @@ def call_advisor_api(api_base: str, user_text: str, timeout_s: int):
         return {"response": "", "schools": [], "error": str(e)}
 
 
+def stream_advisor_api(api_base: str, user_text: str, timeout_s: int):
+    """Yield (event, data) pairs from the /advisor/stream Server-Sent Events endpoint."""
+    url = f"{api_base.rstrip('/')}/advisor/stream"
+    # The read timeout applies between chunks, not to the whole response
+    with requests.post(
+        url,
+        json=request_body(user_text, timeout_s),
+        stream=True,
+        timeout=(10, max(1, int(timeout_s))),
+    ) as resp:
+        if resp.status_code == 429:
+            yield "error", {"detail": busy_message(resp)}
+            return
+        resp.raise_for_status()
+        event = "message"
+        for line in resp.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):])
+
+
+def render_schools(placeholder, schools):
+    with placeholder.container():
+        st.markdown("**🎓 Suggested Schools**")
+        for s in schools:
+            render_school_card(s)
+
+
+def render_streamed_response(api_base: str, user_text: str, timeout_s: int):
+    """Render /advisor/stream events as they arrive and return the final result like call_advisor_api()."""
+    status = st.empty()
+    text = st.empty()
+    cards = st.empty()
+    status.caption("🤔 Understanding your question…")
+    advice = ""
+    found = []
+    try:
+        for event, data in stream_advisor_api(api_base, user_text, timeout_s):
+            if event == "intent":
+                status.caption("🧭 Choosing what to look up…")
+            elif event == "tools":
+                status.caption(f"🔎 Running {', '.join(data.get('tools', []))}…")
+            elif event == "school":
+                # Preview cards from the searches; replaced by the advisor's picks when done
+                found.append(data)
+                render_schools(cards, found)
+            elif event == "token":
+                status.caption("✍️ Writing advice…")
+                advice += data.get("text", "")
+                text.write(advice)
+            elif event == "done":
+                status.empty()
+                schools = data.get("schools", []) or []
+                text.write(data.get("response") or "I couldn't understand the query. Try rephrasing?")
+                if schools:
+                    render_schools(cards, schools)
+                else:
+                    cards.empty()
+                return {"response": data.get("response", ""), "schools": schools, "error": None}
+            elif event == "error":
+                status.empty()
+                return {"response": "", "schools": [], "error": data.get("detail", "Unknown error")}
+    except requests.exceptions.ReadTimeout:
+        status.empty()
+        return {
+            "response": "",
+            "schools": [],
+            "error": f"Read timeout after {timeout_s}s. Try increasing the timeout.",
+        }
+    except requests.exceptions.RequestException as e:
+        status.empty()
+        return {"response": "", "schools": [], "error": str(e)}
+    status.empty()
+    return {"response": "", "schools": [], "error": "The advisor stream ended before a response was ready."}
+
+
 def main():
     st.set_page_config(page_title="GatorGuide Advisor", page_icon="🎓")
     st.title("GatorGuide — Education Advisor 🎓")
@@ -133,10 +243,15 @@ def main():
             st.write(user_input)
 
         with st.chat_message("assistant"):
-            with st.spinner("Thinking…"):
-                result = call_advisor_api(
+            if st.session_state.stream:
+                result = render_streamed_response(
                     st.session_state.api_base, user_input, st.session_state.timeout_s
                 )
+            else:
+                with st.spinner("Thinking…"):
+                    result = call_advisor_api(
+                        st.session_state.api_base, user_input, st.session_state.timeout_s
+                    )
             if result["error"]:
                 st.error(f"API error: {result['error']}")
                 content = "Sorry, I couldn't reach the advisor API."
@@ -151,42 +266,13 @@ def main():
                     "schools": result.get("schools", []),
                 }
                 st.session_state.messages.append(assistant_msg)
-                st.write(content)
-                if assistant_msg.get("schools"):
-                    st.markdown("**🎓 Suggested Schools**")
-                    for s in assistant_msg["schools"]:
-                        name = s.get('name', 'Unknown')
-                        city = s.get('city', '')
-                        state = s.get('state', '')
-                        acceptance = s.get('acceptance_rate')
-                        tuition_in = s.get('tuition_in_state')
-                        tuition_out = s.get('tuition_out_of_state')
-                        weather = s.get('weather')
-                        
-                        # School header
-                        st.markdown(f"##### {name}")
-                        st.caption(f"📍 {city}, {state}")
-                        
-                        # Create columns for organized display
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            if acceptance is not None:
-                                # Handle both decimal (0.39) and percentage (39) formats
-                                rate = acceptance if acceptance > 1 else acceptance * 100
-                                st.metric("Acceptance Rate", f"{rate:.1f}%")
-                            if tuition_in is not None:
-                                st.metric("In-State Tuition", f"${tuition_in:,.0f}/yr")
-                        
-                        with col2:
-                            if tuition_out is not None:
-                                st.metric("Out-of-State Tuition", f"${tuition_out:,.0f}/yr")
-                            if weather:
-                                temp = weather.get('temperature_celsius')
-                                if temp is not None:
-                                    st.metric("Current Weather", f"{temp}°C")
-                        
-                        st.divider()
+                # A streamed response is already on screen
+                if not st.session_state.stream:
+                    st.write(content)
+                    if assistant_msg.get("schools"):
+                        st.markdown("**🎓 Suggested Schools**")
+                        for s in assistant_msg["schools"]:
+                            render_school_card(s)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+"""
+Admission control for the advisor endpoints.
+
+Every advisor run holds one of ADMISSION_MAX_CONCURRENCY slots while it talks to
+OpenAI and the tool APIs. When all slots are busy, new requests wait in a bounded
+queue instead of piling more load onto the upstreams, and overload ends in a quick
+429 with Retry-After rather than a cascade of timeouts:
+
+- a request that finds the queue full (ADMISSION_MAX_QUEUE) is rejected at once
+- a request that waits longer than its class allows is shed. This is the
+  ADMISSION_MAX_WAIT_S (interactive) or ADMISSION_BATCH_MAX_WAIT_S (batch) limit,
+  capped by the request deadline
+- freed slots go to interactive requests before batch ones, and an interactive
+  request that finds the queue full displaces the newest queued batch request
+
+The class comes from the X-Priority header ("interactive" or "batch"). Without it,
+/advisor and /advisor/stream are interactive and /advisor/batch items are batch.
+Queue depth, in-flight count and wait times are exported at /metrics and /status.
+
+Example:
+    >>> async with admission.slot("interactive"):
+    ...     result = await run_advisor_agent_async(student_input)
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from os import getenv
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from model.agent.resilience import time_left
+from model.metrics import REGISTRY, Counter, Histogram
+
+# Advisor runs in flight at once (0 = no admission control)
+ADMISSION_MAX_CONCURRENCY = int(getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+# Requests waiting for a slot, across both priority classes
+ADMISSION_MAX_QUEUE = int(getenv("ADMISSION_MAX_QUEUE", "64"))
+# Longest wait for a slot before the request is shed, per priority class
+ADMISSION_MAX_WAIT_S = float(getenv("ADMISSION_MAX_WAIT_S", "2"))
+ADMISSION_BATCH_MAX_WAIT_S = float(getenv("ADMISSION_BATCH_MAX_WAIT_S", "30"))
+
+# In the order freed slots are handed out
+PRIORITIES = ("interactive", "batch")
+
+ADMISSION_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "gatorguide_admission_wait_seconds",
+    "Time admitted requests waited for a slot, by priority",
+    ["priority"],
+))
+ADMISSION_REQUESTS = REGISTRY.register(Counter(
+    "gatorguide_admission_requests_total",
+    "Admission decisions by priority and outcome (admitted, rejected when the queue is full, shed after waiting too long or displaced)",
+    ["priority", "outcome"],
+))
+
+
+class Overloaded(Exception):
+    """The request was not admitted; the API answers 429 with Retry-After."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Server is busy ({reason}); retry in {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def priority_for(header: Optional[str], default: str) -> str:
+    """The priority class named by an X-Priority header, or `default` if missing or unknown."""
+    value = (header or "").strip().lower()
+    return value if value in PRIORITIES else default
+
+
+class Ticket:
+    """An admitted request's slot; release() is idempotent, so cleanup paths may both call it."""
+
+    def __init__(self, controller: "AdmissionController", priority: str):
+        self.priority = priority
+        self._controller = controller
+        self._admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._admitted_at)
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded, priority-ordered wait queue and queue-time shedding.
+
+    Runs on the API's event loop; waiters are futures, and a released slot is handed
+    straight to the next waiter, so a request that arrives meanwhile cannot take it.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_wait_s: Dict[str, float]):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self.in_flight = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in PRIORITIES}
+        # Moving average of how long a request holds its slot, for Retry-After
+        self._hold_s = 1.0
+
+    def queue_depth(self, priority: Optional[str] = None) -> int:
+        queues = [self._queues[priority]] if priority else self._queues.values()
+        return sum(1 for queue in queues for waiter in queue if not waiter.done())
+
+    def retry_after(self) -> float:
+        """Seconds until the current queue should have drained, at least 1."""
+        slots = max(1, self.max_concurrency)
+        return max(1.0, math.ceil(self._hold_s * (self.queue_depth() + 1) / slots))
+
+    def _reject(self, priority: str, outcome: str, reason: str) -> Overloaded:
+        ADMISSION_REQUESTS.inc(priority=priority, outcome=outcome)
+        return Overloaded(reason, self.retry_after())
+
+    def _expire(self, waiter: asyncio.Future, priority: str) -> None:
+        if not waiter.done():
+            waiter.set_exception(self._reject(priority, "shed", "waited too long for a slot"))
+
+    async def admit(self, priority: str = "interactive") -> Ticket:
+        """
+        Wait for a slot.
+
+        Args:
+            priority (str): "interactive" or "batch"
+
+        Returns:
+            Ticket: Release it when the request is done
+
+        Raises:
+            Overloaded: The queue is full, the wait exceeded the class's limit (or the
+                request deadline), or a queued batch request was displaced
+        """
+        if self.max_concurrency <= 0:
+            return Ticket(self, priority)
+        if self.in_flight < self.max_concurrency and not self.queue_depth():
+            self.in_flight += 1
+            ADMISSION_WAIT_SECONDS.observe(0.0, priority=priority)
+            ADMISSION_REQUESTS.inc(priority=priority, outcome="admitted")
+            return Ticket(self, priority)
+
+        if self.queue_depth() >= self.max_queue:
+            batch = [waiter for waiter in self._queues["batch"] if not waiter.done()]
+            if priority != "interactive" or not batch:
+                raise self._reject(priority, "rejected", "queue full")
+            batch[-1].set_exception(self._reject("batch", "shed", "displaced by an interactive request"))
+
+        max_wait = self.max_wait_s[priority]
+        left = time_left()
+        if left is not None:
+            max_wait = min(max_wait, left)
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._queues[priority].append(waiter)
+        timer = loop.call_later(max(0.0, max_wait), self._expire, waiter, priority)
+        started = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # Handed a slot just as the caller went away: pass it on
+                self._release(0.0)
+            raise
+        finally:
+            timer.cancel()
+            if waiter in self._queues[priority]:
+                self._queues[priority].remove(waiter)
+        waited = time.monotonic() - started
+        ADMISSION_WAIT_SECONDS.observe(waited, priority=priority)
+        ADMISSION_REQUESTS.inc(priority=priority, outcome="admitted")
+        return Ticket(self, priority)
+
+    def _release(self, held_s: float) -> None:
+        if self.max_concurrency <= 0:
+            return
+        if held_s:
+            self._hold_s = 0.8 * self._hold_s + 0.2 * held_s
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    # The slot moves to the waiter; in_flight is unchanged
+                    waiter.set_result(None)
+                    return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive") -> AsyncIterator[Ticket]:
+        """Hold a slot for the duration of the block (see admit())."""
+        ticket = await self.admit(priority)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current load and limits.
+
+        Returns:
+            dict: {"in_flight", "max_concurrency", "queued": {priority: int}, "max_queue",
+                "max_wait_s": {priority: float}, "hold_s"}
+        """
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queued": {priority: self.queue_depth(priority) for priority in PRIORITIES},
+            "max_queue": self.max_queue,
+            "max_wait_s": dict(self.max_wait_s),
+            "hold_s": round(self._hold_s, 3),
+        }
+
+
+admission = AdmissionController(
+    max_concurrency=ADMISSION_MAX_CONCURRENCY,
+    max_queue=ADMISSION_MAX_QUEUE,
+    max_wait_s={"interactive": ADMISSION_MAX_WAIT_S, "batch": ADMISSION_BATCH_MAX_WAIT_S},
+)
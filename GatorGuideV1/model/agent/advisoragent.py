@@ -1,11 +1,43 @@
+import asyncio
 import json
-from model.config import client, MODEL, logger
-from model.agent.intent import extract_student_intent
-from model.agent.dispatcher import execute_tool
-from model.agent.tools_schema import tools
-from model.agent.tools import get_weather
+import os
+from contextlib import nullcontext
+import jiter
+from pydantic import ValidationError
+from model.config import get_async_client, logger
+from model.metrics import GATE_REJECTIONS, STAGE_SECONDS, TOOL_CALLS, TOOL_SECONDS, TOOL_SELECTIONS, timed
+from model.agent import resilience
+from model.agent.intent import extract_student_intent_async
+from model.agent.dispatcher import ASYNC_TOOL_REGISTRY, execute_tool_async, shared_tool_calls
+from model.agent.prompts import advisor_messages, advisor_request, parse_advisor_response
+from model.agent.resilience import LLM_TIMEOUT_S
+from model.agent.runner import run_sync
+from model.agent.semantic_cache import SEMANTIC_CACHE_ENABLED, response_cache
+from model.agent.serialize import COMPACT_TOOL_RESULTS, serialize_tool_result
+from model.agent.sessions import Session
+from model.agent.usage import FINAL_COMPLETION_RESERVE, check_budget, fit_tool_results, record_usage, track_usage
+from model.agent.tools import SCORECARD_BACKEND, get_weather_batch_async
+from model.agent.tools_schema import OFFERED_TOOLS, tools_for_intent
 from model.schemas.advisorResponse import AdvisorResponse
-from typing import Optional, List, Dict, Any
+from model.schemas.school import School
+from typing import Optional, List, Dict, Any, AsyncContextManager, AsyncIterator, Callable, Tuple
+
+COLLEGE_SEARCH_TOOLS = ["search_colleges", "state_search_colleges"]
+# Upper bound on tool calls from one LLM turn that run at the same time
+MAX_PARALLEL_TOOL_CALLS = int(os.getenv("MAX_PARALLEL_TOOL_CALLS", "4"))
+# Start the tool-selection LLM call alongside intent extraction instead of after it
+SPECULATIVE_TOOL_SELECTION = os.getenv("SPECULATIVE_TOOL_SELECTION", "0") == "1"
+# Warm the Scorecard cache from intent.school_name / intent.state while tools are being selected
+PREFETCH_SCHOOL_SEARCH = os.getenv("PREFETCH_SCHOOL_SEARCH", "0") == "1"
+INTENT_CONFIDENCE_THRESHOLD = 0.5
+# Concurrent advisor runs per /advisor/batch request: default and upper bound
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+PARTIAL_RESPONSE_TEXT = (
+    "I found these schools for you, but I can't write up detailed advice right now "
+    "because the advisor service is temporarily unavailable. Please ask again shortly "
+    "for a full answer."
+)
 
 def safe_json_serialize(obj: Any) -> str:
     """
@@ -34,6 +66,16 @@ def safe_json_serialize(obj: Any) -> str:
         # Fallback: convert to string representation
         return json.dumps({"error": f"Serialization failed: {str(e)}"})
 
+def tool_message_content(tool_name: str, result: Any) -> str:
+    """
+    Render a tool result as the content of its `tool` message.
+
+    Uses the compact tabular serializer (see serialize.py) unless COMPACT_TOOL_RESULTS=0.
+    """
+    if COMPACT_TOOL_RESULTS:
+        return serialize_tool_result(result, tool_name)
+    return safe_json_serialize(result)
+
 def normalize_school_data(school: Dict[str, Any]) -> Dict[str, Any]:
     """
     Transform College Scorecard API flat-key response into nested structure for LLM processing.
@@ -91,6 +133,9 @@ def enrich_schools_with_weather(schools: List[Dict[str, Any]]) -> List[Dict[str,
     Open-Meteo API. Weather data includes temperature and wind speed, providing
     students with insight into the student life experience at each campus.
     
+    All campuses are looked up together via get_weather_batch_async(), so enrichment
+    costs one round trip (or one concurrent fan-out) rather than one call per school.
+    
     Args:
         schools (List[Dict[str, Any]]): List of schools from College Scorecard API with location.lat/location.lon
         
@@ -109,26 +154,40 @@ def enrich_schools_with_weather(schools: List[Dict[str, Any]]) -> List[Dict[str,
         Output: [{"school.name": "UW", "location.lat": 47.6550, "location.lon": -122.3035, 
                    "weather": {"temperature_celsius": 8.5, "wind_speed_kmh": 12.3}}]
     """
-    enriched = []
+    return run_sync(enrich_schools_with_weather_async(schools))
+
+async def enrich_schools_with_weather_async(schools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Async implementation of enrich_schools_with_weather(); see that function for details.
+    """
+    coordinates = []
     for school in schools:
         # College Scorecard API returns flat keys with dots: "location.lat" not {"location": {"lat": ...}}
+        lat = school.get("location.lat")
+        lon = school.get("location.lon")
+        logger.info(f"🔍 School: {school.get('school.name', 'Unknown')}, lat={lat}, lon={lon}")
+        if lat and lon:
+            coordinates.append((lat, lon))
+
+    logger.info(f"🌤️ Fetching weather for {len(set(coordinates))} unique campus locations")
+    weather_by_coord = await get_weather_batch_async(coordinates)
+
+    enriched = []
+    for school in schools:
         lat = school.get("location.lat")
         lon = school.get("location.lon")
         school_name = school.get("school.name", "Unknown")
-        
-        logger.info(f"🔍 School: {school_name}, lat={lat}, lon={lon}")
-        
+
         if lat and lon:
-            try:
-                logger.info(f"🌤️ Fetching weather for {school_name} at ({lat}, {lon})")
-                weather_data = get_weather(latitude=lat, longitude=lon)
+            weather_data = weather_by_coord.get((lat, lon))
+            if weather_data:
                 school["weather"] = {
                     "temperature_celsius": weather_data.get("temperature_2m"),
                     "wind_speed_kmh": weather_data.get("wind_speed_10m"),
                 }
                 logger.info(f"✅ Weather fetched for {school_name}: {school['weather']}")
-            except Exception as e:
-                logger.warning(f"❌ Failed to fetch weather for {school_name}: {e}")
+            else:
+                logger.warning(f"❌ Failed to fetch weather for {school_name}")
                 school["weather"] = None
         else:
             logger.warning(f"⚠️ No coordinates found for {school_name}")
@@ -138,6 +197,82 @@ def enrich_schools_with_weather(schools: List[Dict[str, Any]]) -> List[Dict[str,
     
     return enriched
 
+async def run_tool_call_async(call, semaphore: asyncio.Semaphore) -> Any:
+    """
+    Execute a single LLM tool call, post-processing college search results.
+    
+    College searches are enriched with weather and normalized for the LLM. Any failure
+    (bad arguments, unknown tool, upstream error) is returned as an {"error": ...} payload
+    so it reaches the model as a tool error instead of failing the whole request.
+    
+    Args:
+        call: Tool call object from the assistant message (id, function.name, function.arguments)
+        semaphore (asyncio.Semaphore): Bounds how many tool calls run concurrently
+        
+    Returns:
+        Any: Normalized school list, raw tool result, or {"error": str}
+    """
+    tool_name = call.function.name
+    # Tool names come from the model; keep metric labels to the registered set
+    label = tool_name if tool_name in ASYNC_TOOL_REGISTRY else "unknown"
+    async with semaphore:
+        try:
+            with timed(TOOL_SECONDS, tool=label):
+                result = await execute_tool_async(tool_name, json.loads(call.function.arguments))
+
+            # If this is a college search, enrich with weather and normalize
+            if tool_name in COLLEGE_SEARCH_TOOLS and isinstance(result, list):
+                logger.info(f"🌤️ Enriching {len(result)} schools with weather data")
+                with timed(STAGE_SECONDS, stage="weather_enrichment"):
+                    result = await enrich_schools_with_weather_async(result)
+                # Normalize the data structure for the LLM
+                with timed(STAGE_SECONDS, stage="normalization"):
+                    result = [normalize_school_data(school) for school in result]
+                logger.info(f"📊 Sample normalized result: {result[0] if result else 'empty'}")
+            TOOL_CALLS.inc(tool=label, outcome="ok")
+            return result
+        except Exception as e:
+            logger.warning(f"❌ Tool {tool_name} failed: {e}")
+            TOOL_CALLS.inc(tool=label, outcome="error")
+            return {"error": f"{tool_name} failed: {e}"}
+
+def partial_response(schools: List[Dict[str, Any]]) -> AdvisorResponse:
+    """
+    Answer with the schools found so far when the final LLM call cannot be made.
+
+    Args:
+        schools (List[Dict[str, Any]]): Normalized schools from the searches
+            (see normalize_school_data()); any that do not fit School are left out
+
+    Returns:
+        AdvisorResponse: PARTIAL_RESPONSE_TEXT and the valid schools
+    """
+    valid = []
+    for school in schools:
+        try:
+            valid.append(School.model_validate(school))
+        except ValidationError:
+            continue
+    resilience.RESILIENCE_EVENTS.inc(upstream="openai", event="partial_result")
+    return AdvisorResponse(response=PARTIAL_RESPONSE_TEXT, schools=valid)
+
+async def prefetch_school_search_async(intent) -> None:
+    """
+    Issue the Scorecard search the model is most likely to request, ahead of time.
+    
+    Runs while the tool-selection call is in flight and goes through the dispatcher,
+    so a matching search_colleges / state_search_colleges call either joins the
+    still-running prefetch (single-flight) or is answered from the Scorecard cache.
+    Failures are ignored; the real tool call will retry.
+    """
+    try:
+        if intent.school_name:
+            await execute_tool_async("search_colleges", {"school_name": intent.school_name, "state": intent.state})
+        elif intent.state:
+            await execute_tool_async("state_search_colleges", {"state": intent.state})
+    except Exception as e:
+        logger.info(f"Prefetch skipped: {e}")
+
 def run_advisor_agent(user_input: str) -> Optional[AdvisorResponse]:
     """
     Main advisor agent that interprets student queries and searches for suitable colleges.
@@ -175,72 +310,344 @@ def run_advisor_agent(user_input: str) -> Optional[AdvisorResponse]:
             ]
         )
     """
+    return run_sync(run_advisor_agent_async(user_input))
+
+async def run_advisor_agent_async(
+    user_input: str, session: Optional[Session] = None
+) -> Optional[AdvisorResponse]:
+    """
+    Async implementation of run_advisor_agent(); see that function for details.
 
-    intent = extract_student_intent(user_input)
-    if intent.confidence_score < 0.5:
-        logger.warning(f"Low confidence intent: {intent.confidence_score}")
+    Every LLM call and tool call is awaited, so a single event loop can serve many
+    advisor requests while they wait on OpenAI, College Scorecard and Open-Meteo.
+    With a session, the query is answered as a follow-up (see stream_advisor_agent()).
+    """
+    events = stream_advisor_agent(user_input, stream_advice=False, session=session)
+    try:
+        async for event, data in events:
+            if event == "result":
+                return data
         return None
-    logger.info(f"✅ Intent recognized: {intent.intent} with {intent.confidence_score:.0%} confidence")
-    messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are a college advisor helping students find suitable colleges. "
-                "When students mention their GPA, SAT scores, or test scores, USE THOSE as filters in your search. "
-                "For example: '1600 SAT' → use sat_score_range parameter if searching by state. "
-                "When students mention 'dream schools', 'reach schools', 'top universities', or 'competitive', "
-                "use acceptance_rate_range='0..0.5' (0-50% acceptance) to cast a wide net. "
-                "ONLY use very restrictive ranges like '0..0.2' if they specifically say 'most selective' or 'hardest to get into'. "
-                "School abbreviations: UW/UWash = University of Washington, UCLA, MIT, Stanford, etc. "
-                "Each school result includes: name, location, acceptance rate, tuition, and current weather. "
-                "Provide comprehensive advice considering all factors including student's stated qualifications."
-            ),
-        },
-        {"role": "user", "content": user_input},
-    ]
-
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=messages,
-        tools=tools,
-    )
-
-    assistant_msg = response.choices[0].message
-    college_results = []
-
-    if assistant_msg.tool_calls:
-        messages.append(assistant_msg)
-
-        for call in assistant_msg.tool_calls:
-            result = execute_tool(
-                call.function.name,
-                json.loads(call.function.arguments)
+    finally:
+        await events.aclose()
+
+async def stream_advisor_agent(
+    user_input: str, stream_advice: bool = True, session: Optional[Session] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the advisor pipeline, yielding (event, data) pairs as each stage completes.
+    
+    Lets callers show progress long before the final answer exists: school cards are
+    available as soon as each search is normalized, and the advice text streams while
+    the final LLM call is still generating it.
+    
+    Args:
+        user_input (str): Student's natural language query about colleges
+        stream_advice (bool): Stream the final LLM call and emit "token" events;
+            if False the final call is a single parse request
+        session (Optional[Session]): Conversation to continue. Its history is sent with
+            the query, its earlier tool results are reused, and the turn is added to it.
+            Turns of one session run one at a time
+        
+    Yields:
+        Tuple[str, Any]: One of
+            - ("intent", dict): StudentIntent fields, once the intent gate passes
+            - ("tools", {"tools": [names]}): Tool calls about to run
+            - ("school", dict): One normalized school from a finished search
+            - ("token", {"text": str}): Next piece of the advice text
+            - ("result", Optional[AdvisorResponse]): Always last; None if intent
+              confidence is too low, and partial_response() if the final LLM call
+              fails after searches returned schools
+            
+    Example:
+        >>> async for event, data in stream_advisor_agent("Show me MIT"):
+        ...     print(event)
+        intent
+        tools
+        school
+        token
+        ...
+        result
+    """
+
+    selection_task = prefetch_task = None
+    tool_tasks: List[asyncio.Task] = []
+    locked = False
+
+    try:
+        history: List[Dict[str, str]] = []
+        if session is not None:
+            await session.lock.acquire()
+            locked = True
+            history = session.history_messages()
+
+        # Static prompt first, then history, then this turn (see prompts.py)
+        messages = advisor_messages(user_input, history)
+
+        # The intent narrows the tools offered (tools_for_intent()), but otherwise the
+        # tool-selection call does not depend on it. In speculative mode both LLM calls
+        # start together with every tool exposed, and the selection is discarded if the
+        # gate fails, saving one LLM round trip on the happy path.
+        async def select_tools(tool_schemas):
+            check_budget("tool_selection", messages)
+            with timed(STAGE_SECONDS, stage="tool_selection"):
+                response = await resilience.call(
+                    "openai",
+                    lambda timeout: get_async_client().chat.completions.create(
+                        **advisor_request(messages, tool_schemas=tool_schemas), timeout=timeout
+                    ),
+                    timeout=LLM_TIMEOUT_S,
+                )
+            record_usage("tool_selection", response.usage)
+            return response
+
+        if SPECULATIVE_TOOL_SELECTION:
+            selection_task = asyncio.create_task(select_tools(OFFERED_TOOLS))
+
+        with timed(STAGE_SECONDS, stage="intent"):
+            intent = await extract_student_intent_async(
+                session.intent_context(user_input) if session else user_input
             )
+        if intent.confidence_score < INTENT_CONFIDENCE_THRESHOLD:
+            logger.warning(f"Low confidence intent: {intent.confidence_score}")
+            GATE_REJECTIONS.inc()
+            if selection_task:
+                logger.info("🗑️ Discarded speculative tool selection")
+            yield "result", None
+            return
+        logger.info(f"✅ Intent recognized: {intent.intent} with {intent.confidence_score:.0%} confidence")
+        yield "intent", intent.model_dump()
 
-            # If this is a college search, enrich with weather and normalize
-            if call.function.name in ["search_colleges", "state_search_colleges"]:
-                if isinstance(result, list):
-                    logger.info(f"🌤️ Enriching {len(result)} schools with weather data")
-                    result = enrich_schools_with_weather(result)
-                    # Normalize the data structure for the LLM
-                    result = [normalize_school_data(school) for school in result]
-                    college_results.extend(result)
-                    logger.info(f"📊 Sample normalized result: {result[0] if result else 'empty'}")
+        # A follow-up's answer depends on the conversation, not just the query
+        use_cache = SEMANTIC_CACHE_ENABLED and not history
+        if use_cache:
+            cached = response_cache.get(user_input, intent)
+            if cached is not None:
+                if session is not None:
+                    session.end_turn(user_input, cached)
+                yield "result", cached
+                return
+
+        if PREFETCH_SCHOOL_SEARCH and SCORECARD_BACKEND != "local":
+            prefetch_task = asyncio.create_task(prefetch_school_search_async(intent))
+
+        exposed = OFFERED_TOOLS if selection_task else tools_for_intent(intent)
+        tool_calls = []
+        if exposed:
+            response = await selection_task if selection_task else await select_tools(exposed)
+            assistant_msg = response.choices[0].message
+            TOOL_SELECTIONS.inc(outcome="tool_calls" if assistant_msg.tool_calls else "answered")
+
+            if not assistant_msg.tool_calls:
+                # Same response schema as the final call, so an answer without tools is already final
+                parsed = parse_advisor_response(assistant_msg.content)
+                if stream_advice and parsed is not None:
+                    yield "token", {"text": parsed.response}
+                if use_cache and parsed is not None:
+                    response_cache.set(user_input, intent, parsed)
+                if session is not None:
+                    session.end_turn(user_input, parsed)
+                yield "result", parsed
+                return
+
+            tool_calls = assistant_msg.tool_calls
+            messages.append(assistant_msg)
+            yield "tools", {"tools": [call.function.name for call in tool_calls]}
+        else:
+            # Nothing to look up: the final call is the only advisor call
+            TOOL_SELECTIONS.inc(outcome="skipped")
+            logger.info(f"⏭️ No tools for {intent.intent}; skipping tool selection")
+
+        college_results = []
+        tool_failed = False
+
+        # Independent tool calls from one turn run concurrently; schools are emitted as
+        # each call finishes, while messages keep call order
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_TOOL_CALLS)
+
+        async def indexed(i, call):
+            return i, await run_tool_call_async(call, semaphore)
+
+        # Tasks copy the context here, so a session's earlier results are reused
+        with shared_tool_calls(session.tool_calls) if session else nullcontext():
+            tool_tasks = [asyncio.create_task(indexed(i, call)) for i, call in enumerate(tool_calls)]
+        results: List[Any] = [None] * len(tool_tasks)
+        for finished in asyncio.as_completed(tool_tasks):
+            i, result = await finished
+            results[i] = result
+            if tool_calls[i].function.name in COLLEGE_SEARCH_TOOLS and isinstance(result, list):
+                for school in result:
+                    yield "school", school
+
+        def render(i: int, result: Any) -> str:
+            return tool_message_content(tool_calls[i].function.name, result)
+
+        # Under a token budget, drop the lowest-ranked rows rather than overflow the final call
+        results = fit_tool_results(messages, results, render)
+        for i, (call, result) in enumerate(zip(tool_calls, results)):
+            if call.function.name in COLLEGE_SEARCH_TOOLS and isinstance(result, list):
+                college_results.extend(result)
+            if isinstance(result, dict) and "error" in result:
+                tool_failed = True
 
-            # Serialize safely to JSON
-            result_json = safe_json_serialize(result)
             messages.append(
                 {
                     "role": "tool",
                     "tool_call_id": call.id,
-                    "content": result_json,
+                    "content": render(i, result),
                 }
             )
 
-    final = client.beta.chat.completions.parse(
-        model=MODEL,
-        messages=messages,
-        response_format=AdvisorResponse,
-    )
+        check_budget("final_parse", messages, reserve=FINAL_COMPLETION_RESERVE)
+        try:
+            with timed(STAGE_SECONDS, stage="final_parse"):
+                if stream_advice:
+                    emitted = 0
+                    content, usage = "", None
+                    # Never hedged: a duplicate stream would have to be drained or closed
+                    stream = await resilience.call(
+                        "openai",
+                        lambda timeout: get_async_client().chat.completions.create(
+                            **advisor_request(messages, final=True, tool_schemas=exposed),
+                            stream=True,
+                            stream_options={"include_usage": True},
+                            timeout=timeout,
+                        ),
+                        timeout=LLM_TIMEOUT_S,
+                        hedge=False,
+                    )
+                    async with stream:
+                        # Bounded like a non-streamed attempt, however slowly chunks arrive
+                        async for chunk in resilience.bounded(stream, LLM_TIMEOUT_S):
+                            usage = chunk.usage or usage
+                            if not chunk.choices or not chunk.choices[0].delta.content:
+                                continue
+                            content += chunk.choices[0].delta.content
+                            # Parse the JSON so far, keeping the unterminated "response" string
+                            try:
+                                partial = jiter.from_json(content.encode(), partial_mode="trailing-strings")
+                            except ValueError:
+                                continue
+                            text = partial.get("response") if isinstance(partial, dict) else None
+                            if isinstance(text, str) and len(text) > emitted:
+                                yield "token", {"text": text[emitted:]}
+                                emitted = len(text)
+                else:
+                    final = await resilience.call(
+                        "openai",
+                        lambda timeout: get_async_client().chat.completions.create(
+                            **advisor_request(messages, final=True, tool_schemas=exposed), timeout=timeout
+                        ),
+                        timeout=LLM_TIMEOUT_S,
+                    )
+                    content, usage = final.choices[0].message.content, final.usage
+        except Exception as e:
+            if not college_results:
+                raise
+            # The searches already succeeded, so the schools are still worth returning
+            logger.warning(f"⚠️ Final advisor call failed ({e!r}); returning {len(college_results)} schools without advice")
+            parsed = partial_response(college_results)
+            if session is not None:
+                session.end_turn(user_input, parsed)
+            yield "result", parsed
+            return
+        record_usage("final_parse", usage)
+
+        parsed = parse_advisor_response(content)
+        # Answers built around a failed tool call are not worth repeating to the next student
+        if use_cache and parsed is not None and not tool_failed:
+            response_cache.set(user_input, intent, parsed)
+        if session is not None:
+            session.end_turn(user_input, parsed)
+        yield "result", parsed
+    finally:
+        # Runs on early exit too (e.g. a streaming client disconnected)
+        for task in [selection_task, prefetch_task, *tool_tasks]:
+            if task and not task.done():
+                task.cancel()
+        if locked:
+            session.lock.release()
+
+async def run_advisor_batch_async(
+    inputs: List[str],
+    concurrency: Optional[int] = None,
+    token_budget: Optional[int] = None,
+    deadline_s: Optional[float] = None,
+    slot: Optional[Callable[[], AsyncContextManager]] = None,
+) -> AsyncIterator[Tuple[int, Optional[AdvisorResponse], Optional[Exception], Dict[str, Any]]]:
+    """
+    Run many advisor queries with bounded concurrency, yielding results as they complete.
+    
+    Identical inputs (after trimming whitespace) are answered once and fanned out to
+    every position they appear at, and identical tool calls across the batch share one
+    upstream call (see dispatcher.shared_tool_calls()). A failing item is reported with
+    its exception and does not affect the rest of the batch.
+    
+    Args:
+        inputs (List[str]): Student queries, e.g. canned profiles for a nightly job
+        concurrency (Optional[int]): Queries in flight at once (default BATCH_CONCURRENCY,
+            capped at BATCH_MAX_CONCURRENCY)
+        token_budget (Optional[int]): Per-query token budget (default usage.TOKEN_BUDGET)
+        deadline_s (Optional[float]): Per-query deadline in seconds, counted from when the
+            query starts rather than from when the batch was submitted (default none)
+        slot (Optional[Callable[[], AsyncContextManager]]): Held around each query, e.g.
+            an admission-control slot (model/admission.py); its errors fail that query only
+        
+    Yields:
+        Tuple[int, Optional[AdvisorResponse], Optional[Exception], Dict[str, Any]]: (index
+            into inputs, response or None, exception or None, token usage summary), in
+            completion order; duplicates of an input report the usage of its single run
+            
+    Example:
+        >>> async for index, result, error, usage in run_advisor_batch_async(["MIT", "MIT", "UCLA"]):
+        ...     print(index, error or result.response[:20])
+        0 MIT is one of the wo
+        1 MIT is one of the wo
+        2 UCLA is a public res
+    """
+    concurrency = max(1, min(concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    positions: Dict[str, List[int]] = {}
+    for index, text in enumerate(inputs):
+        positions.setdefault(text.strip(), []).append(index)
+
+    pending: asyncio.Queue = asyncio.Queue()
+    for text in positions:
+        pending.put_nowait(text)
+    completed: asyncio.Queue = asyncio.Queue()
+
+    async def run(text: str) -> Optional[AdvisorResponse]:
+        if slot is None:
+            return await run_advisor_agent_async(text)
+        async with slot():
+            return await run_advisor_agent_async(text)
+
+    async def worker() -> None:
+        while not pending.empty():
+            text = pending.get_nowait()
+            result, error, usage = None, None, {}
+            try:
+                with track_usage(token_budget) as tracker, resilience.deadline(deadline_s):
+                    try:
+                        result = await run(text)
+                    finally:
+                        usage = tracker.summary()
+            except Exception as e:
+                logger.warning(f"❌ Batch item failed: {e}")
+                error = e
+            finally:
+                # Every input must produce a line, or the consumer below waits forever
+                completed.put_nowait((text, result, error, usage))
 
-    return final.choices[0].message.parsed
+    logger.info(f"📦 Batch of {len(inputs)} inputs ({len(positions)} unique), concurrency {concurrency}")
+    # Workers copy the context here, so they all see the same shared tool results
+    with shared_tool_calls() as shared:
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(positions)))]
+    try:
+        for _ in range(len(positions)):
+            text, result, error, usage = await completed.get()
+            for index in positions[text]:
+                yield index, result, error, usage
+        logger.info(f"📦 Batch done: {shared.calls} tool calls run, {shared.shared} reused")
+    finally:
+        for task in workers:
+            task.cancel()
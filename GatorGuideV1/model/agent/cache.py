@@ -0,0 +1,122 @@
+"""
+In-process response caches for upstream tool results.
+
+TTLCache combines a time-to-live with LRU eviction under both an entry-count and an
+approximate memory bound, and counts hits, misses and evictions so cache behaviour
+can be inspected via the API's /status endpoint.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate the memory footprint of a JSON-like value by its serialized length.
+
+    Objects that are not JSON-like (e.g. sessions) can report their own via estimated_size().
+    """
+    if hasattr(value, "estimated_size"):
+        return value.estimated_size()
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class TTLCache:
+    """
+    Thread-safe TTL + LRU cache.
+
+    Entries expire `ttl_s` seconds after they are stored. When the cache holds more than
+    `max_entries` items or more than `max_bytes` of (estimated) data, least recently used
+    entries are evicted first.
+
+    Example:
+        >>> cache = TTLCache("scorecard", ttl_s=3600, max_entries=100, max_bytes=1_000_000)
+        >>> cache.set(("search_colleges", "mit"), [{"school.name": "MIT"}])
+        >>> cache.get(("search_colleges", "mit"))
+        [{'school.name': 'MIT'}]
+    """
+
+    def __init__(self, name: str, ttl_s: float, max_entries: int, max_bytes: int):
+        self.name = name
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        """Store `value` under `key`, evicting least recently used entries if over budget."""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl_s if ttl_s is None else ttl_s)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache counters.
+
+        Returns:
+            Dict[str, Any]: entries, bytes, max_entries, max_bytes, hits, misses,
+                evictions, expirations and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,291 @@
+"""
+Vectorized columnar filter engine for range searches over the local Scorecard store.
+
+The numeric Scorecard columns are exported from the SQLite store to contiguous .npy
+files and opened memory-mapped, so every uvicorn worker shares one copy of the data
+through the page cache and starts without loading anything. Any number of
+"MIN..MAX" range predicates are evaluated as vectorized boolean masks, and the top-k
+matching rows are selected by a sort key with argpartition.
+
+Usage:
+    python -m model.agent.columnar build
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from model.config import logger
+from model.agent.scorecard_store import FIELDS, SCORECARD_DB_PATH, parse_range
+
+COLUMNAR_DIR = os.getenv(
+    "SCORECARD_COLUMNAR_DIR", os.path.join(os.path.dirname(SCORECARD_DB_PATH), "columnar")
+)
+
+# Dotted fields exported as float64 columns (NaN = missing)
+NUMERIC_FIELDS = [
+    "location.lat",
+    "location.lon",
+    "latest.admissions.admission_rate.overall",
+    "latest.admissions.sat_scores.average.overall",
+    "latest.cost.tuition.in_state",
+    "latest.cost.tuition.out_of_state",
+    "latest.earnings.6_yrs_after_entry.median",
+]
+
+# Pseudo sort key: alphabetical position of the school name
+NAME_SORT_KEY = "school.name"
+
+
+def _row_count(db_path: str) -> int:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM schools").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def build(db_path: str = SCORECARD_DB_PATH, out_dir: str = COLUMNAR_DIR) -> int:
+    """
+    Export the SQLite store's numeric columns to memory-mappable .npy files.
+
+    Args:
+        db_path (str): Scorecard store built by scorecard_store.ingest()
+        out_dir (str): Directory for the .npy files and manifest.json
+
+    Returns:
+        int: Number of rows exported
+    """
+    columns = ["id", "state", "name_key"] + [FIELDS[f][0] for f in NUMERIC_FIELDS]
+    source_mtime_ns = os.stat(db_path).st_mtime_ns
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(f"SELECT {', '.join(columns)} FROM schools ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+    os.makedirs(out_dir, exist_ok=True)
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    states = np.array([(row[1] or "").encode() for row in rows], dtype="S2")
+    name_order = np.argsort(np.array([row[2] for row in rows], dtype=object), kind="stable")
+    name_rank = np.empty(len(rows), dtype=np.float64)
+    name_rank[name_order] = np.arange(len(rows))
+
+    np.save(os.path.join(out_dir, "id.npy"), ids)
+    np.save(os.path.join(out_dir, "state.npy"), states)
+    np.save(os.path.join(out_dir, "name_rank.npy"), name_rank)
+    for i, field in enumerate(NUMERIC_FIELDS, start=3):
+        values = np.array([np.nan if row[i] is None else row[i] for row in rows], dtype=np.float64)
+        np.save(os.path.join(out_dir, f"{FIELDS[field][0]}.npy"), values)
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(
+            {
+                "rows": len(rows),
+                "fields": NUMERIC_FIELDS,
+                "source": os.path.abspath(db_path),
+                "source_mtime_ns": source_mtime_ns,
+            },
+            f,
+        )
+    logger.info(f"🧮 Exported {len(rows)} rows to columnar store {out_dir}")
+    return len(rows)
+
+
+class ColumnarEngine:
+    """
+    Memory-mapped column arrays with vectorized range filtering and top-k selection.
+
+    Example:
+        >>> engine = ColumnarEngine(COLUMNAR_DIR)
+        >>> engine.top_k(
+        ...     state="CA",
+        ...     ranges={"latest.admissions.admission_rate.overall": "0..0.2"},
+        ...     sort_by="latest.admissions.admission_rate.overall",
+        ...     k=5,
+        ... )
+        array([243744, 110404, ...])   # UNITIDs, most selective first
+    """
+
+    def __init__(self, directory: str = COLUMNAR_DIR):
+        with open(os.path.join(directory, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.ids = np.load(os.path.join(directory, "id.npy"), mmap_mode="r")
+        self.states = np.load(os.path.join(directory, "state.npy"), mmap_mode="r")
+        self.columns = {NAME_SORT_KEY: np.load(os.path.join(directory, "name_rank.npy"), mmap_mode="r")}
+        for field in self.manifest["fields"]:
+            self.columns[field] = np.load(os.path.join(directory, f"{FIELDS[field][0]}.npy"), mmap_mode="r")
+        self._checked_mtime_ns: Optional[int] = None
+        self._current = False
+
+    def is_current(self, db_path: str = SCORECARD_DB_PATH) -> bool:
+        """
+        True if the store still has the modification time and row count the columns were
+        built from. After a re-ingest the columns would return stale or unknown ids.
+        """
+        try:
+            mtime_ns = os.stat(db_path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime_ns != self._checked_mtime_ns:
+            self._checked_mtime_ns = mtime_ns
+            self._current = (
+                mtime_ns == self.manifest.get("source_mtime_ns") and _row_count(db_path) == self.manifest["rows"]
+            )
+            if not self._current:
+                logger.warning(
+                    f"⚠️ Columnar store is out of date with {db_path}; using SQLite until "
+                    "python -m model.agent.columnar build is rerun"
+                )
+        return self._current
+
+    def mask(self, state: Optional[str] = None, ranges: Optional[Dict[str, str]] = None) -> np.ndarray:
+        """
+        Evaluate a state predicate plus any number of range predicates as one boolean mask.
+
+        Missing values (NaN) never satisfy a range, matching the Scorecard API.
+
+        Raises:
+            KeyError: If a range field is not a numeric column
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        if state:
+            mask &= self.states == str(state).strip().upper().encode()
+        for field, value in (ranges or {}).items():
+            column = self.columns[field]
+            low, high = parse_range(value)
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+            if low is None and high is None:
+                mask &= ~np.isnan(column)
+        return mask
+
+    def top_k(
+        self,
+        state: Optional[str] = None,
+        ranges: Optional[Dict[str, str]] = None,
+        sort_by: str = NAME_SORT_KEY,
+        descending: bool = False,
+        k: int = 20,
+    ) -> np.ndarray:
+        """
+        Return the ids of the top-k matching rows ordered by `sort_by`.
+
+        Rows with a missing sort value are placed last.
+
+        Args:
+            state (Optional[str]): Two-letter state code filter
+            ranges (Optional[Dict[str, str]]): Dotted field -> "MIN..MAX" range
+            sort_by (str): Numeric dotted field, or "school.name" for alphabetical order
+            descending (bool): Sort largest first
+            k (int): Maximum rows to return
+
+        Returns:
+            np.ndarray: UNITIDs of the selected rows, in sort order
+        """
+        matches = np.flatnonzero(self.mask(state, ranges))
+        keys = np.asarray(self.columns[sort_by][matches], dtype=np.float64)
+        if descending:
+            keys = -keys
+        keys = np.where(np.isnan(keys), np.inf, keys)
+        if k < len(matches):
+            part = np.argpartition(keys, k - 1)[:k]
+            order = part[np.argsort(keys[part], kind="stable")]
+        else:
+            order = np.argsort(keys, kind="stable")
+        return np.asarray(self.ids[matches[order]])
+
+
+_engine: Optional[ColumnarEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Optional[ColumnarEngine]:
+    """
+    Return the process-wide engine, or None if the columnar files have not been built
+    or no longer match the SQLite store.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None and os.path.exists(os.path.join(COLUMNAR_DIR, "manifest.json")):
+            _engine = ColumnarEngine(COLUMNAR_DIR)
+        if _engine is None or not _engine.is_current(SCORECARD_DB_PATH):
+            return None
+    return _engine
+
+
+def parse_sort(value: Optional[str]) -> tuple:
+    """
+    Parse a Scorecard API sort parameter ("field:asc" / "field:desc").
+
+    Example:
+        >>> parse_sort("latest.admissions.admission_rate.overall:desc")
+        ('latest.admissions.admission_rate.overall', True)
+    """
+    if not value:
+        return NAME_SORT_KEY, False
+    field, _, direction = str(value).partition(":")
+    return field.strip(), direction.strip().lower() == "desc"
+
+
+def search(params: Dict[str, Any]) -> Optional[List[int]]:
+    """
+    Answer the filter part of a Scorecard-style query with the columnar engine.
+
+    Returns None when the engine cannot answer it (files not built or out of date, name
+    filters, or a range/sort field without a numeric column), so the caller can fall back
+    to SQLite.
+
+    Args:
+        params (Dict[str, Any]): Scorecard query parameters
+
+    Returns:
+        Optional[List[int]]: Matching UNITIDs in result order
+    """
+    engine = get_engine()
+    if engine is None or params.get("school.name"):
+        return None
+    ranges = {
+        name[: -len("__range")]: value
+        for name, value in params.items()
+        if name.endswith("__range") and value not in (None, "")
+    }
+    sort_by, descending = parse_sort(params.get("sort"))
+    if any(field not in engine.columns for field in list(ranges) + [sort_by]):
+        return None
+
+    started = time.perf_counter()
+    ids = engine.top_k(
+        state=params.get("school.state"),
+        ranges=ranges,
+        sort_by=sort_by,
+        descending=descending,
+        k=int(params.get("per_page") or 20),
+    )
+    logger.info(f"🧮 Columnar filter matched {len(ids)} rows in {(time.perf_counter() - started) * 1000:.2f}ms")
+    return ids.tolist()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the columnar Scorecard filter engine")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = subcommands.add_parser("build", help="Export numeric columns from the SQLite store")
+    build_cmd.add_argument("--db", default=SCORECARD_DB_PATH, help="Scorecard store path")
+    build_cmd.add_argument("--out", default=COLUMNAR_DIR, help="Output directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build(args.db, args.out)
+        print(f"Exported {count} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
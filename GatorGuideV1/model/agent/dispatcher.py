@@ -6,11 +6,29 @@ This module manages tool routing and execution. When Claude decides to use a too
 and returns results back to the agent for further processing.
 """
 
+import asyncio
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Iterator, Optional
+
 from model.agent.tools import (
+    RANGE_FIELDS,
+    canonical_range,
+    filter_rows,
+    range_contains,
     search_colleges,
+    search_colleges_async,
     state_search_colleges,
+    state_search_colleges_async,
     get_weather,
+    get_weather_async,
 )
+from model.agent.resilience import REQUEST_DEADLINE_S
+from model.agent.runner import run_sync
+from model.agent.singleflight import SingleFlight, run_detached, wait_shared
 from model.config import logger
 
 TOOL_REGISTRY = {
@@ -19,6 +37,164 @@ TOOL_REGISTRY = {
     "get_weather": get_weather,
 }
 
+ASYNC_TOOL_REGISTRY = {
+    "search_colleges": search_colleges_async,
+    "state_search_colleges": state_search_colleges_async,
+    "get_weather": get_weather_async,
+}
+
+# Limit on one shared tool call, which runs outside any single request's deadline
+TOOL_FLIGHT_TIMEOUT_S = float(os.getenv("TOOL_FLIGHT_TIMEOUT_S", str(REQUEST_DEADLINE_S or 60)))
+
+# Concurrent identical tool calls share one upstream call (see /status "single_flight")
+tool_flights = SingleFlight("tools", timeout_s=TOOL_FLIGHT_TIMEOUT_S)
+
+class SharedToolCalls:
+    """
+    Tool results shared by every request in one batch or session, keyed by tool_call_key().
+
+    Args:
+        ttl_s (Optional[float]): Seconds a result may be reused (None = as long as the
+            batch or session lives)
+    """
+
+    def __init__(self, ttl_s: Optional[float] = None):
+        self.futures: Dict[Hashable, asyncio.Future] = {}
+        self.ttl_s = ttl_s
+        self._expires: Dict[Hashable, float] = {}
+        self.calls = 0
+        self.shared = 0
+        self.filtered = 0
+
+    def get(self, key: Hashable) -> Optional[asyncio.Future]:
+        """The stored call for `key`, unless it has expired (then it is dropped)."""
+        self.expire()
+        return self.futures.get(key)
+
+    def put(self, key: Hashable, future: asyncio.Future) -> None:
+        self.futures[key] = future
+        if self.ttl_s:
+            self._expires[key] = time.monotonic() + self.ttl_s
+
+    def discard(self, key: Hashable) -> None:
+        self.futures.pop(key, None)
+        self._expires.pop(key, None)
+
+    def expire(self) -> None:
+        """Drop results older than ttl_s."""
+        now = time.monotonic()
+        for key in [k for k, ends in self._expires.items() if ends <= now]:
+            self.discard(key)
+
+    def narrowed(self, key: tuple) -> Optional[list]:
+        """
+        Answer a state_search_colleges() call by filtering the rows of an earlier one.
+
+        A follow-up like "what about cheaper ones?" repeats an earlier search with a
+        narrower range. If a stored search for the same state and school name had ranges
+        that contain all of the new ones, its rows are filtered locally instead of asking
+        the Scorecard API again. This is only done when the stored search returned all of
+        its matches (fewer rows than its limit); a truncated one may lack rows the new
+        search would find.
+
+        Returns:
+            Optional[list]: The filtered rows (at most the new call's limit), or None
+        """
+        tool_name, args = key
+        if tool_name != "state_search_colleges":
+            return None
+        args = dict(args)
+        ranges = {name: args.pop(name, None) for name in RANGE_FIELDS}
+        limit = int(args.pop("limit", 0))
+        self.expire()
+        for (stored_tool, stored_args), future in self.futures.items():
+            if stored_tool != tool_name or not future.done() or future.cancelled() or future.exception():
+                continue
+            stored_args = dict(stored_args)
+            stored_ranges = {name: stored_args.pop(name, None) for name in RANGE_FIELDS}
+            stored_limit = int(stored_args.pop("limit", 0))
+            if stored_args != args or not all(range_contains(stored_ranges[n], ranges[n]) for n in RANGE_FIELDS):
+                continue
+            rows = future.result()
+            if not isinstance(rows, list) or len(rows) >= stored_limit:
+                continue
+            return filter_rows(rows, ranges)[:limit]
+        return None
+
+
+_shared_tool_calls: ContextVar[Optional[SharedToolCalls]] = ContextVar("shared_tool_calls", default=None)
+
+
+def tool_call_key(tool_name: str, args: dict) -> tuple:
+    """
+    Build a key under which equivalent tool calls compare equal.
+    
+    Omitted arguments take the tool's defaults, strings are case-folded with whitespace
+    collapsed, "MIN..MAX" ranges canonicalized, numbers compared by value, and
+    None-valued arguments dropped.
+    
+    Example:
+        >>> tool_call_key("state_search_colleges", {"state": "wa ", "acceptance_rate_range": "0.0..0.50"})
+        ('state_search_colleges', (('acceptance_rate_range', '0..0.5'), ('limit', 5.0), ('state', 'wa')))
+    """
+    tool = ASYNC_TOOL_REGISTRY.get(tool_name)
+    if tool is not None:
+        try:
+            bound = inspect.signature(tool).bind(**args)
+            bound.apply_defaults()
+            args = bound.arguments
+        except TypeError:
+            pass  # Invalid arguments; the call itself will raise
+    key = []
+    for name, value in args.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = str(value)
+        elif isinstance(value, (int, float)):
+            value = float(value)
+        elif name.endswith("_range"):
+            value = canonical_range(value)
+        else:
+            value = " ".join(str(value).split()).casefold()
+        key.append((name, value))
+    return tool_name, tuple(sorted(key))
+
+
+@contextmanager
+def shared_tool_calls(shared: Optional[SharedToolCalls] = None) -> Iterator[SharedToolCalls]:
+    """
+    Share tool results between all tasks created inside this block.
+    
+    Tasks copy the current context when they are created, so requests started within
+    the block run each distinct tool call once and reuse its result, even after the
+    block exits. Pass an existing SharedToolCalls (e.g. a conversation session's) to
+    keep reusing results across blocks. Failed calls are not shared.
+    
+    Example:
+        >>> with shared_tool_calls() as shared:
+        ...     tasks = [asyncio.create_task(run_advisor_agent_async(q)) for q in queries]
+        >>> await asyncio.gather(*tasks)
+        >>> shared.shared
+        12
+    """
+    shared = SharedToolCalls() if shared is None else shared
+    token = _shared_tool_calls.set(shared)
+    try:
+        yield shared
+    finally:
+        _shared_tool_calls.reset(token)
+
+
+def _copy_result(result: Any) -> Any:
+    # Search results are enriched in place by each caller
+    if isinstance(result, list):
+        return [dict(row) if isinstance(row, dict) else row for row in result]
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
 def execute_tool(tool_name: str, args: dict):
     """
     Execute a registered tool with provided arguments.
@@ -48,4 +224,56 @@ def execute_tool(tool_name: str, args: dict):
         logger.error(f"Unknown tool: {tool_name}")
         raise ValueError(tool_name)
 
-    return TOOL_REGISTRY[tool_name](**args)
\ No newline at end of file
+    # Same path as the async pipeline, so sync callers are coalesced too
+    return run_sync(execute_tool_async(tool_name, args))
+
+async def execute_tool_async(tool_name: str, args: dict):
+    """
+    Async counterpart of execute_tool(), dispatching to ASYNC_TOOL_REGISTRY.
+
+    Used by the async agent pipeline so upstream HTTP calls do not block the event loop.
+    Concurrent equivalent calls (same tool_call_key()) share one in-flight upstream
+    call via tool_flights, and inside shared_tool_calls() (e.g. a batch or a
+    conversation session) equivalent calls run once even when they are not concurrent.
+
+    Raises:
+        ValueError: If tool_name is not registered
+    """
+
+    if tool_name not in ASYNC_TOOL_REGISTRY:
+        logger.error(f"Unknown tool: {tool_name}")
+        raise ValueError(tool_name)
+
+    key = tool_call_key(tool_name, args)
+
+    def call():
+        return tool_flights.do(key, lambda: ASYNC_TOOL_REGISTRY[tool_name](**args), label=tool_name)
+
+    shared = _shared_tool_calls.get()
+    if shared is None:
+        return _copy_result(await call())
+
+    future = shared.get(key)
+    if future is None:
+        rows = shared.narrowed(key)
+        if rows is not None:
+            shared.filtered += 1
+            logger.info(f"♻️ Answered {tool_name} by filtering earlier results ({len(rows)} rows)")
+            return _copy_result(rows)
+        shared.calls += 1
+        # Not tied to this request's deadline; each request waits up to its own
+        future = run_detached(call())
+        shared.put(key, future)
+    else:
+        shared.shared += 1
+        logger.info(f"♻️ Reusing shared result for {tool_name}")
+    try:
+        # Shielded so one cancelled request does not cancel the call for the others
+        result = await wait_shared(future)
+    except Exception:
+        # Let a later request retry rather than reuse the failure (not if only this
+        # request's deadline passed; the call is still running for the others)
+        if future.done() and shared.futures.get(key) is future:
+            shared.discard(key)
+        raise
+    return _copy_result(result)
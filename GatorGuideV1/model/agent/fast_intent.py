@@ -0,0 +1,424 @@
+"""
+Local fast-path intent classifier.
+
+Most advisor traffic is obvious ("colleges in Texas under 30% acceptance", "show me
+MIT") and does not need an LLM round trip to classify. classify_intent() combines a
+rules layer (state names/codes, school aliases from the name index, college keywords)
+with an optional multinomial Naive Bayes model trained on logged LLM labels, and
+returns a StudentIntent only when its confidence clears FAST_INTENT_THRESHOLD.
+Everything else falls back to the LLM in intent.py, whose labels can be logged to
+INTENT_LOG_PATH for the next training run.
+
+A rule's confidence is its measured precision: how often the LLM agreed with the
+rule on queries where it fired, counted in the trained model file and on every LLM
+fallback since startup. It is the Wilson lower bound of that rate, so a rule needs
+about two dozen agreeing labels (and no disagreements) before it clears 0.85, and a
+rule the LLM often overrules never skips it.
+
+Usage:
+    python -m model.agent.fast_intent train intent_log.jsonl
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from model.config import logger
+from model.agent.name_index import get_name_index, normalize_name
+from model.schemas.studentIntent import StudentIntent
+
+FAST_INTENT_ENABLED = os.getenv("FAST_INTENT_ENABLED", "1") == "1"
+FAST_INTENT_THRESHOLD = float(os.getenv("FAST_INTENT_THRESHOLD", "0.85"))
+INTENT_MODEL_PATH = os.getenv(
+    "INTENT_MODEL_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intent_nb.json")
+)
+# When set, every LLM-labelled query is appended here as training data
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH")
+
+US_STATES: Dict[str, str] = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "florida": "FL", "georgia": "GA",
+    "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA",
+    "kansas": "KS", "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD",
+    "massachusetts": "MA", "michigan": "MI", "minnesota": "MN", "mississippi": "MS", "missouri": "MO",
+    "montana": "MT", "nebraska": "NE", "nevada": "NV", "new hampshire": "NH", "new jersey": "NJ",
+    "new mexico": "NM", "new york": "NY", "north carolina": "NC", "north dakota": "ND", "ohio": "OH",
+    "oklahoma": "OK", "oregon": "OR", "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC",
+    "south dakota": "SD", "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT",
+    "virginia": "VA", "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+    "district of columbia": "DC",
+}
+# Two-letter codes that are also common English words; only trusted after "in"
+_AMBIGUOUS_CODES = {"IN", "OR", "ME", "OK", "HI", "DE", "PA", "MA", "AL", "ID", "OH", "CO", "LA"}
+# State names that are as often a person, city or school ("George Washington", "Washington
+# University in St. Louis", "Washington, DC"); only trusted after "in"
+_AMBIGUOUS_STATE_NAMES = {"washington"}
+# One-word aliases that name different schools to different students ("Penn" vs Penn State,
+# "Cal" vs Cal State, "UW" Washington vs Wisconsin, "OSU" Ohio vs Oregon vs Oklahoma State)
+_AMBIGUOUS_ALIASES = {"penn", "cal", "uw", "osu"}
+
+_STATE_NAME_RE = re.compile(
+    r"(\bin\s+(?:the\s+state\s+of\s+)?)?\b(" + "|".join(sorted(US_STATES, key=len, reverse=True)) + r")\b"
+)
+# A state name that is part of a school's name ("Ohio State", "University of Michigan")
+_SCHOOL_STATE_RE = re.compile(r"^\s+(state|university|college|tech)\b")
+_SCHOOL_OF_STATE_RE = re.compile(r"\b(university|college)\s+of\s+$")
+_STATE_CODE_RE = re.compile(r"(\bin\s+)?\b([A-Z]{2})\b")
+# Words that only come up when talking about colleges; "school" alone (high school),
+# "SAT"/"ACT" (sat, act) and "in"/"good" are too common to count
+_COLLEGE_RE = re.compile(
+    r"\b(colleges?|universit(y|ies)|campus(es)?|admissions?|acceptance rates?|tuition|gpa|majors|"
+    r"(dream|reach|safety|target) schools?|selective|ivy league)\b"
+)
+_COMPARISON_RE = re.compile(r"\b(vs\.?|versus|compare|comparison|compared|or)\b")
+_REQUIREMENTS_RE = re.compile(r"\b(acceptance rate|requirements?|gpa|get into|admission rate|how hard)\b")
+# Case-sensitive, so "sat" and "act" stay verbs
+_TEST_SCORE_RE = re.compile(r"\b(SAT|ACT)\b")
+_SEARCH_RE = re.compile(r"\b(show|find|list|search|recommend|suggest|top|best|cheap|affordable|near|under|below)\b")
+# Rule precision is the lower end of the two-sided 95% Wilson interval
+_WILSON_Z = 1.96
+# Intents whose school/state slots drive searches; general_advice runs no tools
+_SLOT_INTENTS = ("school_search", "comparison", "requirements")
+
+
+def _tokens(text: str) -> List[str]:
+    words = normalize_name(text).split()
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesIntentModel:
+    """Multinomial Naive Bayes over word unigrams and bigrams, serialized as JSON."""
+
+    def __init__(
+        self,
+        class_counts: Dict[str, int],
+        token_counts: Dict[str, Dict[str, int]],
+        rule_stats: Optional[Dict[str, List[int]]] = None,
+    ):
+        self.class_counts = class_counts
+        self.token_counts = token_counts
+        # Rule -> [times fired, times the LLM label agreed], measured on the training labels
+        self.rule_stats = rule_stats or {}
+        self.vocab_size = len({t for counts in token_counts.values() for t in counts}) or 1
+        self.totals = {c: sum(counts.values()) for c, counts in token_counts.items()}
+        self.total_docs = sum(class_counts.values()) or 1
+
+    @classmethod
+    def train(cls, examples: List[Tuple[str, str]]) -> "NaiveBayesIntentModel":
+        """
+        Args:
+            examples: (query, LLM label) pairs; the label is an intent name, or a
+                StudentIntent when the rules' precision should be measured too
+        """
+        class_counts: Counter = Counter()
+        token_counts: Dict[str, Counter] = defaultdict(Counter)
+        rule_stats: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for text, label in examples:
+            intent = label.intent if isinstance(label, StudentIntent) else label
+            class_counts[intent] += 1
+            token_counts[intent].update(_tokens(text))
+            if isinstance(label, StudentIntent):
+                proposal = _rules(text)
+                if proposal.rule:
+                    rule_stats[proposal.rule][0] += 1
+                    rule_stats[proposal.rule][1] += _agrees(proposal, label)
+        return cls(dict(class_counts), {c: dict(t) for c, t in token_counts.items()}, dict(rule_stats))
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Return (label, posterior probability) for the most likely class."""
+        if not self.class_counts:
+            return None, 0.0
+        tokens = _tokens(text)
+        log_probs = {}
+        for label, count in self.class_counts.items():
+            counts = self.token_counts.get(label, {})
+            denominator = self.totals.get(label, 0) + self.vocab_size
+            log_probs[label] = math.log(count / self.total_docs) + sum(
+                math.log((counts.get(t, 0) + 1) / denominator) for t in tokens
+            )
+        best = max(log_probs, key=log_probs.get)
+        peak = log_probs[best]
+        norm = sum(math.exp(lp - peak) for lp in log_probs.values())
+        return best, 1.0 / norm
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {"class_counts": self.class_counts, "token_counts": self.token_counts, "rule_stats": self.rule_stats},
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesIntentModel":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["class_counts"], data["token_counts"], data.get("rule_stats"))
+
+
+_model: Optional[NaiveBayesIntentModel] = None
+_model_loaded = False
+_lock = threading.Lock()
+_stats = {"fast_path": 0, "llm_fallback": 0}
+# Rule -> [times fired, times the LLM agreed] on LLM fallbacks since startup
+_live_rule_stats: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+
+
+def _get_model() -> Optional[NaiveBayesIntentModel]:
+    global _model, _model_loaded
+    with _lock:
+        if not _model_loaded:
+            _model_loaded = True
+            if os.path.exists(INTENT_MODEL_PATH):
+                _model = NaiveBayesIntentModel.load(INTENT_MODEL_PATH)
+                logger.info(f"🧮 Loaded intent model from {INTENT_MODEL_PATH}")
+    return _model
+
+
+def detect_state(text: str) -> Optional[str]:
+    """
+    Find a US state mentioned by name or two-letter code.
+
+    Example:
+        >>> detect_state("colleges in Texas under 30% acceptance")
+        'TX'
+    """
+    lowered = text.casefold()
+    for match in _STATE_NAME_RE.finditer(lowered):
+        prefix, name = match.groups()
+        if _SCHOOL_STATE_RE.match(lowered[match.end():]) or _SCHOOL_OF_STATE_RE.search(lowered[:match.start(2)]):
+            continue
+        if prefix or name not in _AMBIGUOUS_STATE_NAMES:
+            return US_STATES[name]
+    codes = set(US_STATES.values())
+    for prefix, code in _STATE_CODE_RE.findall(text):
+        if code in codes and (prefix or code not in _AMBIGUOUS_CODES):
+            return code
+    return None
+
+
+def detect_schools(text: str) -> List[str]:
+    """
+    Find schools mentioned by a known alias or full name (e.g., "UWash", "ucla", "MIT").
+
+    Returns official names in order of appearance, without duplicates. Aliases in
+    _AMBIGUOUS_ALIASES are not detected, so those queries go to the LLM.
+    """
+    index = get_name_index()
+    words = normalize_name(text).split()
+    found: List[str] = []
+    i = 0
+    while i < len(words):
+        for size in (4, 3, 2, 1):
+            alias = " ".join(words[i:i + size])
+            doc = None if alias in _AMBIGUOUS_ALIASES else index.aliases.get(alias)
+            if doc is not None:
+                if index.names[doc] not in found:
+                    found.append(index.names[doc])
+                i += size
+                break
+        else:
+            i += 1
+    return found
+
+
+RULES = ("comparison", "requirements", "named_school", "state_search", "college_keywords")
+
+
+class RuleProposal(NamedTuple):
+    rule: Optional[str]
+    intent: Optional[str]
+    school_name: Optional[str]
+    state: Optional[str]
+
+
+def _rules(text: str) -> RuleProposal:
+    """Return the first keyword/entity rule that fires and the intent it proposes."""
+    lowered = text.casefold()
+    schools = detect_schools(text)
+    state = detect_state(text)
+    college = bool(_COLLEGE_RE.search(lowered))
+    school_name = schools[0] if schools else None
+
+    if len(schools) >= 2 and _COMPARISON_RE.search(lowered):
+        return RuleProposal("comparison", "comparison", school_name, state)
+    if schools and (_REQUIREMENTS_RE.search(lowered) or _TEST_SCORE_RE.search(text)):
+        return RuleProposal("requirements", "requirements", school_name, state)
+    if schools:
+        return RuleProposal("named_school", "school_search", school_name, state)
+    if state and college and _SEARCH_RE.search(lowered):
+        return RuleProposal("state_search", "school_search", None, state)
+    if college:
+        return RuleProposal("college_keywords", "school_search", None, state)
+    return RuleProposal(None, None, None, state)
+
+
+def _agrees(proposal: RuleProposal, label: StudentIntent) -> bool:
+    """True if the LLM's label matches what the rule proposed (intent, state and school)."""
+    if proposal.intent != label.intent or (proposal.state or None) != (label.state or None):
+        return False
+    if proposal.school_name is None:
+        return True
+    return normalize_name(proposal.school_name) == normalize_name(label.school_name or "")
+
+
+def _wilson_lower_bound(agreed: int, fired: int) -> float:
+    if not fired:
+        return 0.0
+    rate = agreed / fired
+    z2 = _WILSON_Z * _WILSON_Z
+    center = rate + z2 / (2 * fired)
+    margin = _WILSON_Z * math.sqrt(rate * (1 - rate) / fired + z2 / (4 * fired * fired))
+    return max(0.0, (center - margin) / (1 + z2 / fired))
+
+
+def rule_precision(rule: str) -> float:
+    """
+    Measured precision of a rule: the Wilson lower bound of how often the LLM agreed with it.
+
+    Counts come from the trained model file plus the LLM fallbacks since startup.
+    """
+    model = _get_model()
+    fired, agreed = model.rule_stats.get(rule, (0, 0)) if model is not None else (0, 0)
+    with _lock:
+        live = _live_rule_stats.get(rule, (0, 0))
+    return _wilson_lower_bound(agreed + live[1], fired + live[0])
+
+
+def classify_intent(user_input: str) -> Optional[StudentIntent]:
+    """
+    Classify a query locally, returning None when the LLM should decide.
+
+    The rules layer and, if trained, the Naive Bayes model each propose an intent.
+    A rule's confidence is its measured precision (rule_precision()); agreement with
+    the model raises it. Off-topic queries are never answered locally.
+
+    Args:
+        user_input (str): Student's natural language query
+
+    Returns:
+        Optional[StudentIntent]: Intent with confidence >= FAST_INTENT_THRESHOLD, or None
+
+    Example:
+        >>> classify_intent("colleges in Texas under 30% acceptance")
+        StudentIntent(intent='school_search', school_name=None, state='TX', confidence_score=0.93)
+        >>> classify_intent("what should I write my essay about?")
+        None
+    """
+    if not FAST_INTENT_ENABLED:
+        return None
+
+    rule, intent, school_name, state = _rules(user_input)
+    confidence = rule_precision(rule) if rule else 0.0
+    model = _get_model()
+    if model is not None:
+        label, probability = model.predict(user_input)
+        if label == intent:
+            confidence = max(confidence, min(0.99, (confidence + probability) / 2 + 0.1))
+        elif intent is None or confidence < probability:
+            intent, confidence = label, probability
+            # The slots are the entities found in the text; drop them for an intent without searches
+            if intent not in _SLOT_INTENTS:
+                school_name = state = None
+
+    if intent is None or intent == "off_topic" or confidence < FAST_INTENT_THRESHOLD:
+        with _lock:
+            _stats["llm_fallback"] += 1
+        return None
+
+    with _lock:
+        _stats["fast_path"] += 1
+    logger.info(f"⚡ Fast-path intent: {intent} ({confidence:.0%})")
+    return StudentIntent(
+        intent=intent,
+        school_name=school_name,
+        state=state,
+        confidence_score=round(confidence, 3),
+    )
+
+
+def log_llm_label(user_input: str, intent: StudentIntent) -> None:
+    """
+    Record an LLM-labelled query.
+
+    Counts whether the rule that fired (if any) agreed with the LLM, which feeds
+    rule_precision(), and appends the query to INTENT_LOG_PATH (if configured) as
+    training data.
+    """
+    proposal = _rules(user_input)
+    if proposal.rule:
+        with _lock:
+            counts = _live_rule_stats[proposal.rule]
+            counts[0] += 1
+            counts[1] += _agrees(proposal, intent)
+    if not INTENT_LOG_PATH:
+        return
+    record = {"text": user_input, **intent.model_dump()}
+    try:
+        with _lock, open(INTENT_LOG_PATH, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.warning(f"⚠️ Could not log intent label: {e}")
+
+
+def stats() -> Dict[str, Any]:
+    """
+    Report how many requests were classified locally versus by the LLM.
+
+    Returns:
+        Dict[str, Any]: {"fast_path", "llm_fallback", "fast_path_rate",
+            "rule_precision": {rule: measured precision}}
+    """
+    precision = {rule: round(rule_precision(rule), 3) for rule in RULES}
+    with _lock:
+        total = _stats["fast_path"] + _stats["llm_fallback"]
+        return {
+            **_stats,
+            "fast_path_rate": _stats["fast_path"] / total if total else 0.0,
+            "rule_precision": precision,
+        }
+
+
+def train(log_path: str, model_path: str = INTENT_MODEL_PATH) -> int:
+    """
+    Train the Naive Bayes model from a JSONL log written by log_llm_label(), and
+    measure each rule's precision against the same labels.
+
+    Returns:
+        int: Number of training examples
+    """
+    examples = []
+    with open(log_path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                text = record.pop("text")
+                examples.append((text, StudentIntent(**record)))
+    model = NaiveBayesIntentModel.train(examples)
+    model.save(model_path)
+    logger.info(f"🧮 Trained intent model on {len(examples)} examples -> {model_path}")
+    for rule, (fired, agreed) in sorted(model.rule_stats.items()):
+        logger.info(f"🧮 Rule {rule}: {agreed}/{fired} agreed with the LLM ({_wilson_lower_bound(agreed, fired):.0%} lower bound)")
+    return len(examples)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train the local fast-path intent model")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train_cmd = subcommands.add_parser("train", help="Train from logged LLM intent labels")
+    train_cmd.add_argument("log_path", help="JSONL file written via INTENT_LOG_PATH")
+    train_cmd.add_argument("--out", default=INTENT_MODEL_PATH, help="Model output path")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        count = train(args.log_path, args.out)
+        print(f"Trained on {count} examples -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
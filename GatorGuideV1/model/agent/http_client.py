@@ -0,0 +1,338 @@
+"""
+Shared HTTP client layer for upstream tool calls.
+
+Every tool in tools.py goes through this module instead of creating its own client.
+It keeps one pooled, keep-alive httpx.AsyncClient per upstream host (and per event
+loop), caches DNS lookups, applies configurable connect/read timeouts, and exposes
+pool statistics. warm_pools() opens connections at startup so the first student
+request does not pay the TCP + TLS handshake. Requests go through resilience.call(),
+so they share the request deadline, retries and a circuit breaker per upstream.
+"""
+
+import asyncio
+import socket
+import time
+import weakref
+from contextlib import contextmanager
+from os import getenv
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from model.agent import resilience
+from model.config import logger, wrap_transport
+from model.metrics import UPSTREAM_RESPONSES
+
+HTTP_CONNECT_TIMEOUT_S = float(getenv("HTTP_CONNECT_TIMEOUT_S", "3"))
+HTTP_READ_TIMEOUT_S = float(getenv("HTTP_READ_TIMEOUT_S", "10"))
+HTTP_POOL_SIZE = int(getenv("HTTP_POOL_SIZE", "20"))
+HTTP_KEEPALIVE_EXPIRY_S = float(getenv("HTTP_KEEPALIVE_EXPIRY_S", "60"))
+DNS_CACHE_TTL_S = float(getenv("DNS_CACHE_TTL_S", "300"))
+
+
+class _DNSCache:
+    """Host -> resolved addresses, shared by every pool and refreshed after DNS_CACHE_TTL_S."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        key = (host, port)
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self._entries[key] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    def invalidate(self, host: str, port: int) -> None:
+        self._entries.pop((host, port), None)
+
+
+class _CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    httpcore network backend that connects to cached IP addresses.
+
+    TLS still uses the original hostname for SNI and certificate checks, because
+    httpcore starts TLS with the request origin rather than the connected address.
+    """
+
+    def __init__(self, dns_cache: _DNSCache, stats: Dict[str, int]):
+        self._backend = httpcore.AnyIOBackend()
+        self._dns_cache = dns_cache
+        self._stats = stats
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        self._stats["connections_opened"] += 1
+        last_error: Optional[Exception] = None
+        try:
+            addresses = await self._dns_cache.resolve(host, port)
+        except OSError as e:
+            # Surface resolution failures as httpx.ConnectError, like httpcore's own backends
+            raise httpcore.ConnectError(f"Could not resolve {host}: {e}") from e
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(
+                    address,
+                    port,
+                    timeout=timeout,
+                    local_address=local_address,
+                    socket_options=socket_options,
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        # Every cached address failed: drop them so the next attempt re-resolves
+        self._dns_cache.invalidate(host, port)
+        raise last_error or httpcore.ConnectError(f"No addresses for {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore errors and the httpx errors callers catch; the two libraries share the names
+_HTTPCORE_ERRORS = {
+    getattr(httpcore, name): getattr(httpx, name)
+    for name in (
+        "TimeoutException", "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout",
+        "NetworkError", "ConnectError", "ReadError", "WriteError", "ProxyError",
+        "UnsupportedProtocol", "ProtocolError", "LocalProtocolError", "RemoteProtocolError",
+    )
+}
+
+
+@contextmanager
+def _httpx_errors() -> Iterator[None]:
+    """Re-raise httpcore errors as the most specific matching httpx error."""
+    try:
+        yield
+    except Exception as e:
+        mapped = next((_HTTPCORE_ERRORS[cls] for cls in type(e).__mro__ if cls in _HTTPCORE_ERRORS), None)
+        if mapped is None:
+            raise
+        raise mapped(str(e)) from e
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream: AsyncIterable[bytes]):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _httpx_errors():
+            async for chunk in self._stream:
+                yield chunk
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class _PooledTransport(httpx.AsyncBaseTransport):
+    """httpx transport over an httpcore connection pool that uses the DNS-caching backend."""
+
+    def __init__(self, dns_cache: _DNSCache, stats: Dict[str, int]):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=HTTP_POOL_SIZE,
+            max_keepalive_connections=HTTP_POOL_SIZE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+            network_backend=_CachingNetworkBackend(dns_cache, stats),
+        )
+
+    @property
+    def connections(self) -> list:
+        return self._pool.connections
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+
+_dns_cache = _DNSCache(DNS_CACHE_TTL_S)
+# event loop -> {origin: (client, transport, stats)}; clients are bound to the loop they were created on
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Tuple[httpx.AsyncClient, _PooledTransport, Dict[str, int]]]]" = weakref.WeakKeyDictionary()
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _get_pool(url: str) -> Tuple[httpx.AsyncClient, _PooledTransport, Dict[str, int]]:
+    loop_pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    origin = _origin(url)
+    if origin not in loop_pools:
+        stats = {"requests": 0, "connections_opened": 0}
+        transport = _PooledTransport(_dns_cache, stats)
+        client = httpx.AsyncClient(
+            transport=wrap_transport(transport, origin),
+            timeout=httpx.Timeout(
+                HTTP_READ_TIMEOUT_S, connect=HTTP_CONNECT_TIMEOUT_S, read=HTTP_READ_TIMEOUT_S
+            ),
+        )
+        loop_pools[origin] = (client, transport, stats)
+        logger.info(f"🔌 Created HTTP pool for {origin}")
+    return loop_pools[origin]
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """
+    Return the pooled client for the host of `url` on the running event loop.
+
+    Args:
+        url (str): Any URL on the upstream host (e.g., COLLEGE_SCORECARD_URL)
+
+    Returns:
+        httpx.AsyncClient: Keep-alive client shared by all requests to that host
+    """
+    return _get_pool(url)[0]
+
+
+async def _get_once(url: str, params: Optional[dict], timeout: Optional[float]) -> Any:
+    client, _, stats = _get_pool(url)
+    stats["requests"] += 1
+    kwargs = {"timeout": timeout} if timeout is not None else {}
+    host = urlsplit(url).netloc
+    try:
+        response = await client.get(url, params=params, **kwargs)
+    except httpx.HTTPError:
+        UPSTREAM_RESPONSES.inc(host=host, status="error")
+        raise
+    UPSTREAM_RESPONSES.inc(host=host, status=response.status_code)
+    response.raise_for_status()
+    return response.json()
+
+
+async def get_json(
+    url: str,
+    params: Optional[dict] = None,
+    timeout: Optional[float] = None,
+    upstream: Optional[str] = None,
+) -> Any:
+    """
+    GET an upstream endpoint through its shared pool and return the decoded JSON body.
+
+    Transient failures (timeouts, connection errors, 429, 5xx) are retried with backoff
+    within the request deadline; see resilience.call().
+
+    Args:
+        url (str): Endpoint URL
+        params (Optional[dict]): Query parameters
+        timeout (Optional[float]): Per-attempt timeout override in seconds; defaults to
+            HTTP_READ_TIMEOUT_S, and is always capped by the request deadline
+        upstream (Optional[str]): Circuit breaker name (e.g. "scorecard"); defaults to the host
+
+    Returns:
+        Any: Parsed JSON response
+
+    Raises:
+        httpx.HTTPError: On connection errors, timeouts, or non-2xx status codes
+        resilience.UpstreamUnavailable: If the circuit is open or the deadline passed
+    """
+    return await resilience.call(
+        upstream or urlsplit(url).netloc,
+        lambda attempt_timeout: _get_once(url, params, attempt_timeout),
+        timeout=timeout or HTTP_READ_TIMEOUT_S,
+    )
+
+
+async def warm_pools(urls: Iterable[str]) -> None:
+    """
+    Open a keep-alive connection to each upstream host ahead of the first request.
+
+    Any HTTP response (even 403/404) means the TCP + TLS connection is established and
+    parked in the pool, so status codes are ignored; connection failures are logged only.
+
+    Args:
+        urls (Iterable[str]): URLs of the upstream hosts to warm
+    """
+
+    async def warm(url: str) -> None:
+        try:
+            await get_client(url).head(_origin(url) + "/")
+            logger.info(f"🔥 Warmed HTTP pool for {_origin(url)}")
+        except httpx.HTTPError as e:
+            logger.warning(f"⚠️ Could not warm HTTP pool for {_origin(url)}: {e}")
+
+    await asyncio.gather(*(warm(url) for url in urls))
+
+
+async def close_pools() -> None:
+    """Close every pooled client created on the running event loop."""
+    loop_pools = _pools.pop(asyncio.get_running_loop(), {})
+    for client, _, _ in loop_pools.values():
+        await client.aclose()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Report connection pool sizes and DNS cache counters.
+
+    Returns:
+        Dict[str, Any]: {
+            "pools": {origin: {"connections", "idle", "active", "requests", "connections_opened"}},
+            "dns_cache": {"hits", "misses"}
+        }
+        Counts are summed across event loops.
+
+    Example:
+        >>> pool_stats()["pools"]["https://api.data.gov"]
+        {'connections': 2, 'idle': 2, 'active': 0, 'requests': 14, 'connections_opened': 2}
+    """
+    pools: Dict[str, Dict[str, int]] = {}
+    for loop_pools in list(_pools.values()):
+        for origin, (_, transport, stats) in loop_pools.items():
+            connections = transport.connections
+            idle = sum(1 for connection in connections if connection.is_idle())
+            entry = pools.setdefault(
+                origin,
+                {"connections": 0, "idle": 0, "active": 0, "requests": 0, "connections_opened": 0},
+            )
+            entry["connections"] += len(connections)
+            entry["idle"] += idle
+            entry["active"] += len(connections) - idle
+            entry["requests"] += stats["requests"]
+            entry["connections_opened"] += stats["connections_opened"]
+    return {
+        "pools": pools,
+        "dns_cache": {"hits": _dns_cache.hits, "misses": _dns_cache.misses},
+    }
@@ -1,4 +1,11 @@
-from model.config import client, MODEL, logger
+from model.config import get_async_client, MODEL, logger
+from model.agent import resilience
+from model.agent.resilience import LLM_TIMEOUT_S
+from model.agent.fast_intent import classify_intent, log_llm_label
+from model.agent.name_index import canonical_school_name
+from model.agent.prompts import intent_messages
+from model.agent.runner import run_sync
+from model.agent.usage import check_budget, record_usage
 from model.schemas.studentIntent import StudentIntent
 
 def extract_student_intent(user_input: str) -> StudentIntent:
@@ -24,38 +31,42 @@ def extract_student_intent(user_input: str) -> StudentIntent:
         >>> extract_student_intent("I want to aim for my dream schools like UWash")
         StudentIntent(
             intent="school_search",
-            school_name="University of Washington",
+            school_name="University of Washington-Seattle Campus",
             state="WA",
             confidence_score=0.85
         )
     """
+    return run_sync(extract_student_intent_async(user_input))
 
-    response = client.beta.chat.completions.parse(
-        model=MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are analyzing student queries about college admissions. "
-                    "Extract the student's intent and provide a confidence score (0-1).\n\n"
-                    "Valid college-related intents include:\n"
-                    "- 'school_search': Looking for specific schools by name, location, or characteristics\n"
-                    "- 'comparison': Comparing schools or asking about options\n"
-                    "- 'general_advice': Seeking guidance on college selection, admissions, requirements\n"
-                    "- 'requirements': Asking about acceptance rates, SAT scores, competitiveness\n\n"
-                    "Recognize queries even when implicit:\n"
-                    "- 'dream schools', 'reach schools', 'safety schools'\n"
-                    "- School abbreviations like 'UW', 'UWash', 'UCLA', 'MIT'\n"
-                    "- 'higher requirements', 'competitive', 'selective'\n"
-                    "- Location mentions: states, cities, regions\n\n"
-                    "Set confidence_score high (>0.7) if clearly college-related, moderate (0.5-0.7) if implicit.\n"
-                    "Extract school_name if mentioned (expand abbreviations to full names when obvious).\n"
-                    "Extract state as 2-letter code if mentioned (e.g., WA for Washington)."
-                ),
-            },
-            {"role": "user", "content": user_input},
-        ],
-        response_format=StudentIntent,
+
+async def extract_student_intent_async(user_input: str) -> StudentIntent:
+    """
+    Async implementation of extract_student_intent(); see that function for details.
+    
+    Obvious queries are classified locally by fast_intent.classify_intent() and skip
+    the LLM call; the rest go to the LLM and their labels are logged for training.
+    """
+    fast = classify_intent(user_input)
+    if fast is not None:
+        return fast
+
+    messages = intent_messages(user_input)
+    check_budget("intent", messages)
+    response = await resilience.call(
+        "openai",
+        lambda timeout: get_async_client().beta.chat.completions.parse(
+            model=MODEL,
+            messages=messages,
+            response_format=StudentIntent,
+            timeout=timeout,
+        ),
+        timeout=LLM_TIMEOUT_S,
     )
+    record_usage("intent", response.usage)
 
-    return response.choices[0].message.parsed
+    intent = response.choices[0].message.parsed
+    # Snap the LLM's expansion onto an official Scorecard name so tool searches hit
+    if intent.school_name:
+        intent.school_name = canonical_school_name(intent.school_name, state=intent.state)
+    log_llm_label(user_input, intent)
+    return intent
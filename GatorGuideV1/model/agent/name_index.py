@@ -0,0 +1,285 @@
+"""
+Fuzzy school-name and abbreviation index.
+
+Resolves what students type ("UW", "UWash", "ucla", "univ of washington") to official
+College Scorecard institution names without an LLM round trip. Names and aliases are
+indexed by character trigrams in an inverted index whose posting lists are NumPy
+arrays, so scoring every candidate is a single bincount; an alias table handles
+abbreviations that share no trigrams with the full name.
+
+The index covers every institution in the local Scorecard store when one exists
+(including its ALIAS column) and always covers the built-in COMMON_ALIASES table.
+Without the store, fuzzy matches are only ranked suggestions: a handful of built-in
+names is no basis for rewriting "George Washington University" into the nearest one.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from model.config import logger
+from model.agent.scorecard_store import SCORECARD_DB_PATH, get_store
+
+# Minimum score for replacing a student-typed name with a fuzzy match (store-backed index only)
+NAME_MATCH_THRESHOLD = float(os.getenv("NAME_MATCH_THRESHOLD", "0.6"))
+
+# Common abbreviations -> official Scorecard institution names
+COMMON_ALIASES: Dict[str, str] = {
+    "university of washington": "University of Washington-Seattle Campus",
+    "uw": "University of Washington-Seattle Campus",
+    "uwash": "University of Washington-Seattle Campus",
+    "u dub": "University of Washington-Seattle Campus",
+    "wsu": "Washington State University",
+    "ucla": "University of California-Los Angeles",
+    "uc berkeley": "University of California-Berkeley",
+    "berkeley": "University of California-Berkeley",
+    "cal": "University of California-Berkeley",
+    "ucsd": "University of California-San Diego",
+    "uci": "University of California-Irvine",
+    "ucsb": "University of California-Santa Barbara",
+    "uc davis": "University of California-Davis",
+    "usc": "University of Southern California",
+    "caltech": "California Institute of Technology",
+    "stanford": "Stanford University",
+    "mit": "Massachusetts Institute of Technology",
+    "harvard": "Harvard University",
+    "nyu": "New York University",
+    "cmu": "Carnegie Mellon University",
+    "upenn": "University of Pennsylvania",
+    "penn": "University of Pennsylvania",
+    "umich": "University of Michigan-Ann Arbor",
+    "uiuc": "University of Illinois Urbana-Champaign",
+    "ut austin": "The University of Texas at Austin",
+    "georgia tech": "Georgia Institute of Technology-Main Campus",
+    "gatech": "Georgia Institute of Technology-Main Campus",
+    "uf": "University of Florida",
+    "fsu": "Florida State University",
+    "osu": "Ohio State University-Main Campus",
+    "byu": "Brigham Young University",
+    "jhu": "Johns Hopkins University",
+    "unc": "University of North Carolina at Chapel Hill",
+    "uva": "University of Virginia-Main Campus",
+}
+
+# Added to names that start with the query ("university of washington" -> "...-seattle campus"),
+# as long as the query covers enough of the name that a bare "washington" is not promoted
+PREFIX_BONUS = 0.2
+PREFIX_MIN_COVERAGE = 0.5
+
+_ABBREVIATIONS = {"univ": "university", "u": "university", "st": "state", "coll": "college", "inst": "institute"}
+
+
+class NameCandidate(NamedTuple):
+    name: str
+    state: Optional[str]
+    score: float
+
+
+def normalize_name(text: str) -> str:
+    """
+    Lower-case, strip punctuation and expand common word abbreviations.
+
+    Example:
+        >>> normalize_name("Univ. of Washington - Seattle")
+        'university of washington seattle'
+    """
+    words = re.sub(r"[^a-z0-9 ]+", " ", str(text).casefold()).split()
+    return " ".join(_ABBREVIATIONS.get(w, w) for w in words)
+
+
+def trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class NameIndex:
+    """
+    Trigram inverted index plus alias table over institution names.
+
+    Example:
+        >>> index = NameIndex([("University of Washington-Seattle Campus", "WA", "UW, UDub")])
+        >>> index.search("univ of washington", k=1)
+        [NameCandidate(name='University of Washington-Seattle Campus', state='WA', score=0.97)]
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[str], Optional[str]]]):
+        """
+        Args:
+            entries: (name, state, comma-separated aliases) per institution; empty when
+                there is no local store, leaving only the COMMON_ALIASES names
+        """
+        self.names: List[str] = []
+        self.states: List[Optional[str]] = []
+        self.aliases: Dict[str, int] = {}
+        postings: Dict[str, List[int]] = defaultdict(list)
+        gram_counts: List[int] = []
+        by_name: Dict[str, int] = {}
+
+        for name, state, alias_field in entries:
+            doc = len(self.names)
+            self.names.append(name)
+            self.states.append(state)
+            by_name.setdefault(name.casefold(), doc)
+            grams = trigrams(normalize_name(name))
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(doc)
+            for alias in str(alias_field or "").split(","):
+                if alias.strip():
+                    self.aliases.setdefault(normalize_name(alias), doc)
+
+        # True when built from the Scorecard store, i.e. it knows (nearly) every school
+        self.complete = bool(self.names)
+        for alias, name in COMMON_ALIASES.items():
+            doc = by_name.get(name.casefold())
+            if doc is None:
+                doc = len(self.names)
+                self.names.append(name)
+                self.states.append(None)
+                grams = trigrams(normalize_name(name))
+                gram_counts.append(len(grams))
+                for gram in grams:
+                    postings[gram].append(doc)
+                by_name[name.casefold()] = doc
+            self.aliases[normalize_name(alias)] = doc
+
+        self.postings = {gram: np.array(docs, dtype=np.int32) for gram, docs in postings.items()}
+        self.gram_counts = np.array(gram_counts, dtype=np.float32)
+        self.state_codes = np.array([s or "" for s in self.states])
+        self.normalized = [normalize_name(name) for name in self.names]
+        self.exact_names: Dict[str, int] = {}
+        for doc, name in enumerate(self.normalized):
+            self.exact_names.setdefault(name, doc)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def exact(self, query: str) -> Optional[NameCandidate]:
+        """The school whose alias or full name is exactly `query` after normalization, if any."""
+        normalized = normalize_name(query)
+        doc = self.aliases.get(normalized, self.exact_names.get(normalized))
+        if doc is None:
+            return None
+        return NameCandidate(self.names[doc], self.states[doc], 1.0)
+
+    def search(self, query: str, k: int = 5, state: Optional[str] = None) -> List[NameCandidate]:
+        """
+        Return up to k candidate schools ranked by similarity to `query`.
+
+        An exact alias match scores 1.0; other candidates are scored by trigram Dice
+        similarity between the normalized query and the normalized name.
+
+        Args:
+            query (str): Name or abbreviation as typed by the student
+            k (int): Maximum candidates to return
+            state (Optional[str]): If given, only schools in this state (or of unknown state)
+
+        Returns:
+            List[NameCandidate]: Best matches first
+        """
+        normalized = normalize_name(query)
+        if not normalized or not len(self):
+            return []
+
+        query_grams = trigrams(normalized)
+        lists = [self.postings[g] for g in query_grams if g in self.postings]
+        if lists:
+            overlap = np.bincount(np.concatenate(lists), minlength=len(self)).astype(np.float32)
+            scores = 2 * overlap / (self.gram_counts + len(query_grams))
+        else:
+            scores = np.zeros(len(self), dtype=np.float32)
+
+        if state:
+            state = state.strip().upper()
+            scores = np.where((self.state_codes == state) | (self.state_codes == ""), scores, 0)
+
+        k = min(k, len(self))
+        # Over-fetch so the prefix bonus below can reorder near-ties
+        pool = min(len(self), k * 4)
+        top = np.argpartition(-scores, pool - 1)[:pool]
+        for i in top:
+            name = self.normalized[i]
+            if scores[i] > 0 and name.startswith(normalized) and len(normalized) >= PREFIX_MIN_COVERAGE * len(name):
+                scores[i] = min(0.99, scores[i] + PREFIX_BONUS)
+        alias_doc = self.aliases.get(normalized)
+        if alias_doc is not None:
+            scores[alias_doc] = 1.0
+            top = np.append(top, alias_doc)
+        top = np.unique(top)
+        top = top[np.argsort(-scores[top], kind="stable")][:k]
+        return [
+            NameCandidate(self.names[i], self.states[i], round(float(scores[i]), 3))
+            for i in top
+            if scores[i] > 0
+        ]
+
+
+_index: Optional[NameIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_name_index() -> NameIndex:
+    """Return the process-wide index, building it from the local store on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            started = time.perf_counter()
+            entries: List[Tuple[str, Optional[str], Optional[str]]] = []
+            if os.path.exists(SCORECARD_DB_PATH):
+                rows = get_store().search({"fields": "school.name,school.state,school.alias", "per_page": 1_000_000})
+                entries = [(r["school.name"], r["school.state"], r["school.alias"]) for r in rows]
+            _index = NameIndex(entries)
+            logger.info(f"🔤 Built name index over {len(_index)} schools in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return _index
+
+
+def resolve_school_name(query: Optional[str], state: Optional[str] = None, k: int = 5) -> List[NameCandidate]:
+    """
+    Rank candidate schools for a student-typed name or abbreviation.
+
+    Example:
+        >>> resolve_school_name("ucla", k=1)
+        [NameCandidate(name='University of California-Los Angeles', state='CA', score=1.0)]
+    """
+    if not query:
+        return []
+    return get_name_index().search(query, k=k, state=state)
+
+
+def canonical_school_name(query: Optional[str], state: Optional[str] = None) -> Optional[str]:
+    """
+    Replace a student-typed name with the official name when the match is certain.
+
+    The name is replaced on an exact alias or full-name hit. A fuzzy match replaces it
+    only when the index was built from the local Scorecard store, a state is given and
+    the match is in that state, and it scores at least NAME_MATCH_THRESHOLD. Otherwise
+    the input is returned unchanged and the Scorecard name search matches it as typed.
+
+    Example:
+        >>> canonical_school_name("UWash")
+        'University of Washington-Seattle Campus'
+        >>> canonical_school_name("George Washington University")
+        'George Washington University'
+    """
+    if not query:
+        return query
+    index = get_name_index()
+    match = index.exact(query)
+    if match is None and index.complete and state:
+        candidates = index.search(query, k=1, state=state)
+        if (
+            candidates
+            and candidates[0].score >= NAME_MATCH_THRESHOLD
+            and candidates[0].state == state.strip().upper()
+        ):
+            match = candidates[0]
+    if match is None:
+        return query
+    if match.name != query:
+        logger.info(f"🔤 Resolved school name {query!r} -> {match.name!r} ({match.score:.2f})")
+    return match.name
@@ -0,0 +1,241 @@
+"""
+Prompt assembly laid out for the provider's prompt-prefix cache.
+
+OpenAI caches prompt prefixes of PROMPT_CACHE_MIN_TOKENS (1024) tokens or more and
+bills the cached part at a discount with a shorter time to first token, but only
+when a request starts with exactly the same bytes as an earlier one. Every prompt
+is therefore built in the same order, static content first:
+
+    tools + response schema + system prompt + examples    identical for every call
+    conversation history (sessions.py)                   stable within a conversation
+    query, tool calls and tool results                   variable, always last
+
+Both advisor calls (tool selection and the final answer) send the same tools and
+response schema; the final call only sets tool_choice="none", and tools a query's
+intent cannot use are ruled out through tool_choice as well (tools_schema.py). The final call's
+prompt then starts with the selection call's entire prompt. When the selection
+call needs no tools it already returns the structured answer, and the final call
+is skipped.
+
+The static parts are built once at import, so each call sends byte-identical
+prefixes. Cache hits show up as `cached_tokens` in each stage's usage (usage.py)
+and in /status.
+
+Example:
+    >>> messages = advisor_messages("Colleges in Washington", history=session.history_messages())
+    >>> response = await client.chat.completions.create(**advisor_request(messages))
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from model.agent.tools_schema import OFFERED_TOOLS, SEARCH_TOOL_NAMES, TOOL_PRUNING, TOOLS_BY_NAME, tool_params, tools
+from model.agent.usage import LLM_TOKENS, estimate_tokens
+from model.config import MODEL, logger
+from model.schemas.advisorResponse import AdvisorResponse
+from model.schemas.studentIntent import StudentIntent
+
+# Shortest prompt the provider caches; static prefixes below it are never reused
+PROMPT_CACHE_MIN_TOKENS = 1024
+# "0" leaves the worked examples out of the advisor system prompt
+PROMPT_EXAMPLES = os.getenv("PROMPT_EXAMPLES", "1") == "1"
+
+INTENT_SYSTEM_PROMPT = (
+    "You are analyzing student queries about college admissions. "
+    "Extract the student's intent and provide a confidence score (0-1).\n\n"
+    "Valid college-related intents include:\n"
+    "- 'school_search': Looking for specific schools by name, location, or characteristics\n"
+    "- 'comparison': Comparing schools or asking about options\n"
+    "- 'general_advice': Seeking guidance on college selection, admissions, requirements\n"
+    "- 'requirements': Asking about acceptance rates, SAT scores, competitiveness\n\n"
+    "Recognize queries even when implicit:\n"
+    "- 'dream schools', 'reach schools', 'safety schools'\n"
+    "- School abbreviations like 'UW', 'UWash', 'UCLA', 'MIT'\n"
+    "- 'higher requirements', 'competitive', 'selective'\n"
+    "- Location mentions: states, cities, regions\n\n"
+    "Set confidence_score high (>0.7) if clearly college-related, moderate (0.5-0.7) if implicit.\n"
+    "Extract school_name if mentioned (expand abbreviations to full names when obvious).\n"
+    "Extract state as 2-letter code if mentioned (e.g., WA for Washington)."
+)
+
+ADVISOR_SYSTEM_PROMPT = (
+    "You are a college advisor helping students find suitable colleges. "
+    "When students mention their GPA, SAT scores, or test scores, USE THOSE as filters in your search. "
+    "For example: '1600 SAT' → use sat_score_range parameter if searching by state. "
+    "When students mention 'dream schools', 'reach schools', 'top universities', or 'competitive', "
+    "use acceptance_rate_range='0..0.5' (0-50% acceptance) to cast a wide net. "
+    "ONLY use very restrictive ranges like '0..0.2' if they specifically say 'most selective' or 'hardest to get into'. "
+    "School abbreviations: UW/UWash = University of Washington, UCLA, MIT, Stanford, etc. "
+    "Each school result includes: name, location, acceptance rate, tuition, and current weather. "
+    "Provide comprehensive advice considering all factors including student's stated qualifications."
+)
+
+ADVISOR_EXAMPLES = (
+    "\n\nExamples of tool use:\n"
+    "- 'Is UW good for engineering?' → search_colleges(school_name='University of Washington', state='WA')\n"
+    "- 'Dream schools in California' → state_search_colleges(state='CA', acceptance_rate_range='0..0.5')\n"
+    "- 'The most selective colleges in Massachusetts' → "
+    "state_search_colleges(state='MA', acceptance_rate_range='0..0.2')\n"
+    "- 'Safety schools in Texas' → state_search_colleges(state='TX', acceptance_rate_range='0.5..1')\n"
+    "- 'Compare MIT and Stanford' → search_colleges(school_name='Massachusetts Institute of Technology') "
+    "and search_colleges(school_name='Stanford University')\n"
+    "- 'How do I write a strong college essay?' → no tools; answer directly with an empty schools list\n"
+    "Follow-up questions ('what about cheaper ones?') refer to the earlier turns of the conversation."
+)
+
+INTENT_SYSTEM_MESSAGE = {"role": "system", "content": INTENT_SYSTEM_PROMPT}
+ADVISOR_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": ADVISOR_SYSTEM_PROMPT + (ADVISOR_EXAMPLES if PROMPT_EXAMPLES else ""),
+}
+
+
+def _strict_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Make a JSON schema acceptable to structured outputs' strict mode: every object
+    closed (additionalProperties false) with all properties required (optional fields
+    already allow null), and no `"default": null`.
+    """
+    if not isinstance(schema, dict):
+        return schema
+    schema = dict(schema)
+    if schema.get("type") == "object" and "properties" in schema:
+        schema["properties"] = {name: _strict_schema(value) for name, value in schema["properties"].items()}
+        schema["required"] = list(schema["properties"])
+        schema["additionalProperties"] = False
+    for key in ("$defs", "definitions"):
+        if key in schema:
+            schema[key] = {name: _strict_schema(value) for name, value in schema[key].items()}
+    for key in ("anyOf", "allOf"):
+        if key in schema:
+            schema[key] = [_strict_schema(value) for value in schema[key]]
+    if "items" in schema:
+        schema["items"] = _strict_schema(schema["items"])
+    if "default" in schema and schema["default"] is None:
+        del schema["default"]
+    return schema
+
+
+def response_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    A strict json_schema response_format for chat.completions.create(), built from the
+    pydantic model's JSON schema.
+
+    Example:
+        >>> response_format(AdvisorResponse)["json_schema"]["name"]
+        'AdvisorResponse'
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": _strict_schema(model.model_json_schema()), "strict": True},
+    }
+
+
+ADVISOR_RESPONSE_FORMAT = response_format(AdvisorResponse)
+
+
+def _prefix_tokens(*parts: Any) -> int:
+    return sum(estimate_tokens(part if isinstance(part, str) else json.dumps(part)) for part in parts)
+
+
+# Estimated size of each call's static prefix, for /status. Under TOOL_PRUNING=schemas the
+# tool schemas vary per query and are not part of the advisor prefix.
+PREFIX_TOKENS = {
+    "intent": _prefix_tokens(response_format(StudentIntent), INTENT_SYSTEM_MESSAGE),
+    "advisor": _prefix_tokens(
+        *([] if TOOL_PRUNING == "schemas" else [OFFERED_TOOLS]), ADVISOR_RESPONSE_FORMAT, ADVISOR_SYSTEM_MESSAGE
+    ),
+}
+# Estimated tokens of the tool schemas one advisor call sends (at most, under "schemas"),
+# against sending every tool
+TOOL_SCHEMA_TOKENS = {
+    "pruning": TOOL_PRUNING,
+    "sent": _prefix_tokens(
+        [TOOLS_BY_NAME[name] for name in SEARCH_TOOL_NAMES] if TOOL_PRUNING == "schemas" else OFFERED_TOOLS
+    ),
+    "unpruned": _prefix_tokens(tools),
+}
+
+
+def intent_messages(user_input: str) -> List[Dict[str, str]]:
+    """Messages for the intent call: the static system prompt, then the query."""
+    return [INTENT_SYSTEM_MESSAGE, {"role": "user", "content": user_input}]
+
+
+def advisor_messages(user_input: str, history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, Any]]:
+    """
+    Messages for the advisor calls: static system prompt, conversation history, then the query.
+
+    Tool calls and tool results are appended after the query by the caller, so the
+    final call's prompt extends the tool-selection call's prompt.
+
+    Args:
+        user_input (str): Student's query
+        history (Optional[List[Dict[str, str]]]): Earlier turns (Session.history_messages())
+    """
+    return [ADVISOR_SYSTEM_MESSAGE, *(history or []), {"role": "user", "content": user_input}]
+
+
+def advisor_request(
+    messages: List[Any], final: bool = False, tool_schemas: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Keyword arguments for chat.completions.create() for either advisor call.
+
+    Args:
+        messages (List[Any]): From advisor_messages(), plus any tool calls and results
+        final (bool): The answer call; the tools are still sent so the prompt prefix
+            matches the selection call, but the model may not call them
+        tool_schemas (Optional[List[Dict[str, Any]]]): Tools the model may call for this
+            query (tools_schema.tools_for_intent(); default OFFERED_TOOLS)
+
+    Returns:
+        Dict[str, Any]: model, messages, response_format, plus tools and tool_choice
+            (see tools_schema.tool_params())
+    """
+    return {
+        "model": MODEL,
+        "messages": messages,
+        "response_format": ADVISOR_RESPONSE_FORMAT,
+        **tool_params(OFFERED_TOOLS if tool_schemas is None else tool_schemas, final),
+    }
+
+
+def parse_advisor_response(content: Optional[str]) -> Optional[AdvisorResponse]:
+    """
+    Validate an advisor call's JSON content.
+
+    Returns None, like a refusal, if the model returned no content or content that
+    does not match AdvisorResponse (e.g. output truncated at the token limit).
+    """
+    if not content:
+        return None
+    try:
+        return AdvisorResponse.model_validate_json(content)
+    except ValidationError as e:
+        logger.warning(f"⚠️ Advisor response did not match the schema: {e.error_count()} error(s)")
+        return None
+
+
+def stats() -> Dict[str, Any]:
+    """
+    Static prefix sizes and the share of prompt tokens served from the provider cache.
+
+    Returns:
+        dict: {"prefix_tokens": {"intent": int, "advisor": int}, "min_cached_tokens": int,
+            "tool_schema_tokens": {"pruning", "sent", "unpruned"},
+            "cached_share": {stage: cached / prompt tokens so far}}
+    """
+    shares = {}
+    for stage in ("intent", "tool_selection", "final_parse"):
+        prompt = LLM_TOKENS.value(stage=stage, kind="prompt")
+        shares[stage] = round(LLM_TOKENS.value(stage=stage, kind="cached") / prompt, 3) if prompt else 0.0
+    return {
+        "prefix_tokens": dict(PREFIX_TOKENS),
+        "min_cached_tokens": PROMPT_CACHE_MIN_TOKENS,
+        "tool_schema_tokens": dict(TOOL_SCHEMA_TOKENS),
+        "cached_share": shares,
+    }
@@ -0,0 +1,409 @@
+"""
+Deadlines, retries, hedged requests and circuit breakers for upstream calls.
+
+Every call to OpenAI, College Scorecard and Open-Meteo goes through call(), which:
+
+- bounds each attempt by the request's deadline (deadline(), set by the API from the
+  client's `deadline_s`), so a slow upstream fails the request in time instead of
+  stalling it until the client gives up. The bound is wall-clock (asyncio.wait_for),
+  not just the client's per-phase timeout, which a slow trickle of bytes never trips;
+  streamed responses are read through bounded() for the same reason
+- retries transient failures (timeouts, connection errors, 429 and 5xx) with capped
+  exponential backoff and full jitter, honouring Retry-After
+- optionally hedges: if an attempt has not finished after the upstream's recent p95
+  latency, a duplicate is sent and the first success wins (HEDGE_UPSTREAMS)
+- keeps one circuit breaker per upstream. After BREAKER_FAILURES consecutive
+  failures, calls fail fast with CircuitOpenError for BREAKER_COOLDOWN_S, then a
+  single trial call decides whether the breaker closes again
+
+Callers turn these failures into partial results: schools without weather, a tool
+error the model can explain, or the schools found so far when the final LLM call
+cannot be made.
+
+Example:
+    >>> with deadline(20):
+    ...     data = await call("scorecard", lambda timeout: client.get(url, timeout=timeout))
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from os import getenv
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+import httpx
+
+from model.config import logger
+from model.metrics import REGISTRY, Counter
+
+T = TypeVar("T")
+
+# Default per-request deadline when the client sends none (0 = no deadline)
+REQUEST_DEADLINE_S = float(getenv("REQUEST_DEADLINE_S", "60"))
+# Per-attempt timeout for OpenAI calls (still capped by the request deadline)
+LLM_TIMEOUT_S = float(getenv("LLM_TIMEOUT_S", "60"))
+# Attempts per call, including the first, and the backoff between them
+RETRY_ATTEMPTS = int(getenv("RETRY_ATTEMPTS", "3"))
+RETRY_BASE_S = float(getenv("RETRY_BASE_S", "0.2"))
+RETRY_MAX_S = float(getenv("RETRY_MAX_S", "2"))
+# Upstreams whose slow attempts are duplicated after their p95 latency, e.g. "scorecard,weather"
+HEDGE_UPSTREAMS = {name.strip() for name in getenv("HEDGE_UPSTREAMS", "").split(",") if name.strip()}
+HEDGE_MIN_DELAY_S = float(getenv("HEDGE_MIN_DELAY_S", "0.05"))
+# Successful latencies needed before an upstream's p95 is trusted for hedging
+HEDGE_MIN_SAMPLES = int(getenv("HEDGE_MIN_SAMPLES", "20"))
+BREAKER_FAILURES = int(getenv("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_S = float(getenv("BREAKER_COOLDOWN_S", "30"))
+
+RESILIENCE_EVENTS = REGISTRY.register(Counter(
+    "gatorguide_resilience_events_total",
+    "Upstream resilience events (retry, hedge, hedge_won, breaker_open, short_circuit, deadline, partial_result)",
+    ["upstream", "event"],
+))
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream call was not attempted or abandoned by the resilience layer."""
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """The request's deadline passed before the upstream answered."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The upstream's circuit breaker is open; the call failed fast."""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"{upstream} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Give upstream calls in this block (and tasks started from it) a shared deadline.
+
+    A nested deadline can only shorten the current one. None or 0 leaves it unchanged.
+    """
+    with deadline_at(time.monotonic() + seconds if seconds else None):
+        yield
+
+
+@contextmanager
+def deadline_at(ends: Optional[float]) -> Iterator[None]:
+    """
+    Like deadline(), but ending at `ends` on the time.monotonic() clock.
+
+    Lets one request deadline span separate blocks, e.g. admission and a streamed
+    response that runs after the handler returns. None leaves it unchanged.
+    """
+    current = _deadline.get()
+    if ends is not None:
+        current = ends if current is None else min(current, ends)
+    token = _deadline.set(current)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current request's deadline, or None without one."""
+    ends = _deadline.get()
+    return None if ends is None else ends - time.monotonic()
+
+
+def attempt_timeout(default: Optional[float]) -> Optional[float]:
+    """
+    Timeout for the next attempt: `default`, capped by the time left.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    left = time_left()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return left if default is None else min(default, left)
+
+
+async def bounded(items: AsyncIterable[T], timeout: Optional[float]) -> AsyncIterator[T]:
+    """
+    Iterate `items` (e.g. a streamed completion) within `timeout` seconds of wall-clock
+    time, also capped by the request deadline.
+
+    Raises:
+        DeadlineExceeded: The request deadline passed first
+        asyncio.TimeoutError: `timeout` passed first
+    """
+    budget = attempt_timeout(timeout)
+    ends = None if budget is None else time.monotonic() + budget
+    iterator = items.__aiter__()
+    while True:
+        remaining = None if ends is None else ends - time.monotonic()
+        try:
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError()
+            item = await asyncio.wait_for(iterator.__anext__(), remaining)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            left = time_left()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded("Request deadline exceeded while reading a stream") from None
+            raise
+        yield item
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed -> open -> half_open (one trial) -> closed."""
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_s: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.cooldown_s:
+                self.state = "half_open"
+            # Half-open lets one trial through per cooldown (a cancelled trial expires)
+            if self.state == "half_open" and now - self._trial_started >= self.cooldown_s:
+                self._trial_started = now
+                return
+            retry_after = max(0.0, self.opened_at + self.cooldown_s - now)
+        RESILIENCE_EVENTS.inc(upstream=self.name, event="short_circuit")
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"✅ Circuit for {self.name} closed")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                opened = True
+            else:
+                opened = False
+        if opened:
+            RESILIENCE_EVENTS.inc(upstream=self.name, event="breaker_open")
+            logger.warning(f"🔌 Circuit for {self.name} opened after {self.failures} failures")
+
+
+class _Upstream:
+    """Breaker and recent successful latencies (for the hedge delay) of one upstream."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(name, BREAKER_FAILURES, BREAKER_COOLDOWN_S)
+        self.latencies: deque = deque(maxlen=200)
+
+    def hedge_delay(self) -> Optional[float]:
+        if self.name not in HEDGE_UPSTREAMS or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return max(HEDGE_MIN_DELAY_S, ordered[int(0.95 * (len(ordered) - 1))])
+
+
+_upstreams: Dict[str, _Upstream] = {}
+_upstreams_lock = threading.Lock()
+
+
+def _upstream(name: str) -> _Upstream:
+    with _upstreams_lock:
+        if name not in _upstreams:
+            _upstreams[name] = _Upstream(name)
+        return _upstreams[name]
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # httpx.HTTPStatusError and openai.APIStatusError both carry the response
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, 408/409/429 and 5xx are worth another attempt."""
+    if isinstance(error, UpstreamUnavailable):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    # openai wraps connection errors and timeouts in APIConnectionError / APITimeoutError
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt: int, error: Optional[BaseException] = None) -> float:
+    """
+    Full-jitter exponential backoff before retry number `attempt` (1 = first retry).
+
+    Example:
+        >>> backoff_delay(1), backoff_delay(3)  # RETRY_BASE_S=0.2, RETRY_MAX_S=2
+        (0.13, 0.61)  # uniform in [0, 0.2] and [0, 0.8]
+    """
+    delay = random.uniform(0, min(RETRY_MAX_S, RETRY_BASE_S * 2 ** (attempt - 1)))
+    retry_after = _retry_after(error) if error is not None else None
+    return max(delay, min(retry_after, RETRY_MAX_S)) if retry_after is not None else delay
+
+
+async def _hedged(upstream: _Upstream, operation: Callable[[Optional[float]], Awaitable[T]], timeout: Optional[float]) -> T:
+    delay = upstream.hedge_delay()
+    if delay is None or (timeout is not None and delay >= timeout):
+        return await operation(timeout)
+
+    # Tasks copy the context, so both attempts see the request's deadline and usage tracker
+    first = asyncio.ensure_future(operation(timeout))
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            RESILIENCE_EVENTS.inc(upstream=upstream.name, event="hedge")
+            second = asyncio.ensure_future(operation(attempt_timeout(timeout)))
+            tasks.add(second)
+        error: Optional[BaseException] = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        RESILIENCE_EVENTS.inc(upstream=upstream.name, event="hedge_won")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def call(
+    upstream: str,
+    operation: Callable[[Optional[float]], Awaitable[T]],
+    timeout: Optional[float] = None,
+    hedge: bool = True,
+) -> T:
+    """
+    Run an upstream call with the request deadline, retries, hedging and the circuit breaker.
+
+    Args:
+        upstream (str): Upstream name ("openai", "scorecard", "weather"); one breaker each
+        operation (Callable[[Optional[float]], Awaitable[T]]): Makes one attempt, given
+            its timeout in seconds (None = the client's own default)
+        timeout (Optional[float]): Per-attempt wall-clock timeout, capped by the time left
+        hedge (bool): Allow a hedged duplicate (only for upstreams in HEDGE_UPSTREAMS);
+            pass False for calls whose result must be closed, like streams
+
+    Returns:
+        T: The first successful attempt's result
+
+    Raises:
+        CircuitOpenError: The upstream's breaker is open
+        DeadlineExceeded: The request's deadline passed before a successful attempt
+        Exception: The last attempt's error once retries are exhausted, or any
+            non-retryable error (e.g. HTTP 400) right away
+    """
+    state = _upstream(upstream)
+    attempt = 0
+    while True:
+        attempt += 1
+        state.breaker.before_call()
+        try:
+            attempt_budget = attempt_timeout(timeout)
+        except DeadlineExceeded:
+            RESILIENCE_EVENTS.inc(upstream=upstream, event="deadline")
+            raise
+        started = time.monotonic()
+        try:
+            # The client's own timeout only bounds each connect/read/write phase
+            if hedge:
+                result = await asyncio.wait_for(_hedged(state, operation, attempt_budget), attempt_budget)
+            else:
+                result = await asyncio.wait_for(operation(attempt_budget), attempt_budget)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            left = time_left()
+            if left is not None and left <= 0:
+                # Cut short by our own deadline, which says nothing about the upstream's health
+                RESILIENCE_EVENTS.inc(upstream=upstream, event="deadline")
+                raise DeadlineExceeded(f"Request deadline exceeded waiting for {upstream}") from e
+            state.breaker.record_failure()
+            delay = backoff_delay(attempt, e)
+            if attempt >= RETRY_ATTEMPTS or (left is not None and delay >= left):
+                raise
+            RESILIENCE_EVENTS.inc(upstream=upstream, event="retry")
+            logger.warning(f"🔁 {upstream} attempt {attempt} failed ({e!r}); retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+        state.breaker.record_success()
+        state.latencies.append(time.monotonic() - started)
+        return result
+
+
+def stats() -> Dict[str, Any]:
+    """
+    Breaker state and hedge delay per upstream seen so far.
+
+    Returns:
+        dict: {upstream: {"state", "consecutive_failures", "times_opened", "hedge_delay_s"}}
+    """
+    with _upstreams_lock:
+        upstreams = list(_upstreams.values())
+    return {
+        state.name: {
+            "state": state.breaker.state,
+            "consecutive_failures": state.breaker.failures,
+            "times_opened": state.breaker.times_opened,
+            "hedge_delay_s": state.hedge_delay(),
+        }
+        for state in upstreams
+    }
+
+
+def reset() -> None:
+    """Forget breaker states and latencies (tests and benchmarks)."""
+    with _upstreams_lock:
+        _upstreams.clear()
@@ -0,0 +1,58 @@
+"""
+Bridge for calling the async advisor pipeline from synchronous code.
+
+The agent, dispatcher and tools are implemented as coroutines. Synchronous callers
+(the CLI, scripts, notebooks) go through run_sync(), which executes the coroutine on
+a single long-lived background event loop. Keeping one loop for all sync callers
+means async clients created on it stay usable between calls.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever, name="gatorguide-sync-loop", daemon=True
+            )
+            _loop_thread.start()
+    return _loop
+
+
+def run_sync(coro: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine to completion from synchronous code and return its result.
+
+    Args:
+        coro: Coroutine to execute (e.g., run_advisor_agent_async("Show me MIT"))
+
+    Returns:
+        Any: Whatever the coroutine returns; exceptions are re-raised in the caller
+
+    Raises:
+        RuntimeError: If called from code already running on the background loop
+            (e.g. a tool calling a sync helper), which would otherwise wait on
+            itself forever; await the async variant there instead
+
+    Example:
+        >>> run_sync(get_weather_async(47.6550, -122.3035))
+        {'temperature_2m': 8.5, 'wind_speed_10m': 12.1, ...}
+    """
+    loop = _get_loop()
+    if threading.current_thread() is _loop_thread:
+        if asyncio.iscoroutine(coro):
+            coro.close()
+        raise RuntimeError(
+            "run_sync() was called from the background event loop's own thread, where it "
+            "would deadlock; await the async function instead"
+        )
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
@@ -0,0 +1,283 @@
+"""
+Offline College Scorecard store used as a local backend for the search tools.
+
+The US Department of Education publishes the Scorecard as a bulk CSV
+(Most-Recent-Cohorts-Institution.csv). This module ingests that file, or any subset
+with the same column headers, into an indexed SQLite database and answers the same
+query parameters the tools send to api.data.gov, returning rows with the same dotted
+keys (e.g. "latest.cost.tuition.in_state"). Set SCORECARD_BACKEND=local to use it.
+
+Usage:
+    python -m model.agent.scorecard_store ingest Most-Recent-Cohorts-Institution.csv
+    python -m model.agent.scorecard_store ingest subset.csv --db /tmp/scorecard.db
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from model.config import logger
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "scorecard.db")
+SCORECARD_DB_PATH = os.getenv("SCORECARD_DB_PATH", DEFAULT_DB_PATH)
+
+# Dotted API field -> (store column, bulk CSV column, SQL type)
+FIELDS: Dict[str, Tuple[str, str, str]] = {
+    "id": ("id", "UNITID", "INTEGER PRIMARY KEY"),
+    "school.name": ("name", "INSTNM", "TEXT"),
+    "school.alias": ("alias", "ALIAS", "TEXT"),
+    "school.city": ("city", "CITY", "TEXT"),
+    "school.state": ("state", "STABBR", "TEXT"),
+    "location.lat": ("lat", "LATITUDE", "REAL"),
+    "location.lon": ("lon", "LONGITUDE", "REAL"),
+    "latest.admissions.admission_rate.overall": ("admission_rate", "ADM_RATE", "REAL"),
+    "latest.admissions.sat_scores.average.overall": ("sat_avg", "SAT_AVG", "INTEGER"),
+    "latest.cost.tuition.in_state": ("tuition_in_state", "TUITIONFEE_IN", "INTEGER"),
+    "latest.cost.tuition.out_of_state": ("tuition_out_of_state", "TUITIONFEE_OUT", "INTEGER"),
+    "latest.earnings.6_yrs_after_entry.median": ("earnings_6yr", "MD_EARN_WNE_P6", "INTEGER"),
+}
+
+# Numeric columns that state searches filter on; each gets a (state, column) index
+RANGE_COLUMNS = ["admission_rate", "sat_avg", "tuition_in_state", "tuition_out_of_state", "earnings_6yr"]
+
+_MISSING_VALUES = {"", "NULL", "NA", "PrivacySuppressed"}
+
+
+class ScorecardStoreError(RuntimeError):
+    """Raised when the local store is missing or a query cannot be answered."""
+
+
+def name_key(name: str) -> str:
+    """Normalize a school name for prefix lookups: case-folded, single-spaced."""
+    return " ".join(str(name).split()).casefold()
+
+
+def _convert(value: Optional[str], sql_type: str) -> Any:
+    if value is None or value.strip() in _MISSING_VALUES:
+        return None
+    value = value.strip()
+    if sql_type.startswith("INTEGER"):
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+    if sql_type == "REAL":
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return value
+
+
+def _read_rows(csv_path: str) -> Iterator[tuple]:
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for record in reader:
+            row = [_convert(record.get(csv_col), sql_type) for _, csv_col, sql_type in FIELDS.values()]
+            name = row[1]
+            if row[0] is None or not name:
+                continue
+            yield tuple(row) + (name_key(name),)
+
+
+def ingest(csv_path: str, db_path: str = SCORECARD_DB_PATH) -> int:
+    """
+    Load a Scorecard bulk CSV into an indexed SQLite store, replacing any existing data.
+
+    Args:
+        csv_path (str): Path to Most-Recent-Cohorts-Institution.csv or a subset with the same headers
+        db_path (str): Destination database file (default: SCORECARD_DB_PATH)
+
+    Returns:
+        int: Number of institutions loaded
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    columns = ", ".join(f"{column} {sql_type}" for column, _, sql_type in FIELDS.values())
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(f"CREATE TABLE schools ({columns}, name_key TEXT NOT NULL)")
+        placeholders = ", ".join("?" for _ in range(len(FIELDS) + 1))
+        conn.executemany(f"INSERT OR REPLACE INTO schools VALUES ({placeholders})", _read_rows(csv_path))
+        conn.execute("CREATE INDEX idx_schools_name_key ON schools(name_key)")
+        conn.execute("CREATE INDEX idx_schools_state_name_key ON schools(state, name_key)")
+        for column in RANGE_COLUMNS:
+            conn.execute(f"CREATE INDEX idx_schools_state_{column} ON schools(state, {column})")
+            conn.execute(f"CREATE INDEX idx_schools_{column} ON schools({column})")
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM schools").fetchone()[0]
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    logger.info(f"📦 Ingested {count} institutions into {db_path}")
+    return count
+
+
+def parse_range(value: str) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Parse the Scorecard "MIN..MAX" range syntax; either side may be empty.
+
+    Example:
+        >>> parse_range("0..0.5")
+        (0.0, 0.5)
+        >>> parse_range("1400..")
+        (1400.0, None)
+    """
+    bounds = str(value).replace(" ", "").split("..")
+    if len(bounds) != 2:
+        raise ScorecardStoreError(f"Invalid range: {value!r} (expected 'MIN..MAX')")
+    try:
+        low, high = (float(b) if b else None for b in bounds)
+    except ValueError:
+        raise ScorecardStoreError(f"Invalid range: {value!r} (expected 'MIN..MAX')")
+    return low, high
+
+
+def _requested_fields(fields_param: Optional[str]) -> List[str]:
+    fields = [f.strip() for f in str(fields_param or "").split(",") if f.strip()]
+    return [f for f in fields if f in FIELDS] or list(FIELDS)
+
+
+class ScorecardStore:
+    """
+    Read-only query interface over the SQLite store.
+
+    Accepts the same parameter dict the tools send to the College Scorecard API
+    ("fields", "school.name", "school.state", "<field>__range", "per_page").
+    """
+
+    def __init__(self, db_path: str = SCORECARD_DB_PATH):
+        if not os.path.exists(db_path):
+            raise ScorecardStoreError(
+                f"Local Scorecard store not found at {db_path}. "
+                "Run: python -m model.agent.scorecard_store ingest <scorecard.csv>"
+            )
+        self.db_path = db_path
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, args: list) -> list:
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def search(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Answer a Scorecard API-style query from the local store.
+
+        School names match by prefix first (index-backed); if no school starts with the
+        given name, any school whose name contains it is returned instead.
+
+        Args:
+            params (Dict[str, Any]): Scorecard query parameters
+
+        Returns:
+            List[Dict[str, Any]]: Rows keyed by the requested dotted field names
+
+        Example:
+            >>> store.search({"fields": "school.name,school.state", "school.state": "WA", "per_page": 2})
+            [{'school.name': 'Bellevue College', 'school.state': 'WA'}, ...]
+        """
+        fields = _requested_fields(params.get("fields"))
+        columns = ", ".join(FIELDS[f][0] for f in fields)
+
+        where, args = [], []
+        state = params.get("school.state")
+        if state:
+            where.append("state = ?")
+            args.append(str(state).strip().upper())
+        for name, value in params.items():
+            if not name.endswith("__range") or value in (None, ""):
+                continue
+            field = name[: -len("__range")]
+            if field not in FIELDS:
+                raise ScorecardStoreError(f"Unsupported range field: {field}")
+            column = FIELDS[field][0]
+            low, high = parse_range(value)
+            if low is not None:
+                where.append(f"{column} >= ?")
+                args.append(low)
+            if high is not None:
+                where.append(f"{column} <= ?")
+                args.append(high)
+            if low is None and high is None:
+                where.append(f"{column} IS NOT NULL")
+
+        limit = int(params.get("per_page") or 20)
+        school_name = params.get("school.name")
+        started = time.perf_counter()
+        if school_name:
+            key = name_key(school_name)
+            prefix_where = where + ["name_key >= ?", "name_key < ?"]
+            rows = self._select(columns, prefix_where, args + [key, key + "\uffff"], limit)
+            if not rows:
+                rows = self._select(columns, where + ["name_key LIKE ?"], args + [f"%{key}%"], limit)
+        else:
+            rows = self._select(columns, where, args, limit)
+        logger.info(f"📦 Local Scorecard store returned {len(rows)} rows in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return [dict(zip(fields, row)) for row in rows]
+
+    def fetch(self, ids: List[int], fields_param: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Materialize rows by UNITID, preserving the order of `ids`.
+
+        Args:
+            ids (List[int]): UNITIDs (e.g., from the columnar engine)
+            fields_param (Optional[str]): Comma-separated dotted fields, as in the API "fields" param
+
+        Returns:
+            List[Dict[str, Any]]: Rows keyed by the requested dotted field names
+        """
+        if not ids:
+            return []
+        fields = _requested_fields(fields_param)
+        columns = ", ".join(FIELDS[f][0] for f in fields)
+        placeholders = ", ".join("?" for _ in ids)
+        rows = self._execute(f"SELECT id, {columns} FROM schools WHERE id IN ({placeholders})", list(ids))
+        by_id = {row[0]: dict(zip(fields, row[1:])) for row in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def _select(self, columns: str, where: List[str], args: list, limit: int) -> list:
+        sql = f"SELECT {columns} FROM schools"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY name_key LIMIT ?"
+        return self._execute(sql, args + [limit])
+
+
+_store: Optional[ScorecardStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ScorecardStore:
+    """Return the process-wide ScorecardStore, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ScorecardStore()
+    return _store
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the offline College Scorecard store")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    ingest_cmd = subcommands.add_parser("ingest", help="Load a Scorecard bulk CSV into the store")
+    ingest_cmd.add_argument("csv_path", help="Most-Recent-Cohorts-Institution.csv or a subset")
+    ingest_cmd.add_argument("--db", default=SCORECARD_DB_PATH, help="Database path")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        count = ingest(args.csv_path, args.db)
+        print(f"Loaded {count} institutions into {args.db}")
+        print("Build the columnar range engine with: python -m model.agent.columnar build")
+
+
+if __name__ == "__main__":
+    main()
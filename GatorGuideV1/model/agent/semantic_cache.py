@@ -0,0 +1,297 @@
+"""
+Semantic response cache for repeated advisor questions.
+
+Students ask the same things in different words ("top schools in California",
+"best colleges in CA"). Entries are bucketed by the normalized StudentIntent fields
+(intent, school name, state) and, within a bucket, matched by cosine similarity of a
+local hashed n-gram embedding of the query text. A hit returns the stored
+AdvisorResponse without any OpenAI, Scorecard or Open-Meteo calls.
+
+Queries whose numbers differ ("under 20% acceptance" vs "under 40%") never match,
+since numbers usually become search filters. Neither do queries that differ in a
+negation or a qualifier such as "international", "in-state", "out-of-state" or
+"cheap": one word changes the answer but barely moves the embedding ("schools not in
+California" scores 0.96 against "schools in California"), so these words are part
+of the exact-match key too.
+
+The cache is off by default (SEMANTIC_CACHE_ENABLED=1 turns it on).
+"""
+
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from model.config import logger
+from model.agent.cache import estimate_size
+from model.agent.fast_intent import US_STATES
+from model.agent.name_index import normalize_name
+from model.schemas.advisorResponse import AdvisorResponse
+from model.schemas.studentIntent import StudentIntent
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+# Responses embed current weather, so entries live about as long as weather_cache
+SEMANTIC_CACHE_TTL_S = float(os.getenv("SEMANTIC_CACHE_TTL_S", "600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))
+SEMANTIC_CACHE_MAX_BYTES = int(os.getenv("SEMANTIC_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+EMBEDDING_DIM = 512
+
+# Words that carry no meaning for retrieval, and synonyms folded onto one token
+_STOP_WORDS = {
+    "a", "an", "the", "of", "in", "at", "for", "to", "me", "my", "i", "some", "any",
+    "show", "find", "list", "give", "what", "which", "are", "is", "please", "can", "you",
+}
+_SYNONYMS = {
+    "best": "top", "good": "top", "great": "top", "leading": "top",
+    "college": "school", "colleges": "school", "university": "school", "universities": "school",
+    "schools": "school", "campus": "school", "campuses": "school",
+    "cheap": "affordable", "inexpensive": "affordable", "low": "affordable",
+    "selective": "competitive", "elite": "competitive", "prestigious": "competitive",
+}
+_STATE_NAME_RE = re.compile(r"\b(" + "|".join(sorted(US_STATES, key=len, reverse=True)) + r")\b")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+# Negations and qualifiers that must match exactly, like numbers -> the token they key on
+_QUALIFIERS = [
+    (re.compile(r"\b(not|no|non|never|without|except|excluding|avoid|don'?t|isn'?t|aren'?t)\b"), "not"),
+    (re.compile(r"\bout[\s-]+of[\s-]+state\b"), "out-of-state"),
+    (re.compile(r"\bin[\s-]+state\b"), "in-state"),
+    (re.compile(r"\b(international|foreign)\b"), "international"),
+    (re.compile(r"\b(cheap|cheaper|cheapest|affordable|inexpensive|low[\s-]+cost|budget)\b"), "affordable"),
+    (re.compile(r"\b(expensive|pricey)\b"), "expensive"),
+    (re.compile(r"\bpublic\b"), "public"),
+    (re.compile(r"\bprivate\b"), "private"),
+    (re.compile(r"\bonline\b"), "online"),
+    (re.compile(r"\bcommunity\b"), "community"),
+]
+
+
+def normalize_query(text: str) -> str:
+    """
+    Reduce a query to the words that matter for matching.
+
+    Example:
+        >>> normalize_query("Best colleges in California")
+        'top school ca'
+    """
+    text = _STATE_NAME_RE.sub(lambda m: US_STATES[m.group(1)].lower(), str(text).casefold())
+    words = (_SYNONYMS.get(w, w) for w in normalize_name(text).split())
+    return " ".join(w for w in words if w not in _STOP_WORDS)
+
+
+def exact_terms(text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    The numbers and qualifiers of a raw query, which a cache hit must match exactly.
+
+    Example:
+        >>> exact_terms("Cheap out-of-state schools, not in Texas, under 30%")
+        (('30',), ('affordable', 'not', 'out-of-state'))
+    """
+    lowered = str(text).casefold()
+    qualifiers = {token for pattern, token in _QUALIFIERS if pattern.search(lowered)}
+    return tuple(_NUMBER_RE.findall(lowered)), tuple(sorted(qualifiers))
+
+
+def embed(text: str) -> np.ndarray:
+    """
+    Embed a query as an L2-normalized hashed bag of words and character trigrams.
+
+    Args:
+        text (str): Query text (normalized with normalize_query() first)
+
+    Returns:
+        np.ndarray: float32 vector of length EMBEDDING_DIM
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for word in text.split():
+        vector[zlib.crc32(word.encode()) % EMBEDDING_DIM] += 2.0
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(padded[i:i + 3].encode()) % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def intent_key(intent: StudentIntent) -> Tuple[str, str, str]:
+    """Bucket key from the normalized intent fields."""
+    return (
+        intent.intent.strip().lower(),
+        normalize_name(intent.school_name or ""),
+        (intent.state or "").strip().upper(),
+    )
+
+
+class _Entry:
+    __slots__ = ("bucket", "exact", "vector", "response", "expires_at", "size")
+
+    def __init__(self, bucket, exact, vector, response, expires_at, size):
+        self.bucket = bucket
+        self.exact = exact
+        self.vector = vector
+        self.response = response
+        self.expires_at = expires_at
+        self.size = size
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of AdvisorResponses, bounded by TTL, entry count and bytes.
+
+    Example:
+        >>> cache = SemanticCache("advisor_responses", threshold=0.9, ttl_s=600,
+        ...                       max_entries=1024, max_bytes=8_000_000)
+        >>> cache.set("top schools in California", intent, response)
+        >>> cache.get("best colleges in CA", intent)
+        AdvisorResponse(response="Here are some top schools in California...", ...)
+    """
+
+    def __init__(self, name: str, threshold: float, ttl_s: float, max_entries: int, max_bytes: int):
+        self.name = name
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[Hashable, List[int]] = {}
+        self._next_id = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._hit_similarity = 0.0
+        self._miss_similarity = 0.0
+        self._scored_misses = 0
+
+    def _remove(self, entry_id: int) -> _Entry:
+        entry = self._entries.pop(entry_id)
+        self._buckets[entry.bucket].remove(entry_id)
+        if not self._buckets[entry.bucket]:
+            del self._buckets[entry.bucket]
+        self._bytes -= entry.size
+        return entry
+
+    def get(self, query: str, intent: StudentIntent) -> Optional[AdvisorResponse]:
+        """
+        Return a copy of the most similar cached response for this intent, if close enough.
+
+        Args:
+            query (str): Student's query text
+            intent (StudentIntent): Intent extracted for the query
+
+        Returns:
+            Optional[AdvisorResponse]: Cached response, or None on a miss
+        """
+        normalized = normalize_query(query)
+        vector = embed(normalized)
+        exact = exact_terms(query)
+        bucket = intent_key(intent)
+        now = time.monotonic()
+
+        with self._lock:
+            candidates = []
+            for entry_id in list(self._buckets.get(bucket, [])):
+                entry = self._entries[entry_id]
+                if entry.expires_at <= now:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                elif entry.exact == exact:
+                    candidates.append(entry_id)
+
+            best_id, best_similarity = None, 0.0
+            if candidates:
+                matrix = np.stack([self._entries[i].vector for i in candidates])
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                best_id, best_similarity = candidates[best], float(similarities[best])
+
+            if best_id is None or best_similarity < self.threshold:
+                self.misses += 1
+                if best_id is not None:
+                    self._scored_misses += 1
+                    self._miss_similarity += best_similarity
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            self._hit_similarity += best_similarity
+            response = self._entries[best_id].response
+
+        logger.info(f"🧠 Semantic cache hit ({best_similarity:.2f}) for {query!r}")
+        return response.model_copy(deep=True)
+
+    def set(self, query: str, intent: StudentIntent, response: AdvisorResponse) -> None:
+        """Store `response` for this query and intent, evicting least recently used entries if over budget."""
+        normalized = normalize_query(query)
+        size = estimate_size(response.model_dump())
+        if size > self.max_bytes:
+            return
+        entry = _Entry(
+            bucket=intent_key(intent),
+            exact=exact_terms(query),
+            vector=embed(normalized),
+            response=response.model_copy(deep=True),
+            expires_at=time.monotonic() + self.ttl_s,
+            size=size,
+        )
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._buckets.setdefault(entry.bucket, []).append(entry_id)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache counters.
+
+        Returns:
+            Dict[str, Any]: entries, bytes, hits, misses, evictions, expirations, hit_rate,
+                threshold, mean similarity of hits, and mean best-candidate similarity of
+                misses that had a candidate (how close near-misses came)
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "threshold": self.threshold,
+                "mean_hit_similarity": self._hit_similarity / self.hits if self.hits else 0.0,
+                "mean_near_miss_similarity": (
+                    self._miss_similarity / self._scored_misses if self._scored_misses else 0.0
+                ),
+            }
+
+
+response_cache = SemanticCache(
+    "advisor_responses",
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl_s=SEMANTIC_CACHE_TTL_S,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    max_bytes=SEMANTIC_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,128 @@
+"""
+Compact serialization of tool results for the LLM.
+
+Tool results are sent back to the model as `tool` messages and then re-sent with the
+whole history on the final call, so their size is paid for twice. Instead of dumping
+each row as a JSON object, lists of records are laid out as a table (column names
+once, then one array per row). Only the fields the model can use are kept: the
+School schema's fields for college searches, the requested weather fields for
+get_weather. Floats are rounded, empty columns dropped, and rows beyond
+TOOL_RESULT_MAX_ROWS or TOOL_RESULT_MAX_TOKENS are cut from the tail. Search results
+are ranked, so the tail matters least.
+
+Example:
+    >>> serialize_tool_result(schools, "state_search_colleges")
+    '{"columns":["name","city","state","acceptance_rate",...],"rows":[["University of
+    Washington","Seattle","WA",0.43,...],...],"total":20,"omitted":10}'
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from model.agent.tools import WEATHER_CURRENT_FIELDS
+from model.agent.usage import estimate_tokens
+from model.schemas.school import School
+
+# "0" sends tool results as plain JSON (safe_json_serialize) instead
+COMPACT_TOOL_RESULTS = os.getenv("COMPACT_TOOL_RESULTS", "1") == "1"
+# Per tool message: most rows kept, and estimated token cap (rows are dropped from the tail)
+TOOL_RESULT_MAX_ROWS = int(os.getenv("TOOL_RESULT_MAX_ROWS", "10"))
+TOOL_RESULT_MAX_TOKENS = int(os.getenv("TOOL_RESULT_MAX_TOKENS", "1200"))
+
+# Fields the model needs from each tool; results of other tools are kept whole
+TOOL_FIELDS: Dict[str, Sequence[str]] = {
+    "search_colleges": tuple(School.model_fields),
+    "state_search_colleges": tuple(School.model_fields),
+    "get_weather": tuple(WEATHER_CURRENT_FIELDS.split(",")),
+}
+
+
+def round_value(value: Any) -> Any:
+    """
+    Round floats to the precision that matters for advice.
+
+    Example:
+        >>> round_value(0.43187), round_value(8.5321), round_value(12345.6)
+        (0.432, 8.5, 12346)
+    """
+    if isinstance(value, bool) or not isinstance(value, float):
+        return value
+    if abs(value) >= 100:
+        return int(round(value))
+    return round(value, 1 if abs(value) >= 1 else 3)
+
+
+def _flatten(record: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    # Nested objects (e.g. "weather") become dotted columns
+    flat = {}
+    for key, value in record.items():
+        if fields is not None and key not in fields:
+            continue
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                flat[f"{key}.{sub_key}"] = round_value(sub_value)
+        else:
+            flat[key] = round_value(value)
+    return flat
+
+
+def to_table(records: List[Dict[str, Any]], fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Lay out records as {"columns": [...], "rows": [[...], ...]}, dropping all-empty columns.
+
+    Args:
+        records (List[Dict[str, Any]]): Rows with (mostly) the same keys
+        fields (Optional[Sequence[str]]): Top-level keys to keep, in any order (None keeps all)
+    """
+    flat = [_flatten(record, fields) for record in records]
+    columns: List[str] = []
+    for record in flat:
+        columns.extend(key for key in record if key not in columns)
+    columns = [c for c in columns if any(record.get(c) is not None for record in flat)]
+    return {"columns": columns, "rows": [[record.get(c) for c in columns] for record in flat]}
+
+
+def _dumps(payload: Any) -> str:
+    return json.dumps(payload, default=str, separators=(",", ":"), ensure_ascii=False)
+
+
+def serialize_tool_result(
+    result: Any,
+    tool_name: Optional[str] = None,
+    max_rows: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    Serialize one tool result for a `tool` message as compactly as the model can use it.
+
+    Args:
+        result (Any): Tool return value (list of records, dict, or {"error": ...})
+        tool_name (Optional[str]): Tool that produced it, to pick the fields to keep
+        max_rows (Optional[int]): Most rows to include (default TOOL_RESULT_MAX_ROWS)
+        max_tokens (Optional[int]): Estimated token cap (default TOOL_RESULT_MAX_TOKENS)
+
+    Returns:
+        str: Compact JSON. Lists of records become a table with "total" and, when
+            rows were cut, "omitted"
+    """
+    fields = TOOL_FIELDS.get(tool_name or "")
+    if isinstance(result, dict):
+        if "error" in result:
+            return _dumps({"error": str(result["error"])})
+        return _dumps({k: v for k, v in _flatten(result, fields).items() if v is not None})
+    if not isinstance(result, list) or not all(isinstance(row, dict) for row in result):
+        return _dumps(round_value(result))
+
+    max_rows = TOOL_RESULT_MAX_ROWS if max_rows is None else max_rows
+    max_tokens = TOOL_RESULT_MAX_TOKENS if max_tokens is None else max_tokens
+    table = to_table(result[:max_rows], fields)
+    table["total"] = len(result)
+    while True:
+        shown = len(table["rows"])
+        if shown < len(result):
+            table["omitted"] = len(result) - shown
+        text = _dumps(table)
+        if shown <= 1 or estimate_tokens(text) <= max_tokens:
+            return text
+        table["rows"].pop()
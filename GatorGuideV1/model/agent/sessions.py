@@ -0,0 +1,165 @@
+"""
+Server-side conversation sessions for follow-up questions.
+
+A session keeps the previous turns of a conversation (what the student asked, the
+advice and the schools recommended) and the tool results fetched so far, so that
+"what about cheaper ones?" is answered in context: the history goes into the prompt,
+and a search the agent already ran is served from the session instead of calling
+the Scorecard API again. A narrower repeat of an earlier search (the same state with
+a lower tuition cap) is answered by filtering the rows already fetched (see
+SharedToolCalls.narrowed()). Stored tool results expire after SESSION_TOOL_TTL_S.
+
+History is kept bounded. Once the turns pass SESSION_HISTORY_MAX_TOKENS, the oldest
+turns (all but the last SESSION_KEEP_TURNS) are folded into one summary line each.
+The summary is extractive (the question and the schools suggested), so compaction
+is deterministic and costs no extra LLM call. Sessions expire after SESSION_TTL_S
+of inactivity.
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Dict, List
+
+from model.agent.cache import TTLCache
+from model.agent.dispatcher import SharedToolCalls
+from model.agent.serialize import serialize_tool_result
+from model.agent.usage import estimate_tokens
+from model.config import logger
+from model.metrics import REGISTRY, Counter
+
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", "1800"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+# Prompt tokens of verbatim history before older turns are compacted into the summary
+SESSION_HISTORY_MAX_TOKENS = int(os.getenv("SESSION_HISTORY_MAX_TOKENS", "1500"))
+SESSION_KEEP_TURNS = int(os.getenv("SESSION_KEEP_TURNS", "2"))
+SESSION_SUMMARY_MAX_LINES = int(os.getenv("SESSION_SUMMARY_MAX_LINES", "10"))
+# Tool results kept per session for reuse by follow-ups (oldest dropped first)
+SESSION_MAX_TOOL_RESULTS = int(os.getenv("SESSION_MAX_TOOL_RESULTS", "16"))
+# How long they may be reused; weather is among them, so as long as weather_cache keeps it
+SESSION_TOOL_TTL_S = float(os.getenv("SESSION_TOOL_TTL_S", os.getenv("WEATHER_CACHE_TTL_S", "600")))
+
+SESSION_EVENTS = REGISTRY.register(Counter(
+    "gatorguide_session_events_total",
+    "Conversation session events (turn, compaction)",
+    ["event"],
+))
+
+
+class Session:
+    """
+    One student's conversation: recent turns, a summary of older ones, and reusable tool results.
+
+    Example:
+        >>> session = session_store.get_or_create("4f1c...")
+        >>> result = await run_advisor_agent_async("Colleges in Washington", session=session)
+        >>> result = await run_advisor_agent_async("What about cheaper ones?", session=session)
+        >>> session.tool_calls.filtered  # "cheaper" answered from the first search's rows
+        1
+    """
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.turns: List[Dict[str, Any]] = []
+        self.summary: List[str] = []
+        self.tool_calls = SharedToolCalls(ttl_s=SESSION_TOOL_TTL_S)
+        # One turn at a time, so history and tool results stay consistent
+        self.lock = asyncio.Lock()
+
+    def history_messages(self) -> List[Dict[str, str]]:
+        """Chat messages that replay the conversation so far, oldest first."""
+        messages = []
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": "Earlier in this conversation:\n" + "\n".join(f"- {line}" for line in self.summary),
+            })
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn["user"]})
+            messages.append({"role": "assistant", "content": turn["assistant"]})
+        return messages
+
+    def intent_context(self, user_input: str) -> str:
+        """
+        Text for intent extraction: a follow-up alone ("cheaper ones?") names no college
+        topic or state, so the previous question is prepended.
+        """
+        if not self.turns:
+            return user_input
+        return f"{self.turns[-1]['user']}\n{user_input}"
+
+    def history_tokens(self) -> int:
+        return sum(estimate_tokens(m["content"]) + 4 for m in self.history_messages())
+
+    def end_turn(self, user_input: str, result: Any) -> None:
+        """
+        Record a finished turn, then compact history and drop old tool results if over bounds.
+
+        Args:
+            user_input (str): The student's message
+            result (Optional[AdvisorResponse]): The advisor's answer (None if the gate rejected it)
+        """
+        schools = [school.model_dump() for school in (result.schools or [])] if result else []
+        assistant = result.response if result else "Sorry, I couldn't understand your query."
+        if schools:
+            assistant += "\nRecommended schools: " + serialize_tool_result(schools, "search_colleges")
+        self.turns.append({"user": user_input, "assistant": assistant, "schools": [s["name"] for s in schools]})
+        SESSION_EVENTS.inc(event="turn")
+
+        compacted = 0
+        while len(self.turns) > SESSION_KEEP_TURNS and self.history_tokens() > SESSION_HISTORY_MAX_TOKENS:
+            turn = self.turns.pop(0)
+            suggested = ", ".join(turn["schools"][:5]) or "no specific schools"
+            self.summary.append(f"Student asked {json.dumps(turn['user'][:200])}; advisor suggested {suggested}")
+            compacted += 1
+        del self.summary[:-SESSION_SUMMARY_MAX_LINES]
+        if compacted:
+            SESSION_EVENTS.inc(compacted, event="compaction")
+            logger.info(f"🗜️ Compacted {compacted} turn(s) of session {self.id}")
+
+        self.tool_calls.expire()
+        futures = self.tool_calls.futures
+        for key in [k for k, f in futures.items() if f.done()][: max(0, len(futures) - SESSION_MAX_TOOL_RESULTS)]:
+            self.tool_calls.discard(key)
+
+    def estimated_size(self) -> int:
+        """Approximate memory footprint, for the session store's byte bound."""
+        size = sum(len(m["content"]) for m in self.history_messages())
+        for future in self.tool_calls.futures.values():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                size += len(json.dumps(future.result(), default=str))
+        return size
+
+
+class SessionStore:
+    """Sessions by ID with TTL + LRU eviction (see cache.TTLCache)."""
+
+    def __init__(self, ttl_s: float, max_entries: int, max_bytes: int):
+        self.name = "sessions"
+        self._cache = TTLCache(self.name, ttl_s=ttl_s, max_entries=max_entries, max_bytes=max_bytes)
+
+    def get_or_create(self, session_id: str) -> Session:
+        """Return the live session with this ID, starting a new one if unknown or expired."""
+        session = self._cache.get(session_id)
+        if session is None:
+            session = Session(session_id)
+            self._cache.set(session_id, session)
+            logger.info(f"🧵 Started session {session_id}")
+        return session
+
+    def save(self, session: Session) -> None:
+        """Refresh a session's TTL and size after a turn."""
+        self._cache.set(session.id, session)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+session_store = SessionStore(
+    ttl_s=SESSION_TTL_S,
+    max_entries=SESSION_MAX_ENTRIES,
+    max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024))),
+)
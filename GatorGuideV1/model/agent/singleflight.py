@@ -0,0 +1,151 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When many requests need the same upstream result at the same moment (a counselor
+shares a link with a whole class), only the first caller for a key starts the call;
+everyone else awaits that same call. Unlike the response caches, nothing is kept once
+the call finishes, so results are never stale.
+
+The shared call belongs to no single request: it runs in a clean context, under its
+own timeout, so it neither inherits the first caller's deadline and usage tracker nor
+dies with that caller. Each caller waits only until its own deadline.
+"""
+
+import asyncio
+import contextvars
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from model.config import logger
+from model.agent.resilience import DeadlineExceeded, deadline, time_left
+
+
+def run_detached(call: Awaitable[Any], timeout_s: Optional[float] = None) -> asyncio.Future:
+    """
+    Start `call` as a task in a clean context (no request deadline, usage tracker or
+    shared tool calls), bounded by its own `timeout_s` if given.
+
+    Raises (from the future):
+        DeadlineExceeded: The call ran longer than `timeout_s`
+    """
+
+    async def bounded() -> Any:
+        with deadline(timeout_s):
+            try:
+                return await asyncio.wait_for(call, timeout_s or None)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Shared call exceeded its {timeout_s}s timeout") from None
+
+    # A task copies the context it is created in; create it inside an empty one
+    return contextvars.Context().run(asyncio.ensure_future, bounded())
+
+
+async def wait_shared(future: "asyncio.Future[Any]") -> Any:
+    """
+    Await a future shared with other requests, giving up at the caller's own deadline.
+
+    The future is shielded, so a caller that gives up or is cancelled leaves it running
+    for the others.
+
+    Raises:
+        DeadlineExceeded: The caller's deadline passed first
+    """
+    left = time_left()
+    if left is None:
+        return await asyncio.shield(future)
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded waiting for a shared call")
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Request deadline exceeded waiting for a shared call") from None
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls that share a key.
+
+    Calls are tracked per event loop, since a future belongs to the loop that created it.
+    The shared call runs as its own task in a clean context (see run_detached()), so a
+    caller that is cancelled (e.g. a client disconnect) does not cancel it for the
+    others, and each caller's deadline applies to that caller only.
+
+    Example:
+        >>> flights = SingleFlight("tools")
+        >>> await asyncio.gather(*(flights.do("wa", fetch_wa) for _ in range(30)))
+        >>> flights.stats()
+        {'calls': 1, 'coalesced': 29, 'in_flight': 0, 'coalesced_rate': 0.967, ...}
+    """
+
+    def __init__(self, name: str, timeout_s: Optional[float] = None):
+        """
+        Args:
+            name (str): Name for logs and stats
+            timeout_s (Optional[float]): Limit on each shared call, which has no request
+                deadline of its own; None for no limit
+        """
+        self.name = name
+        self.timeout_s = timeout_s
+        self._in_flight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, label: str, field: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(label, {"calls": 0, "coalesced": 0})
+            counts[field] += 1
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        """
+        Return the result of `call()`, sharing it with concurrent callers of the same key.
+
+        Args:
+            key (Hashable): Identifies equivalent calls
+            call (Callable[[], Awaitable[Any]]): Starts the call; only invoked by the first caller
+            label (str): Counter bucket for stats(), e.g. the tool name
+
+        Returns:
+            Any: The call's result (the same object for every caller)
+
+        Raises:
+            DeadlineExceeded: This caller's deadline passed before the shared call finished
+            Exception: Whatever the shared call raised, for every caller
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flights = self._in_flight.setdefault(loop, {})
+        future = flights.get(key)
+        if future is None:
+            self._count(label, "calls")
+            future = run_detached(call(), self.timeout_s)
+            flights[key] = future
+            future.add_done_callback(lambda done: flights.get(key) is done and flights.pop(key))
+        else:
+            self._count(label, "coalesced")
+            logger.info(f"🔗 Coalesced {label or 'call'} with an identical in-flight call")
+        return await wait_shared(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report how many calls ran versus joined an identical in-flight call.
+
+        Returns:
+            Dict[str, Any]: calls, coalesced, in_flight, coalesced_rate, and the same
+                counters per label under "by_label"
+        """
+        with self._lock:
+            by_label = {label: dict(counts) for label, counts in self._counts.items()}
+            in_flight = sum(len(flights) for flights in self._in_flight.values())
+        calls = sum(c["calls"] for c in by_label.values())
+        coalesced = sum(c["coalesced"] for c in by_label.values())
+        total = calls + coalesced
+        return {
+            "calls": calls,
+            "coalesced": coalesced,
+            "in_flight": in_flight,
+            "coalesced_rate": coalesced / total if total else 0.0,
+            "by_label": by_label,
+        }
@@ -6,14 +6,130 @@ This module provides the actual functions that the advisor agent calls to:
 2. Fetch current weather data from campus coordinates using Open-Meteo API
 """
 
-import requests
-from typing import Optional
+import asyncio
+from typing import Dict, List, Optional, Tuple
 from model.config import logger
+from model.agent.cache import TTLCache
+from model.agent.http_client import get_json
+from model.agent.resilience import deadline
+from model.agent.scorecard_store import get_store
+from model.agent.columnar import search as columnar_search
+from model.agent.name_index import canonical_school_name
+from model.agent.runner import run_sync
 
-COLLEGE_SCORECARD_URL = "https://api.data.gov/ed/collegescorecard/v1/schools"
 from os import getenv
 
+# Overridable so benchmarks and replays can point at local stand-ins (see benchmarks/)
+COLLEGE_SCORECARD_URL = getenv("COLLEGE_SCORECARD_URL", "https://api.data.gov/ed/collegescorecard/v1/schools")
+OPEN_METEO_URL = getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
 API_KEY = getenv("COLLEGE_SCORECARD_API_KEY")
+# "api" queries api.data.gov; "local" answers from the offline store (see scorecard_store.py)
+SCORECARD_BACKEND = getenv("SCORECARD_BACKEND", "api").lower()
+
+# Only the "current" block is used downstream, so nothing else is requested
+WEATHER_CURRENT_FIELDS = "temperature_2m,wind_speed_10m"
+# Bound on a whole weather lookup: the batched request plus any fan-out fallback
+WEATHER_TIMEOUT_S = float(getenv("WEATHER_TIMEOUT_S", "5"))
+# Current conditions barely change within minutes or a few kilometers, so nearby
+# campuses share a rounded geo cell (1 decimal place ≈ 11 km) and a short TTL
+WEATHER_CACHE_PRECISION = int(getenv("WEATHER_CACHE_PRECISION", "1"))
+
+# Upstream hosts whose connection pools are warmed at API startup
+UPSTREAM_URLS = [COLLEGE_SCORECARD_URL, OPEN_METEO_URL]
+
+# Scorecard data changes at most yearly, so query results can be kept for a long time
+scorecard_cache = TTLCache(
+    "scorecard",
+    ttl_s=float(getenv("SCORECARD_CACHE_TTL_S", "86400")),
+    max_entries=int(getenv("SCORECARD_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(getenv("SCORECARD_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+)
+
+
+def canonical_range(value: str) -> str:
+    """Canonicalize a "MIN..MAX" range string, e.g. "0.0..0.50" -> "0..0.5"."""
+    bounds = str(value).replace(" ", "").split("..")
+    if len(bounds) != 2:
+        return str(value).strip()
+    try:
+        return "..".join(f"{float(b):g}" if b else "" for b in bounds)
+    except ValueError:
+        return str(value).strip()
+
+
+def scorecard_cache_key(params: dict) -> tuple:
+    """
+    Build a cache key from Scorecard query parameters.
+    
+    Equivalent queries map to the same key: school names are case-folded with whitespace
+    collapsed, states upper-cased, "__range" values canonicalized, and the requested field
+    list sorted. The API key is excluded.
+    
+    Example:
+        >>> scorecard_cache_key({"school.name": " University of  Washington", "per_page": 5, ...})
+        (('fields', (...)), ('per_page', '5'), ('school.name', 'university of washington'))
+    """
+    key = []
+    for name, value in params.items():
+        if name == "api_key" or value is None:
+            continue
+        if name == "school.name":
+            value = " ".join(str(value).split()).casefold()
+        elif name == "school.state":
+            value = str(value).strip().upper()
+        elif name.endswith("__range"):
+            value = canonical_range(value)
+        elif name == "fields":
+            value = tuple(sorted(f.strip() for f in str(value).split(",") if f.strip()))
+        else:
+            value = str(value)
+        key.append((name, value))
+    return tuple(sorted(key))
+
+
+async def _scorecard_query(params: dict) -> list:
+    """Run a College Scorecard query, serving repeated queries from scorecard_cache."""
+    if SCORECARD_BACKEND == "local":
+        # Range filters go through the vectorized columnar engine when it has been built
+        ids = columnar_search(params)
+        if ids is not None:
+            return get_store().fetch(ids, params.get("fields"))
+        return get_store().search(params)
+
+    key = scorecard_cache_key(params)
+    cached = scorecard_cache.get(key)
+    if cached is not None:
+        logger.info(f"⚡ Scorecard cache hit ({len(cached)} schools)")
+    else:
+        logger.info("🌐 Calling College Scorecard API")
+        cached = (await get_json(COLLEGE_SCORECARD_URL, params, upstream="scorecard"))["results"]
+        scorecard_cache.set(key, cached)
+    # Callers enrich rows in place (e.g. adding "weather"), so hand out copies
+    return [dict(row) for row in cached]
+
+
+weather_cache = TTLCache(
+    "weather",
+    ttl_s=float(getenv("WEATHER_CACHE_TTL_S", "600")),
+    max_entries=int(getenv("WEATHER_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(getenv("WEATHER_CACHE_MAX_BYTES", str(4 * 1024 * 1024))),
+)
+
+
+def geo_cell(latitude: float, longitude: float) -> Tuple[float, float]:
+    """
+    Round coordinates to the weather cache's geo cell.
+    
+    Example:
+        >>> geo_cell(47.6550, -122.3035)  # WEATHER_CACHE_PRECISION=1
+        (47.7, -122.3)
+    """
+    return (
+        round(float(latitude), WEATHER_CACHE_PRECISION),
+        round(float(longitude), WEATHER_CACHE_PRECISION),
+    )
+
 
 def get_weather(latitude: float, longitude: float) -> dict:
     """
@@ -33,19 +149,131 @@ def get_weather(latitude: float, longitude: float) -> dict:
             - wind_speed_10m: Current wind speed in km/h
             
     Raises:
-        requests.RequestException: If API call fails
+        httpx.HTTPError: If API call fails
         
     Example:
         >>> get_weather(47.6550, -122.3035)  # University of Washington
         {'temperature_2m': 8.5, 'wind_speed_10m': 12.1, ...}
     """
-    response = requests.get(
-        f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current=temperature_2m,wind_speed_10m&hourly=temperature_2m,relative_humidity_2m,wind_speed_10m"
+    return run_sync(get_weather_async(latitude, longitude))
+
+
+async def get_weather_async(latitude: float, longitude: float) -> dict:
+    """
+    Async implementation of get_weather(); see that function for details.
+    
+    Served from weather_cache when the location's geo cell was fetched recently.
+    """
+    cell = geo_cell(latitude, longitude)
+    current = weather_cache.get(cell)
+    if current is None:
+        current = await _fetch_current_weather(*cell)
+        weather_cache.set(cell, current)
+    return dict(current)
+
+
+async def get_weather_batch_async(
+    coordinates: List[Tuple[float, float]],
+) -> Dict[Tuple[float, float], Optional[dict]]:
+    """
+    Fetch current weather for many locations at once.
+    
+    Coordinates are bucketed into geo cells (see geo_cell()) and cells already in
+    weather_cache are answered locally. Open-Meteo accepts comma-separated
+    latitude/longitude lists, so all remaining cells go out in a single request.
+    If that request fails or has not answered within half of WEATHER_TIMEOUT_S, each
+    cell is fetched concurrently in the time left. The whole lookup ends within
+    WEATHER_TIMEOUT_S (or the request deadline, if sooner). While the weather circuit
+    is open every cell comes back None at once, so schools are returned without weather.
+    
+    Args:
+        coordinates (List[Tuple[float, float]]): (latitude, longitude) pairs, may repeat
+        
+    Returns:
+        Dict[Tuple[float, float], Optional[dict]]: Maps each unique pair to its "current"
+            weather block (temperature_2m, wind_speed_10m), or None if it could not be fetched
+            
+    Example:
+        >>> await get_weather_batch_async([(47.655, -122.3035), (47.655, -122.3035), (34.07, -118.44)])
+        {(47.655, -122.3035): {'temperature_2m': 8.5, ...}, (34.07, -118.44): {...}}
+    """
+    cells = {coord: geo_cell(*coord) for coord in dict.fromkeys(coordinates)}
+    weather_by_cell: Dict[Tuple[float, float], Optional[dict]] = {}
+    missing = []
+    for cell in dict.fromkeys(cells.values()):
+        cached = weather_cache.get(cell)
+        if cached is not None:
+            weather_by_cell[cell] = cached
+        else:
+            missing.append(cell)
+
+    if missing:
+        logger.info(f"🌤️ Weather cache: {len(weather_by_cell)} cell(s) cached, {len(missing)} to fetch")
+        fetched = await _fetch_weather_cells(missing)
+        for cell, current in fetched.items():
+            if current is not None:
+                weather_cache.set(cell, current)
+        weather_by_cell.update(fetched)
+
+    return {
+        coord: dict(weather_by_cell[cell]) if weather_by_cell.get(cell) else None
+        for coord, cell in cells.items()
+    }
+
+
+async def _fetch_current_weather(latitude: float, longitude: float) -> dict:
+    """Call Open-Meteo for one location and return its "current" block."""
+    data = await get_json(
+        OPEN_METEO_URL,
+        {
+            "latitude": latitude,
+            "longitude": longitude,
+            "current": WEATHER_CURRENT_FIELDS,
+        },
+        timeout=WEATHER_TIMEOUT_S,
+        upstream="weather",
     )
-    data = response.json()
     return data["current"]
 
 
+async def _fetch_weather_cells(
+    cells: List[Tuple[float, float]],
+) -> Dict[Tuple[float, float], Optional[dict]]:
+    """Fetch uncached cells with one multi-location request, or a concurrent fan-out."""
+    with deadline(WEATHER_TIMEOUT_S):
+        if len(cells) > 1:
+            try:
+                # Leave the fan-out time to run if the batched request stalls
+                with deadline(WEATHER_TIMEOUT_S / 2):
+                    data = await get_json(
+                        OPEN_METEO_URL,
+                        {
+                            "latitude": ",".join(str(lat) for lat, _ in cells),
+                            "longitude": ",".join(str(lon) for _, lon in cells),
+                            "current": WEATHER_CURRENT_FIELDS,
+                        },
+                        timeout=WEATHER_TIMEOUT_S,
+                        upstream="weather",
+                    )
+                if isinstance(data, list) and len(data) == len(cells):
+                    logger.info(f"🌤️ Fetched weather for {len(cells)} locations in one request")
+                    return {cell: item.get("current") for cell, item in zip(cells, data)}
+                logger.warning("⚠️ Unexpected multi-location weather response, falling back")
+            except Exception as e:
+                logger.warning(f"⚠️ Multi-location weather request failed, falling back: {e}")
+
+        async def fetch_one(cell: Tuple[float, float]) -> Optional[dict]:
+            # Attempts are retried until the lookup's (or the request's) deadline
+            try:
+                return await _fetch_current_weather(*cell)
+            except Exception as e:
+                logger.warning(f"❌ Failed to fetch weather at {cell}: {e}")
+                return None
+
+        results = await asyncio.gather(*(fetch_one(cell) for cell in cells))
+    return dict(zip(cells, results))
+
+
 def search_colleges(
     school_name: Optional[str] = None,
     state: Optional[str] = None,
@@ -72,7 +300,7 @@ def search_colleges(
             - latest.cost.tuition.in_state, latest.cost.tuition.out_of_state
             
     Raises:
-        requests.RequestException: If API call fails
+        httpx.HTTPError: If API call fails
         
     Example:
         >>> search_colleges(school_name="MIT", state="MA", limit=1)
@@ -86,6 +314,18 @@ def search_colleges(
         }]
     """
 
+    return run_sync(search_colleges_async(school_name=school_name, state=state, limit=limit))
+
+
+async def search_colleges_async(
+    school_name: Optional[str] = None,
+    state: Optional[str] = None,
+    limit: int = 5,
+) -> list:
+    """
+    Async implementation of search_colleges(); see that function for details.
+    """
+
     params = {
         "api_key": API_KEY,
         "fields": (
@@ -99,14 +339,11 @@ def search_colleges(
     }
 
     if school_name:
-        params["school.name"] = school_name
+        params["school.name"] = canonical_school_name(school_name, state=state)
     if state:
         params["school.state"] = state
 
-    response = requests.get(COLLEGE_SCORECARD_URL, params=params)
-    response.raise_for_status()
-
-    results = response.json()["results"]
+    results = await _scorecard_query(params)
     logger.info(f"📊 Sample school data structure: {results[0] if results else 'No results'}")
     return results
 
@@ -141,7 +378,7 @@ def state_search_colleges(
             acceptance rate, SAT scores, tuition, and location data
             
     Raises:
-        requests.RequestException: If API call fails
+        httpx.HTTPError: If API call fails
         
     Example:
         >>> state_search_colleges(
@@ -155,6 +392,76 @@ def state_search_colleges(
             ...
         }, ...]
     """
+    return run_sync(
+        state_search_colleges_async(
+            state=state,
+            school_name=school_name,
+            acceptance_rate_range=acceptance_rate_range,
+            in_state_tuition_range=in_state_tuition_range,
+            sat_score_range=sat_score_range,
+            limit=limit,
+        )
+    )
+
+
+# state_search_colleges() range arguments -> the result field each one filters
+RANGE_FIELDS = {
+    "acceptance_rate_range": "latest.admissions.admission_rate.overall",
+    "in_state_tuition_range": "latest.cost.tuition.in_state",
+    "sat_score_range": "latest.admissions.sat_scores.average.overall",
+}
+
+
+def parse_range(value: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+    """(min, max) of a "MIN..MAX" range; a missing bound (or range) is None."""
+    if not value:
+        return None, None
+    low, _, high = canonical_range(value).partition("..")
+    return (float(low) if low else None), (float(high) if high else None)
+
+
+def range_contains(outer: Optional[str], inner: Optional[str]) -> bool:
+    """True if every value in range `inner` is also in range `outer`."""
+    (outer_low, outer_high), (inner_low, inner_high) = parse_range(outer), parse_range(inner)
+    if outer_low is not None and (inner_low is None or inner_low < outer_low):
+        return False
+    return outer_high is None or (inner_high is not None and inner_high <= outer_high)
+
+
+def filter_rows(rows: List[dict], ranges: Dict[str, Optional[str]]) -> List[dict]:
+    """
+    Keep the state_search_colleges() rows whose fields fall inside `ranges`, like the
+    Scorecard API's "__range" filters (rows missing a filtered field are dropped).
+
+    Example:
+        >>> filter_rows(rows, {"in_state_tuition_range": "..15000"})
+        [{'school.name': 'Western Washington University', 'latest.cost.tuition.in_state': 9300, ...}]
+    """
+    kept = []
+    for row in rows:
+        for name, value in ranges.items():
+            low, high = parse_range(value)
+            if low is None and high is None:
+                continue
+            field = row.get(RANGE_FIELDS[name])
+            if field is None or (low is not None and field < low) or (high is not None and field > high):
+                break
+        else:
+            kept.append(row)
+    return kept
+
+
+async def state_search_colleges_async(
+    state: str,
+    school_name: Optional[str] = None,
+    acceptance_rate_range: Optional[str] = None,
+    in_state_tuition_range: Optional[str] = None,
+    sat_score_range: Optional[str] = None,
+    limit: int = 5,
+) -> list:
+    """
+    Async implementation of state_search_colleges(); see that function for details.
+    """
     logger.info(
         f"Arguments: state={state}, acceptance={acceptance_rate_range}, "
         f"tuition={in_state_tuition_range}, SAT={sat_score_range}"
@@ -175,7 +482,7 @@ def state_search_colleges(
     }
 
     if school_name:
-        params["school.name"] = school_name
+        params["school.name"] = canonical_school_name(school_name, state=state)
     if acceptance_rate_range:
         params["latest.admissions.admission_rate.overall__range"] = acceptance_rate_range
     if in_state_tuition_range:
@@ -183,11 +490,7 @@ def state_search_colleges(
     if sat_score_range:
         params["latest.admissions.sat_scores.average.overall__range"] = sat_score_range
 
-    logger.info("🌐 Calling College Scorecard API")
-    response = requests.get(COLLEGE_SCORECARD_URL, params=params)
-    response.raise_for_status()
-
-    results = response.json()["results"]
+    results = await _scorecard_query(params)
     logger.info(f"✅ Tool returned {len(results)} schools")
     return results
 
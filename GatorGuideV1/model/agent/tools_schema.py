@@ -1,3 +1,18 @@
+import os
+from typing import Any, Dict, List
+
+from model.schemas.studentIntent import StudentIntent
+
+# How the tools a query's intent can use (tools_for_intent()) are enforced:
+# "allowed" - the two search schemas are always sent (get_weather never is), and
+#             tool_choice allowed_tools limits the calls, so the prompt prefix stays
+#             identical for the provider's prompt cache
+# "schemas" - only those schemas are sent; fewest prompt tokens, but each tool set is
+#             its own prefix, too short to be cached (see prompts.py)
+# "off"     - every tool, get_weather included, is offered to every query
+# "allowed" is the default: it keeps one cacheable prefix
+TOOL_PRUNING = os.getenv("TOOL_PRUNING", "allowed")
+
 tools = [
     {
         "type": "function",
@@ -70,3 +85,74 @@ tools = [
         },
     },
 ]
+
+TOOLS_BY_NAME: Dict[str, Dict[str, Any]] = {tool["function"]["name"]: tool for tool in tools}
+SEARCH_TOOL_NAMES = ["search_colleges", "state_search_colleges"]
+# Every schema an advisor call may send: the stable tool prefix under TOOL_PRUNING=allowed
+OFFERED_TOOLS = tools if TOOL_PRUNING == "off" else [TOOLS_BY_NAME[name] for name in SEARCH_TOOL_NAMES]
+# Intents answered from the model's own knowledge, without any Scorecard lookup
+NO_TOOL_INTENTS = {"general_advice"}
+
+
+def tools_for_intent(intent: StudentIntent) -> List[Dict[str, Any]]:
+    """
+    Tools the model may call for this intent.
+
+    get_weather is never offered: the pipeline already enriches every search result
+    with campus weather. A named school needs only search_colleges, a state only
+    state_search_colleges, and general advice no tools at all (the caller then skips
+    the tool-selection call). Comparisons and other queries get both searches.
+
+    Args:
+        intent (StudentIntent): Extracted intent (school_name and state already normalized)
+
+    Returns:
+        List[Dict[str, Any]]: Subset of OFFERED_TOOLS, in their original order (all
+            of `tools` when TOOL_PRUNING=off)
+
+    Example:
+        >>> [t["function"]["name"] for t in tools_for_intent(StudentIntent(
+        ...     intent="school_search", school_name="Stanford University", confidence_score=0.9))]
+        ['search_colleges']
+    """
+    if TOOL_PRUNING == "off":
+        return tools
+    if intent.intent in NO_TOOL_INTENTS:
+        return []
+    if intent.school_name:
+        names = ["search_colleges"]
+    elif intent.state and intent.intent != "comparison":
+        names = ["state_search_colleges"]
+    else:
+        names = SEARCH_TOOL_NAMES
+    return [TOOLS_BY_NAME[name] for name in names]
+
+
+def tool_params(exposed: List[Dict[str, Any]], final: bool = False) -> Dict[str, Any]:
+    """
+    `tools` / `tool_choice` arguments for an advisor chat completion.
+
+    Args:
+        exposed (List[Dict[str, Any]]): Tools the model may call (tools_for_intent())
+        final (bool): The answer call, which may not call tools
+
+    Returns:
+        Dict[str, Any]: Empty if TOOL_PRUNING=schemas and nothing is exposed
+
+    Example:
+        >>> tool_params([TOOLS_BY_NAME["search_colleges"]])
+        {'tools': [...both searches...], 'tool_choice': {'type': 'allowed_tools', 'allowed_tools':
+            {'mode': 'auto', 'tools': [{'type': 'function', 'function': {'name': 'search_colleges'}}]}}}
+    """
+    exposed = [tool for tool in exposed if tool in OFFERED_TOOLS]
+    if TOOL_PRUNING == "schemas":
+        if not exposed:
+            return {}
+        return {"tools": exposed, **({"tool_choice": "none"} if final else {})}
+    params: Dict[str, Any] = {"tools": OFFERED_TOOLS}
+    if final or not exposed:
+        params["tool_choice"] = "none"
+    elif len(exposed) < len(OFFERED_TOOLS):
+        allowed = [{"type": "function", "function": {"name": tool["function"]["name"]}} for tool in exposed]
+        params["tool_choice"] = {"type": "allowed_tools", "allowed_tools": {"mode": "auto", "tools": allowed}}
+    return params
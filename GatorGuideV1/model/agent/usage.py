@@ -0,0 +1,270 @@
+"""
+Per-request token and cost accounting with an optional token budget.
+
+Every OpenAI response's usage (prompt, completion and cached prompt tokens) is
+recorded against the stage that made the call: intent, tool_selection or
+final_parse. The tracker for the current request lives in a context variable, so
+the agent, the intent extractor and any tasks they start all record into the same
+request without passing it around. Totals are returned with the API response and
+added to the aggregate /metrics counters.
+
+With a budget set (TOKEN_BUDGET or per request), tool results are trimmed to fit
+before the final call, and a call that cannot fit fails fast with
+TokenBudgetExceeded instead of spending tokens on an answer that would be cut off.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from model.config import logger
+from model.metrics import REGISTRY, Counter
+
+# Per-request token budget across all LLM calls (0 = unlimited)
+TOKEN_BUDGET = int(os.getenv("TOKEN_BUDGET", "0"))
+# Tokens kept free for the final call's completion when trimming tool context
+FINAL_COMPLETION_RESERVE = int(os.getenv("FINAL_COMPLETION_RESERVE", "1500"))
+
+# USD per million tokens (defaults: gpt-5-nano list prices)
+PRICE_INPUT_PER_MTOK = float(os.getenv("PRICE_INPUT_PER_MTOK", "0.05"))
+PRICE_CACHED_INPUT_PER_MTOK = float(os.getenv("PRICE_CACHED_INPUT_PER_MTOK", "0.005"))
+PRICE_OUTPUT_PER_MTOK = float(os.getenv("PRICE_OUTPUT_PER_MTOK", "0.40"))
+
+LLM_TOKENS = REGISTRY.register(Counter(
+    "gatorguide_llm_tokens_total",
+    "LLM tokens by stage and kind (prompt, completion, cached)",
+    ["stage", "kind"],
+))
+LLM_COST = REGISTRY.register(Counter(
+    "gatorguide_llm_cost_usd_total",
+    "Estimated LLM spend in USD by stage",
+    ["stage"],
+))
+BUDGET_EVENTS = REGISTRY.register(Counter(
+    "gatorguide_token_budget_events_total",
+    "Token budget enforcement by action (trimmed, rejected)",
+    ["action"],
+))
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """Raised when the next LLM call cannot fit in the request's remaining token budget."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about 4 characters per token for English/JSON)."""
+    return len(text) // 4 + 1
+
+
+def estimate_messages_tokens(messages: List[Any]) -> int:
+    """Rough prompt size of a chat message list, including assistant tool calls."""
+    total = 0
+    for message in messages:
+        if isinstance(message, dict):
+            total += estimate_tokens(str(message.get("content") or "")) + 4
+        else:
+            # Assistant message objects returned by the SDK
+            total += estimate_tokens(str(getattr(message, "content", "") or "")) + 4
+            for call in getattr(message, "tool_calls", None) or []:
+                total += estimate_tokens(call.function.name + call.function.arguments)
+    return total
+
+
+def cost_usd(prompt: int, completion: int, cached: int) -> float:
+    """Price one call's usage; cached prompt tokens are billed at the cached rate."""
+    return (
+        (prompt - cached) * PRICE_INPUT_PER_MTOK
+        + cached * PRICE_CACHED_INPUT_PER_MTOK
+        + completion * PRICE_OUTPUT_PER_MTOK
+    ) / 1_000_000
+
+
+class UsageTracker:
+    """
+    Token usage for one advisor request, broken down by stage.
+
+    Example:
+        >>> tracker = UsageTracker(budget=6000)
+        >>> tracker.record("intent", response.usage)
+        >>> tracker.summary()
+        {'prompt_tokens': 412, 'completion_tokens': 38, 'cached_tokens': 0, 'total_tokens': 450,
+         'cost_usd': 3.6e-05, 'budget': 6000, 'stages': {'intent': {...}}}
+    """
+
+    def __init__(self, budget: int = 0):
+        self.budget = budget
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self.trimmed_rows = 0
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        with self._lock:
+            return sum(s["prompt_tokens"] + s["completion_tokens"] for s in self.stages.values())
+
+    def remaining(self) -> Optional[int]:
+        """Tokens left in the budget, or None if unlimited."""
+        return None if not self.budget else self.budget - self.used
+
+    def record(self, stage: str, usage: Any) -> None:
+        """Add an OpenAI response's usage block to `stage`."""
+        if usage is None:
+            return
+        prompt = usage.prompt_tokens or 0
+        completion = usage.completion_tokens or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+        with self._lock:
+            entry = self.stages.setdefault(
+                stage, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+            )
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt
+            entry["completion_tokens"] += completion
+            entry["cached_tokens"] += cached
+        LLM_TOKENS.inc(prompt, stage=stage, kind="prompt")
+        LLM_TOKENS.inc(completion, stage=stage, kind="completion")
+        LLM_TOKENS.inc(cached, stage=stage, kind="cached")
+        LLM_COST.inc(cost_usd(prompt, completion, cached), stage=stage)
+
+    def check(self, stage: str, estimated_prompt_tokens: int) -> None:
+        """
+        Fail fast if a call with this prompt size cannot fit in the remaining budget.
+
+        Raises:
+            TokenBudgetExceeded: If the estimate exceeds the remaining budget
+        """
+        remaining = self.remaining()
+        if remaining is not None and estimated_prompt_tokens > remaining:
+            BUDGET_EVENTS.inc(action="rejected")
+            raise TokenBudgetExceeded(
+                f"Token budget exceeded before {stage}: ~{estimated_prompt_tokens} prompt tokens "
+                f"needed, {max(remaining, 0)} of {self.budget} left"
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals and per-stage breakdown for the response metadata."""
+        with self._lock:
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+        prompt = sum(s["prompt_tokens"] for s in stages.values())
+        completion = sum(s["completion_tokens"] for s in stages.values())
+        cached = sum(s["cached_tokens"] for s in stages.values())
+        for entry in stages.values():
+            entry["cost_usd"] = round(cost_usd(entry["prompt_tokens"], entry["completion_tokens"], entry["cached_tokens"]), 8)
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cached_tokens": cached,
+            "total_tokens": prompt + completion,
+            "cost_usd": round(cost_usd(prompt, completion, cached), 8),
+            "budget": self.budget or None,
+            "trimmed_rows": self.trimmed_rows,
+            "stages": stages,
+        }
+
+
+_current: ContextVar[Optional[UsageTracker]] = ContextVar("usage_tracker", default=None)
+
+
+@contextmanager
+def track_usage(budget: Optional[int] = None) -> Iterator[UsageTracker]:
+    """
+    Record LLM usage for everything run inside the block (including tasks it starts).
+
+    Args:
+        budget (Optional[int]): Token budget for the request (default TOKEN_BUDGET; 0 = unlimited)
+
+    Example:
+        >>> with track_usage(budget=8000) as tracker:
+        ...     result = await run_advisor_agent_async("Show me MIT")
+        >>> tracker.summary()["total_tokens"]
+        2380
+    """
+    tracker = UsageTracker(TOKEN_BUDGET if budget is None else budget)
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current.reset(token)
+
+
+def current_tracker() -> Optional[UsageTracker]:
+    return _current.get()
+
+
+def record_usage(stage: str, usage: Any) -> None:
+    """Record usage against the current request, if one is being tracked."""
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.record(stage, usage)
+
+
+def check_budget(stage: str, messages: List[Any], reserve: int = 0) -> None:
+    """Fail fast if `messages` (plus `reserve` tokens of output) cannot fit the current request's budget."""
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.check(stage, estimate_messages_tokens(messages) + reserve)
+
+
+def _dumps(index: int, result: Any) -> str:
+    return json.dumps(result, default=str)
+
+
+def trim_tool_results(
+    results: List[Any], max_tokens: int, serialize: Callable[[int, Any], str] = _dumps
+) -> Tuple[List[Any], int]:
+    """
+    Drop trailing rows from the longest result lists until the serialized results fit.
+
+    Results are ranked by the search (e.g. by name or selectivity), so the tail is what
+    the model can most afford to lose. Non-list results are left untouched.
+
+    Args:
+        results (List[Any]): One result per tool call, as sent back to the model
+        max_tokens (int): Estimated token allowance for all tool results together
+        serialize (Callable[[int, Any], str]): Renders result i as its tool message content
+
+    Returns:
+        Tuple[List[Any], int]: Trimmed results and the number of rows dropped
+    """
+    trimmed = [list(r) if isinstance(r, list) else r for r in results]
+    sizes = [estimate_tokens(serialize(i, r)) for i, r in enumerate(trimmed)]
+    dropped = 0
+    while sum(sizes) > max_tokens:
+        longest = max(
+            (i for i, r in enumerate(trimmed) if isinstance(r, list) and r),
+            key=lambda i: sizes[i],
+            default=None,
+        )
+        if longest is None:
+            break
+        trimmed[longest].pop()
+        sizes[longest] = estimate_tokens(serialize(longest, trimmed[longest]))
+        dropped += 1
+    return trimmed, dropped
+
+
+def fit_tool_results(
+    base_messages: List[Any], results: List[Any], serialize: Callable[[int, Any], str] = _dumps
+) -> List[Any]:
+    """
+    Trim tool results so the final call fits the current request's budget.
+
+    Leaves FINAL_COMPLETION_RESERVE tokens for the answer. Returns results unchanged
+    when no budget applies. Sizes are measured with `serialize`, so they match the
+    tool messages actually sent.
+    """
+    tracker = _current.get()
+    remaining = tracker.remaining() if tracker else None
+    if remaining is None:
+        return results
+    allowance = remaining - FINAL_COMPLETION_RESERVE - estimate_messages_tokens(base_messages)
+    trimmed, dropped = trim_tool_results(results, max(allowance, 0), serialize)
+    if dropped:
+        tracker.trimmed_rows += dropped
+        BUDGET_EVENTS.inc(action="trimmed")
+        logger.info(f"✂️ Trimmed {dropped} tool result rows to fit the token budget")
+    return trimmed
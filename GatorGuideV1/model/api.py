@@ -7,9 +7,28 @@ advisor agent system. Handles student queries, invokes the agent, and
 returns structured college recommendations with comprehensive data.
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from model.agent.advisoragent import run_advisor_agent
+import asyncio
+import json
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from model.admission import Overloaded, admission, priority_for
+from model.agent.advisoragent import run_advisor_agent_async, run_advisor_batch_async, stream_advisor_agent
+from model.agent.http_client import warm_pools, close_pools, pool_stats
+from model.agent.name_index import get_name_index
+from model.agent import fast_intent, prompts, resilience
+from model.agent.dispatcher import tool_flights
+from model.agent.resilience import REQUEST_DEADLINE_S, CircuitOpenError, DeadlineExceeded, deadline, deadline_at
+from model.agent.tools import UPSTREAM_URLS, scorecard_cache, weather_cache
+from model.agent.semantic_cache import response_cache
+from model.agent.sessions import Session, session_store
+from model.agent.usage import TokenBudgetExceeded, track_usage
+from model.metrics import REGISTRY, REQUEST_SECONDS, timed
 import logging
 import uvicorn
 
@@ -17,7 +36,63 @@ import uvicorn
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="College Advisor API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm upstream connection pools and the name index on startup; close pools on shutdown."""
+    await asyncio.gather(warm_pools(UPSTREAM_URLS), asyncio.to_thread(get_name_index))
+    yield
+    await close_pools()
+
+app = FastAPI(title="College Advisor API", lifespan=lifespan)
+
+
+def runtime_metrics():
+    """Expose the counters behind /status as Prometheus metric families."""
+    caches = [(cache.name, cache.stats()) for cache in (scorecard_cache, weather_cache, response_cache, session_store)]
+    for field, kind, help in (
+        ("hits", "counter", "Cache hits"),
+        ("misses", "counter", "Cache misses"),
+        ("evictions", "counter", "Cache evictions"),
+        ("entries", "gauge", "Entries currently cached"),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        yield f"gatorguide_cache_{field}{suffix}", kind, help, [({"cache": name}, stats[field]) for name, stats in caches]
+
+    intent_stats = fast_intent.stats()
+    yield "gatorguide_intent_classifications_total", "counter", "Intents classified locally vs. by the LLM", [
+        ({"path": "fast_path"}, intent_stats["fast_path"]),
+        ({"path": "llm_fallback"}, intent_stats["llm_fallback"]),
+    ]
+
+    flights = tool_flights.stats()["by_label"]
+    yield "gatorguide_single_flight_total", "counter", "Tool calls run vs. coalesced with an identical in-flight call", [
+        ({"tool": tool, "result": result}, counts[field])
+        for tool, counts in sorted(flights.items())
+        for result, field in (("run", "calls"), ("coalesced", "coalesced"))
+    ]
+
+    pools = pool_stats()["pools"]
+    yield "gatorguide_http_pool_connections", "gauge", "Open upstream connections per host", [
+        ({"origin": origin, "state": state}, entry[state])
+        for origin, entry in sorted(pools.items())
+        for state in ("idle", "active")
+    ]
+
+    upstreams = resilience.stats()
+    yield "gatorguide_circuit_state", "gauge", "Circuit breaker state per upstream (1 for the current state)", [
+        ({"upstream": name, "state": state}, 1 if entry["state"] == state else 0)
+        for name, entry in sorted(upstreams.items())
+        for state in ("closed", "open", "half_open")
+    ]
+
+    load = admission.stats()
+    yield "gatorguide_admission_in_flight", "gauge", "Advisor runs holding an admission slot", [({}, load["in_flight"])]
+    yield "gatorguide_admission_queue_depth", "gauge", "Requests waiting for an admission slot, by priority", [
+        ({"priority": priority}, depth) for priority, depth in load["queued"].items()
+    ]
+
+
+REGISTRY.register_collector(runtime_metrics)
 
 # Request model
 class AdvisorRequest(BaseModel):
@@ -26,32 +101,111 @@ class AdvisorRequest(BaseModel):
     
     Attributes:
         student_input (str): Natural language query from student about colleges
+        token_budget (Optional[int]): Max LLM tokens for this request (default TOKEN_BUDGET; 0 = unlimited)
+        session_id (Optional[str]): Conversation to continue; chosen by the client (e.g. a UUID)
+            and sent with every message. Unknown or expired IDs start a new conversation
+        deadline_s (Optional[float]): Seconds the client will wait (default REQUEST_DEADLINE_S).
+            Upstream calls and their retries stop at this deadline instead of running on
+            after the client has given up
         
     Example:
-        {"student_input": "Show me competitive schools in California"}
+        {"student_input": "What about cheaper ones?", "session_id": "9b2f0c1e-...", "deadline_s": 28}
     """
     student_input: str
+    token_budget: Optional[int] = None
+    session_id: Optional[str] = Field(default=None, max_length=128, pattern=r"^[A-Za-z0-9_-]+$")
+    deadline_s: Optional[float] = Field(default=None, gt=0, le=600)
+
+
+def open_session(request: AdvisorRequest) -> Optional[Session]:
+    """Look up (or start) the request's conversation session, if it names one."""
+    return session_store.get_or_create(request.session_id) if request.session_id else None
+
+
+class AdvisorBatchRequest(BaseModel):
+    """
+    Request body for the batch advisor endpoint.
+    
+    Attributes:
+        student_inputs (List[str]): Queries to run, e.g. canned student profiles
+        concurrency (Optional[int]): Queries processed at once (server default and cap apply)
+        token_budget (Optional[int]): Max LLM tokens per query (default TOKEN_BUDGET; 0 = unlimited)
+        deadline_s (Optional[float]): Deadline per query in seconds (default REQUEST_DEADLINE_S)
+        
+    Example:
+        {"student_inputs": ["Show me MIT", "Colleges in Texas"], "concurrency": 8}
+    """
+    student_inputs: List[str]
+    concurrency: Optional[int] = None
+    token_budget: Optional[int] = None
+    deadline_s: Optional[float] = Field(default=None, gt=0, le=600)
+
+
+def format_result(result) -> Dict[str, Any]:
+    """Shape an AdvisorResponse as the {"response", "schools"} payload the frontend expects."""
+    # Format schools nicely
+    schools = [
+        {
+            "name": s.name,
+            "city": s.city,
+            "state": s.state,
+            "acceptance_rate": s.acceptance_rate,
+            "tuition_in_state": getattr(s, "tuition_in_state", None),
+            "tuition_out_of_state": getattr(s, "tuition_out_of_state", None),
+            "weather": s.weather.dict() if s.weather else None,
+        }
+        for s in getattr(result, "schools", []) or []
+    ]
+    return {"response": result.response, "schools": schools}
+
+
+def overloaded_error(e: Overloaded) -> HTTPException:
+    """429 with Retry-After for a request turned away by admission control."""
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+
+def upstream_error(e: Exception) -> HTTPException:
+    """Map a resilience failure to 504 (deadline) or 503 with Retry-After (circuit open)."""
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+    return HTTPException(status_code=504, detail=str(e))
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
 
 @app.post("/advisor")
-def advisor_endpoint(request: AdvisorRequest):
+async def advisor_endpoint(request: AdvisorRequest, x_priority: Optional[str] = Header(default=None)):
     """
     Main advisor endpoint for college recommendations.
     
     Receives a student query, invokes the advisor agent to process it,
     and returns a structured response with recommended schools and their data.
+    The agent runs on the event loop, so waiting on OpenAI and upstream APIs does
+    not tie up a threadpool worker. Requests are admitted through admission control
+    (model/admission.py); the X-Priority header picks the class (default interactive).
     
     Args:
         request (AdvisorRequest): Contains student_input query string
+        x_priority (Optional[str]): X-Priority header, "interactive" or "batch"
         
     Returns:
         dict: {
             "response": str - Natural language advice from advisor,
-            "schools": list - Recommended School objects with full data
+            "schools": list - Recommended School objects with full data,
+            "usage": dict - LLM tokens (prompt/completion/cached), cost and per-stage breakdown
         }
         
     Raises:
-        HTTPException: 500 if agent processing fails
+        HTTPException: 413 if the request's token budget cannot cover the next LLM call,
+            429 (with Retry-After) if the server is at capacity and the request
+            could not be admitted in time,
+            503 (with Retry-After) if a required upstream's circuit is open,
+            504 if the request's deadline passed, 500 if agent processing fails
         
     Example:
         Request: {"student_input": "Show me MIT"}
@@ -67,30 +221,225 @@ def advisor_endpoint(request: AdvisorRequest):
         }
     """
     logger.info(f"Received input: {request.student_input}")
+    session = open_session(request)
+    extra = {"session_id": session.id} if session else {}
     try:
-        result = run_advisor_agent(request.student_input)
+        with timed(REQUEST_SECONDS, endpoint="/advisor"), track_usage(request.token_budget) as tracker, \
+                deadline(request.deadline_s or REQUEST_DEADLINE_S):
+            async with admission.slot(priority_for(x_priority, "interactive")):
+                result = await run_advisor_agent_async(request.student_input, session=session)
         if not result:
             logger.warning("No advisor response generated.")
-            return {"response": "Sorry, I couldn't understand your query.", "schools": []}
-
-        # Format schools nicely
-        schools = [
-            {
-                "name": s.name,
-                "city": s.city,
-                "state": s.state,
-                "acceptance_rate": s.acceptance_rate,
-                "tuition_in_state": getattr(s, "tuition_in_state", None),
-                "tuition_out_of_state": getattr(s, "tuition_out_of_state", None),
-                "weather": s.weather.dict() if s.weather else None,
-            }
-            for s in getattr(result, "schools", []) or []
-        ]
-        return {"response": result.response, "schools": schools}
+            return {"response": "Sorry, I couldn't understand your query.", "schools": [], "usage": tracker.summary(), **extra}
 
+        return {**format_result(result), "usage": tracker.summary(), **extra}
+
+    except TokenBudgetExceeded as e:
+        logger.warning(f"Token budget exceeded: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except Overloaded as e:
+        logger.warning(f"Request not admitted: {e}")
+        raise overloaded_error(e)
+    except (CircuitOpenError, DeadlineExceeded) as e:
+        logger.warning(f"Upstream unavailable: {e}")
+        raise upstream_error(e)
     except Exception as e:
         logger.error(f"Error in advisor endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if session is not None:
+            session_store.save(session)
+
+@app.post("/advisor/stream")
+async def advisor_stream_endpoint(request: AdvisorRequest, x_priority: Optional[str] = Header(default=None)):
+    """
+    Streaming variant of /advisor using Server-Sent Events.
+    
+    Emits progress as the agent works instead of one response at the end, so the
+    first useful content arrives about one LLM hop after the request. The request is
+    admitted (or refused with 429) before the stream starts, and holds its slot until
+    the stream ends.
+    
+    Args:
+        request (AdvisorRequest): Contains student_input query string
+        x_priority (Optional[str]): X-Priority header, "interactive" or "batch"
+        
+    Returns:
+        StreamingResponse: text/event-stream with events
+            - intent: {"intent", "school_name", "state", "confidence_score"}
+            - tools: {"tools": [tool names being run]}
+            - school: one normalized school card from a finished search
+            - token: {"text": str} - next piece of the advice text
+            - done: {"response", "schools", "usage", "session_id"} - same payload as /advisor
+            - error: {"detail": str, "status": int} - processing failed (status as /advisor
+              would return it, e.g. 503 or 504); the stream ends
+            
+    Example:
+        event: intent
+        data: {"intent": "school_search", "school_name": null, "state": "CA", ...}
+        
+        event: school
+        data: {"name": "Stanford University", "city": "Stanford", "state": "CA", ...}
+    """
+    logger.info(f"Received streaming input: {request.student_input}")
+
+    # One deadline for the queue wait and the stream, which runs after this returns
+    ends = time.monotonic() + (request.deadline_s or REQUEST_DEADLINE_S)
+    try:
+        with deadline_at(ends):
+            ticket = await admission.admit(priority_for(x_priority, "interactive"))
+    except Overloaded as e:
+        logger.warning(f"Request not admitted: {e}")
+        raise overloaded_error(e)
+
+    session = open_session(request)
+    extra = {"session_id": session.id} if session else {}
+
+    async def events() -> AsyncIterator[str]:
+        agent_events = stream_advisor_agent(request.student_input, session=session)
+        started = time.perf_counter()
+        try:
+            with track_usage(request.token_budget) as tracker, deadline_at(ends):
+                async for event, data in agent_events:
+                    if event != "result":
+                        yield sse_event(event, data)
+                    elif data:
+                        yield sse_event("done", {**format_result(data), "usage": tracker.summary(), **extra})
+                    else:
+                        logger.warning("No advisor response generated.")
+                        yield sse_event(
+                            "done",
+                            {
+                                "response": "Sorry, I couldn't understand your query.",
+                                "schools": [],
+                                "usage": tracker.summary(),
+                                **extra,
+                            },
+                        )
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            logger.warning(f"Upstream unavailable: {e}")
+            yield sse_event("error", {"detail": str(e), "status": upstream_error(e).status_code})
+        except Exception as e:
+            logger.error(f"Error in advisor stream: {e}")
+            yield sse_event("error", {"detail": str(e), "status": 500})
+        finally:
+            ticket.release()
+            await agent_events.aclose()
+            if session is not None:
+                session_store.save(session)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="/advisor/stream")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also frees the slot if the client disconnects before the stream starts
+        background=BackgroundTask(ticket.release),
+    )
+
+@app.post("/advisor/batch")
+async def advisor_batch_endpoint(request: AdvisorBatchRequest, x_priority: Optional[str] = Header(default=None)):
+    """
+    Run many advisor queries in one request, streaming results as JSON Lines.
+    
+    Identical inputs are processed once and identical tool calls are shared across
+    the batch. Each line is written as soon as its query finishes, so results arrive
+    out of order; use "index" to match them to the request. A failed query produces an
+    "error" line instead of aborting the batch.
+    
+    Each query takes its own admission slot, at batch priority unless X-Priority says
+    otherwise, so interactive requests are served first when the server is busy. A
+    query shed by admission control gets an "error" line with "retry_after".
+    
+    Args:
+        request (AdvisorBatchRequest): student_inputs and optional concurrency
+        x_priority (Optional[str]): X-Priority header, "batch" (default) or "interactive"
+        
+    Returns:
+        StreamingResponse: application/x-ndjson, one object per input:
+            {"index": int, "student_input": str, "response": str, "schools": list, "usage": dict}
+            or {"index": int, "student_input": str, "error": str, "usage": dict}
+            (plus "retry_after": seconds if the query was not admitted)
+            
+    Example:
+        Request: {"student_inputs": ["Show me MIT", "Colleges in Texas"]}
+        Response:
+            {"index": 1, "student_input": "Colleges in Texas", "response": "...", "schools": [...]}
+            {"index": 0, "student_input": "Show me MIT", "response": "...", "schools": [...]}
+    """
+    logger.info(f"Received batch of {len(request.student_inputs)} inputs")
+    priority = priority_for(x_priority, "batch")
+
+    async def lines() -> AsyncIterator[str]:
+        results = run_advisor_batch_async(
+            request.student_inputs,
+            request.concurrency,
+            request.token_budget,
+            deadline_s=request.deadline_s or REQUEST_DEADLINE_S,
+            slot=lambda: admission.slot(priority),
+        )
+        started = time.perf_counter()
+        try:
+            async for index, result, error, usage in results:
+                item: Dict[str, Any] = {"index": index, "student_input": request.student_inputs[index]}
+                if error is not None:
+                    item["error"] = str(error)
+                    if isinstance(error, Overloaded):
+                        item["retry_after"] = math.ceil(error.retry_after)
+                elif result:
+                    item.update(format_result(result))
+                else:
+                    item.update({"response": "Sorry, I couldn't understand your query.", "schools": []})
+                item["usage"] = usage
+                yield json.dumps(item, default=str) + "\n"
+        finally:
+            await results.aclose()
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="/advisor/batch")
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/status")
+async def status_endpoint():
+    """
+    Report runtime diagnostics for the backend.
+    
+    Returns:
+        dict: {
+            "http_pools": per-host connection pool sizes and DNS cache counters,
+            "caches": hit/miss/eviction counters for each cache (advisor_responses adds similarity;
+                sessions counts live conversations),
+            "fast_intent": requests classified locally vs. by the LLM,
+            "single_flight": tool calls run vs. coalesced with an identical in-flight call,
+            "prompt_cache": static prompt prefix sizes and the share of prompt tokens per stage
+                served from the provider's prefix cache,
+            "upstreams": circuit breaker state and hedge delay per upstream (openai, scorecard, weather),
+            "admission": advisor runs in flight, queued per priority class, and the limits
+        }
+    """
+    return {
+        "http_pools": pool_stats(),
+        "caches": {
+            cache.name: cache.stats() for cache in (scorecard_cache, weather_cache, response_cache, session_store)
+        },
+        "fast_intent": fast_intent.stats(),
+        "single_flight": tool_flights.stats(),
+        "prompt_cache": prompts.stats(),
+        "upstreams": resilience.stats(),
+        "admission": admission.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Prometheus scrape endpoint.
+    
+    Returns:
+        PlainTextResponse: Text exposition format with per-stage and per-tool latency
+            histograms, tool call / upstream status / gate rejection / resilience counters,
+            and cache, fast-intent, single-flight, connection pool, circuit breaker and
+            admission (in flight, queue depth, wait time) values
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 # At the end of api.py
 if __name__ == "__main__":
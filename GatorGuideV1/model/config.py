@@ -1,7 +1,10 @@
 import os
+import asyncio
 import logging
+import weakref
+import importlib
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient, DEFAULT_CONNECTION_LIMITS
 load_dotenv()
 logging.basicConfig(
     level=logging.INFO,
@@ -11,4 +14,46 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-MODEL = "gpt-5-nano"
\ No newline at end of file
+MODEL = "gpt-5-nano"
+
+# AsyncOpenAI keeps a connection pool bound to the event loop it first ran on,
+# so each loop (uvicorn's, the sync runner's) gets its own client.
+_async_clients = weakref.WeakKeyDictionary()
+
+# Optional wrapper around the transport of every outbound HTTP client, OpenAI's and the
+# tools' upstream pools (e.g. benchmarks/replay.py records or replays traffic with it)
+_transport_hook = None
+
+def set_transport_hook(hook) -> None:
+    """
+    Wrap the transport of HTTP clients created from now on; None removes the hook.
+
+    Clients are created per event loop, so the hook applies from the next new loop
+    (or the next upstream host) onwards.
+
+    Args:
+        hook: Called as hook(transport, upstream) with the client's own transport and
+            "openai" or the upstream origin (e.g. "https://api.open-meteo.com"); returns
+            the transport to use instead
+    """
+    global _transport_hook
+    _transport_hook = hook
+
+def wrap_transport(transport, upstream: str):
+    """Apply the transport hook, if one is set (see set_transport_hook())."""
+    return transport if _transport_hook is None else _transport_hook(transport, upstream)
+
+def get_async_client() -> AsyncOpenAI:
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        http_client = None
+        if _transport_hook is not None:
+            # The transport openai would build, from the httpx flavour its client uses
+            openai_httpx = importlib.import_module(DefaultAsyncHttpxClient.__mro__[1].__module__.partition(".")[0])
+            transport = openai_httpx.AsyncHTTPTransport(limits=DEFAULT_CONNECTION_LIMITS)
+            http_client = DefaultAsyncHttpxClient(transport=wrap_transport(transport, "openai"))
+        # Retries happen in model/agent/resilience.py, within the request deadline
+        _async_clients[loop] = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0
+        )
+    return _async_clients[loop]
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# model.config builds an OpenAI client at import, which needs a key (never used here)
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
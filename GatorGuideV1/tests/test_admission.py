@@ -0,0 +1,178 @@
+import asyncio
+import time
+
+import pytest
+
+from model.admission import AdmissionController, Overloaded, priority_for
+from model.agent.resilience import deadline_at, time_left
+from model.api import overloaded_error
+
+
+def controller(max_concurrency=1, max_queue=4, interactive_wait=1.0, batch_wait=1.0):
+    return AdmissionController(max_concurrency, max_queue, {"interactive": interactive_wait, "batch": batch_wait})
+
+
+def test_freed_slot_goes_to_interactive_before_earlier_batch():
+    gate = controller()
+    order = []
+
+    async def wait(priority):
+        ticket = await gate.admit(priority)
+        order.append(priority)
+        ticket.release()
+
+    async def main():
+        holder = await gate.admit("interactive")
+        batch = asyncio.ensure_future(wait("batch"))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(wait("interactive"))
+        await asyncio.sleep(0)
+        assert gate.stats()["queued"] == {"interactive": 1, "batch": 1}
+        holder.release()
+        await asyncio.gather(batch, interactive)
+
+    asyncio.run(main())
+    assert order == ["interactive", "batch"]
+    assert gate.in_flight == 0
+
+
+def test_request_is_shed_after_its_max_wait():
+    gate = controller(interactive_wait=0.05)
+
+    async def main():
+        holder = await gate.admit()
+        started = time.monotonic()
+        with pytest.raises(Overloaded, match="waited too long"):
+            await gate.admit("interactive")
+        waited = time.monotonic() - started
+        holder.release()
+        return waited
+
+    assert asyncio.run(main()) < 0.5
+    assert gate.queue_depth() == 0
+    assert gate.in_flight == 0
+
+
+def test_max_wait_is_capped_by_the_request_deadline():
+    gate = controller(interactive_wait=10)
+
+    async def main():
+        holder = await gate.admit()
+        started = time.monotonic()
+        with deadline_at(time.monotonic() + 0.05), pytest.raises(Overloaded):
+            await gate.admit("interactive")
+        holder.release()
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.5
+
+
+def test_queue_full_rejects_at_once():
+    gate = controller(max_queue=1)
+
+    async def main():
+        holder = await gate.admit()
+        queued = asyncio.ensure_future(gate.admit("interactive"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded, match="queue full"):
+            await gate.admit("interactive")
+        holder.release()
+        (await queued).release()
+
+    asyncio.run(main())
+    assert gate.in_flight == 0
+
+
+def test_interactive_displaces_newest_queued_batch():
+    gate = controller(max_queue=2)
+
+    async def main():
+        holder = await gate.admit()
+        older = asyncio.ensure_future(gate.admit("batch"))
+        await asyncio.sleep(0)
+        newer = asyncio.ensure_future(gate.admit("batch"))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(gate.admit("interactive"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded, match="displaced"):
+            await newer
+        assert not older.done()
+
+        holder.release()
+        (await interactive).release()
+        (await older).release()
+
+    asyncio.run(main())
+    assert gate.in_flight == 0
+
+
+def test_batch_is_rejected_rather_than_displacing():
+    gate = controller(max_queue=1)
+
+    async def main():
+        holder = await gate.admit()
+        queued = asyncio.ensure_future(gate.admit("batch"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded, match="queue full"):
+            await gate.admit("batch")
+        holder.release()
+        (await queued).release()
+
+    asyncio.run(main())
+
+
+def test_ticket_release_is_idempotent():
+    gate = controller(max_concurrency=2)
+
+    async def main():
+        first = await gate.admit()
+        second = await gate.admit()
+        first.release()
+        first.release()
+        assert gate.in_flight == 1
+        second.release()
+
+    asyncio.run(main())
+    assert gate.in_flight == 0
+
+
+def test_overloaded_maps_to_429_with_retry_after():
+    gate = controller(max_concurrency=2, max_queue=0)
+    gate._hold_s = 3.0
+
+    async def main():
+        tickets = [await gate.admit(), await gate.admit()]
+        with pytest.raises(Overloaded) as raised:
+            await gate.admit()
+        for ticket in tickets:
+            ticket.release()
+        return raised.value
+
+    error = overloaded_error(asyncio.run(main()))
+    assert error.status_code == 429
+    # 3s per request, one request ahead of two slots
+    assert error.headers["Retry-After"] == "2"
+
+
+def test_queue_wait_counts_against_the_same_deadline():
+    gate = controller(interactive_wait=10)
+    ends = time.monotonic() + 5
+
+    async def main():
+        holder = await gate.admit()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.2, holder.release)
+        with deadline_at(ends):
+            ticket = await gate.admit("interactive")
+        with deadline_at(ends):
+            left = time_left()
+        ticket.release()
+        return left
+
+    assert asyncio.run(main()) < 4.9
+
+
+def test_priority_header_falls_back_to_default():
+    assert priority_for(" Batch ", "interactive") == "batch"
+    assert priority_for("urgent", "interactive") == "interactive"
+    assert priority_for(None, "batch") == "batch"
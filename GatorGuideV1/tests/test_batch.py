@@ -0,0 +1,44 @@
+import asyncio
+from contextlib import contextmanager
+
+from model.agent import advisoragent
+from model.schemas.advisorResponse import AdvisorResponse
+
+
+def _collect(inputs, **kwargs):
+    async def main():
+        return [item async for item in advisoragent.run_advisor_batch_async(inputs, **kwargs)]
+
+    return asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_batch_fans_out_duplicates_and_reports_item_errors(monkeypatch):
+    async def fake_agent(text):
+        if text == "bad":
+            raise ValueError("boom")
+        return AdvisorResponse(response=text, schools=[])
+
+    monkeypatch.setattr(advisoragent, "run_advisor_agent_async", fake_agent)
+    results = sorted(_collect(["MIT", "bad", " MIT "], concurrency=2), key=lambda item: item[0])
+    assert [(index, result and result.response, type(error).__name__) for index, result, error, _ in results] == [
+        (0, "MIT", "NoneType"), (1, None, "ValueError"), (2, "MIT", "NoneType"),
+    ]
+
+
+def test_failure_outside_the_agent_still_reports_every_item(monkeypatch):
+    class BrokenTracker:
+        def summary(self):
+            raise RuntimeError("usage summary failed")
+
+    @contextmanager
+    def broken_track_usage(budget=None):
+        yield BrokenTracker()
+
+    async def fake_agent(text):
+        return AdvisorResponse(response=text, schools=[])
+
+    monkeypatch.setattr(advisoragent, "run_advisor_agent_async", fake_agent)
+    monkeypatch.setattr(advisoragent, "track_usage", broken_track_usage)
+    results = _collect(["MIT", "UCLA", "Stanford"], concurrency=2)
+    assert sorted(index for index, _, _, _ in results) == [0, 1, 2]
+    assert all(isinstance(error, RuntimeError) for _, _, error, _ in results)
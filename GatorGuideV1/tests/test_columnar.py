@@ -0,0 +1,94 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from model.agent import columnar
+from model.agent.columnar import ColumnarEngine, build
+from model.agent.scorecard_store import ingest
+
+SAMPLE_CSV = os.path.join(os.path.dirname(__file__), "data", "scorecard_sample.csv")
+ADMISSION = "latest.admissions.admission_rate.overall"
+SAT = "latest.admissions.sat_scores.average.overall"
+TUITION = "latest.cost.tuition.in_state"
+
+
+@pytest.fixture
+def paths(tmp_path):
+    db_path, out_dir = str(tmp_path / "scorecard.db"), str(tmp_path / "columnar")
+    ingest(SAMPLE_CSV, db_path)
+    assert build(db_path, out_dir) == 8
+    return db_path, out_dir
+
+
+@pytest.fixture
+def engine(paths):
+    return ColumnarEngine(paths[1])
+
+
+@pytest.fixture
+def installed(paths, monkeypatch):
+    db_path, out_dir = paths
+    monkeypatch.setattr(columnar, "SCORECARD_DB_PATH", db_path)
+    monkeypatch.setattr(columnar, "COLUMNAR_DIR", out_dir)
+    monkeypatch.setattr(columnar, "_engine", None)
+    return db_path
+
+
+def ids_where(engine, mask):
+    return set(np.asarray(engine.ids)[mask].tolist())
+
+
+def test_mask_combines_state_and_ranges(engine):
+    assert ids_where(engine, engine.mask(state="wa")) == {236948, 236939, 235097, 237011, 236230, 236577}
+    assert ids_where(engine, engine.mask(state="WA", ranges={ADMISSION: "0.85..", TUITION: "..13000"})) == {
+        236939,
+        235097,
+        237011,
+    }
+
+
+def test_ranges_never_match_missing_values(engine):
+    # Seattle Pacific (no SAT or admission rate) and Eastern Washington (no SAT)
+    assert ids_where(engine, engine.mask(state="WA", ranges={SAT: ".."})) == {236948, 236939, 237011, 236230}
+    assert 236577 not in ids_where(engine, engine.mask(ranges={ADMISSION: "0..1"}))
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 20])
+def test_top_k_matches_a_full_sort(engine, k):
+    ranked = engine.top_k(sort_by=ADMISSION, k=k).tolist()
+    assert ranked == [243744, 110635, 236948, 236230, 236939, 237011, 235097, 236577][:k]
+
+
+def test_top_k_descending_puts_missing_last(engine):
+    assert engine.top_k(state="WA", sort_by=SAT, descending=True, k=6).tolist() == [
+        236948, 236230, 237011, 236939, 235097, 236577,
+    ]
+
+
+def test_search_orders_by_name_by_default(installed):
+    ids = columnar.search({"school.state": "WA", f"{TUITION}__range": "..13000", "per_page": 3})
+    # Eastern, University of Washington, Washington State (alphabetical)
+    assert ids == [235097, 236948, 236939]
+
+
+@pytest.mark.parametrize("params", [
+    {"school.state": "WA", "school.name": "seattle"},
+    {"school.state": "WA", "latest.student.size__range": "..1000"},
+    {"school.state": "WA", "sort": "school.city"},
+])
+def test_search_defers_to_sqlite_when_it_cannot_answer(installed, params):
+    assert columnar.search(params) is None
+
+
+def test_search_is_none_without_built_files(installed, monkeypatch, tmp_path):
+    monkeypatch.setattr(columnar, "COLUMNAR_DIR", str(tmp_path / "missing"))
+    assert columnar.search({"school.state": "WA"}) is None
+
+
+def test_reingested_store_makes_the_columns_stale(installed):
+    assert columnar.search({"school.state": "WA"}) is not None
+    time.sleep(0.01)
+    ingest(SAMPLE_CSV, installed)
+    assert columnar.search({"school.state": "WA"}) is None
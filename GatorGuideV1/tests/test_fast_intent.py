@@ -0,0 +1,96 @@
+import pytest
+
+from model.agent import fast_intent, name_index
+from model.agent.fast_intent import classify_intent, detect_schools, detect_state, log_llm_label
+from model.agent.name_index import NameIndex
+from model.schemas.studentIntent import StudentIntent
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(name_index, "_index", NameIndex([]))
+    monkeypatch.setattr(fast_intent, "_model", None)
+    monkeypatch.setattr(fast_intent, "_model_loaded", True)
+    monkeypatch.setattr(fast_intent, "_live_rule_stats", fast_intent.defaultdict(lambda: [0, 0]))
+
+
+@pytest.mark.parametrize("text, state", [
+    ("colleges in Texas under 30% acceptance", "TX"),
+    ("Top universities in Washington", "WA"),
+    ("Penn State vs Ohio State", None),
+    ("Is University of Michigan hard to get into?", None),
+    ("George Washington University tuition", None),
+    ("schools in OR", "OR"),
+])
+def test_detect_state(text, state):
+    assert detect_state(text) == state
+
+
+def test_ambiguous_one_word_aliases_are_not_detected():
+    assert detect_schools("Penn State vs Ohio State") == []
+    assert detect_schools("cal state schools in California") == []
+    assert detect_schools("UW vs UCLA") == ["University of California-Los Angeles"]
+
+
+@pytest.mark.parametrize("text", [
+    "Penn State vs Ohio State",
+    "cal state schools in California",
+    "Is it good to live in Washington for high school?",
+    "I sat the ACT in Texas",
+])
+def test_misparses_fall_back_to_the_llm(text):
+    for _ in range(100):
+        # Even a rule with a perfect record must not fire on these
+        log_llm_label("colleges in Texas", StudentIntent(intent="school_search", state="TX", confidence_score=0.9))
+    assert classify_intent(text) is None
+
+
+def test_confidence_is_the_rules_measured_precision():
+    label = StudentIntent(intent="school_search", state="TX", confidence_score=0.9)
+    assert classify_intent("show me colleges in Texas") is None
+
+    for _ in range(30):
+        log_llm_label("find colleges in Texas", label)
+    intent = classify_intent("show me colleges in Texas")
+    assert intent.intent == "school_search" and intent.state == "TX"
+    assert intent.confidence_score == pytest.approx(fast_intent.rule_precision("state_search"), abs=1e-3)
+    assert fast_intent.FAST_INTENT_THRESHOLD <= intent.confidence_score < 1
+
+    # The LLM keeps overruling the rule: it stops skipping the LLM
+    for _ in range(30):
+        log_llm_label("find colleges in Texas", StudentIntent(intent="general_advice", confidence_score=0.9))
+    assert classify_intent("show me colleges in Texas") is None
+
+
+def test_training_measures_rule_precision(tmp_path, monkeypatch):
+    log = tmp_path / "intent_log.jsonl"
+    agreeing = StudentIntent(intent="school_search", state="CA", confidence_score=0.9)
+    lines = [{"text": "best colleges in California", **agreeing.model_dump()}] * 40
+    log.write_text("".join(fast_intent.json.dumps(line) + "\n" for line in lines))
+    model_path = tmp_path / "intent_nb.json"
+    assert fast_intent.train(str(log), str(model_path)) == 40
+
+    model = fast_intent.NaiveBayesIntentModel.load(str(model_path))
+    assert model.rule_stats["state_search"] == [40, 40]
+    monkeypatch.setattr(fast_intent, "_model", model)
+    assert classify_intent("top colleges in California").state == "CA"
+
+
+class FixedModel:
+    rule_stats = {}
+
+    def __init__(self, label, probability):
+        self.label, self.probability = label, probability
+
+    def predict(self, text):
+        return self.label, self.probability
+
+
+def test_model_override_clears_slots_for_intents_without_searches(monkeypatch):
+    monkeypatch.setattr(fast_intent, "_model", FixedModel("general_advice", 0.97))
+    intent = classify_intent("show me colleges in Texas")
+    assert (intent.intent, intent.school_name, intent.state) == ("general_advice", None, None)
+
+    monkeypatch.setattr(fast_intent, "_model", FixedModel("requirements", 0.97))
+    intent = classify_intent("show me colleges in Texas")
+    assert (intent.intent, intent.state) == ("requirements", "TX")
@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.stubs import StubConfig, Stubs
+from model.agent import http_client
+
+
+@pytest.fixture
+def stubs():
+    with Stubs(StubConfig(scorecard_latency_ms=0, jitter=0)) as running:
+        yield running
+
+
+def test_unresolvable_host_raises_httpx_connect_error():
+    async def main():
+        try:
+            await http_client.get_client("http://gatorguide-test.invalid").get("http://gatorguide-test.invalid/")
+        finally:
+            await http_client.close_pools()
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(main())
+
+
+def test_get_json_reuses_one_connection_per_host(stubs):
+    url = stubs.env()["COLLEGE_SCORECARD_URL"]
+
+    async def main():
+        try:
+            for _ in range(3):
+                body = await http_client.get_json(url, {"school.state": "FL"}, upstream="scorecard")
+                assert "results" in body
+            return http_client.pool_stats()
+        finally:
+            await http_client.close_pools()
+
+    stats = asyncio.run(main())
+    origin = http_client._origin(url)
+    assert stats["pools"][origin]["requests"] == 3
+    assert stats["pools"][origin]["connections_opened"] == 1
+    assert stubs.calls()["scorecard"] == 3
@@ -0,0 +1,39 @@
+import pytest
+
+from model.agent import name_index
+from model.agent.name_index import NameIndex, canonical_school_name
+
+
+@pytest.fixture
+def builtin_index(monkeypatch):
+    # No local Scorecard store: only the COMMON_ALIASES names are known
+    monkeypatch.setattr(name_index, "_index", NameIndex([]))
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("UWash", "University of Washington-Seattle Campus"),
+    ("ucla", "University of California-Los Angeles"),
+    ("stanford university", "Stanford University"),
+])
+def test_exact_alias_or_name_is_replaced(builtin_index, query, expected):
+    assert canonical_school_name(query) == expected
+
+
+@pytest.mark.parametrize("query, state", [
+    ("George Washington University", "DC"),
+    ("California State University", "CA"),
+    ("University of California", None),
+    ("Some Tiny College", None),
+])
+def test_fuzzy_match_never_overrides_without_the_store(builtin_index, query, state):
+    assert canonical_school_name(query, state=state) == query
+
+
+def test_fuzzy_match_needs_store_backed_index_and_matching_state(monkeypatch):
+    monkeypatch.setattr(name_index, "_index", NameIndex([
+        ("Washington State University", "WA", None),
+        ("George Washington University", "DC", None),
+    ]))
+    assert canonical_school_name("washingtn state univ", state="WA") == "Washington State University"
+    assert canonical_school_name("washingtn state univ") == "washingtn state univ"
+    assert canonical_school_name("washingtn state univ", state="OR") == "washingtn state univ"
@@ -0,0 +1,32 @@
+from model.agent.prompts import parse_advisor_response, response_format
+from model.schemas.advisorResponse import AdvisorResponse
+
+
+def _objects(schema):
+    if isinstance(schema, dict):
+        if schema.get("type") == "object":
+            yield schema
+        for value in schema.values():
+            yield from _objects(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            yield from _objects(value)
+
+
+def test_response_format_is_strict_json_schema():
+    fmt = response_format(AdvisorResponse)
+    assert fmt["type"] == "json_schema"
+    assert fmt["json_schema"]["strict"] is True
+    objects = list(_objects(fmt["json_schema"]["schema"]))
+    assert len(objects) >= 3  # AdvisorResponse, School, Weather
+    for schema in objects:
+        assert schema["additionalProperties"] is False
+        assert schema["required"] == list(schema["properties"])
+    assert '"default": null' not in str(fmt).replace("'", '"').replace("None", "null")
+
+
+def test_parse_advisor_response():
+    assert parse_advisor_response('{"response": "Hi", "schools": []}').response == "Hi"
+    assert parse_advisor_response("") is None
+    assert parse_advisor_response('{"response": "cut off at the tok') is None
+    assert parse_advisor_response('{"schools": []}') is None
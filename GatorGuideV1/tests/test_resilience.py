@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from benchmarks.stubs import StubConfig, Stubs
+from model.agent import http_client, resilience
+from model.agent.resilience import CircuitOpenError, DeadlineExceeded, RESILIENCE_EVENTS, deadline
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "RETRY_BASE_S", 0.01)
+    monkeypatch.setattr(resilience, "RETRY_MAX_S", 0.05)
+    resilience.reset()
+    yield
+    resilience.reset()
+
+
+def _stubs(**config):
+    return Stubs(StubConfig(scorecard_latency_ms=0, weather_latency_ms=0, jitter=0, **config))
+
+
+def _fetch(stubs, upstream="scorecard", **kwargs):
+    async def main():
+        try:
+            return await http_client.get_json(
+                stubs.env()["COLLEGE_SCORECARD_URL"], {"school.state": "WA"}, upstream=upstream, **kwargs
+            )
+        finally:
+            await http_client.close_pools()
+
+    return asyncio.run(main())
+
+
+def test_retries_transient_failures_then_gives_up(monkeypatch):
+    monkeypatch.setattr(resilience, "RETRY_ATTEMPTS", 3)
+    with _stubs(fail_rate=1, fault_upstreams=["scorecard"]) as stubs:
+        with pytest.raises(httpx.HTTPStatusError):
+            _fetch(stubs)
+        assert stubs.calls()["scorecard_failed"] == 3
+
+
+def test_retry_recovers_from_intermittent_failures(monkeypatch):
+    monkeypatch.setattr(resilience, "RETRY_ATTEMPTS", 6)
+    before = RESILIENCE_EVENTS.value(upstream="scorecard", event="retry")
+    with _stubs(fail_rate=0.5, fault_upstreams=["scorecard"], seed=3) as stubs:
+        for _ in range(5):
+            assert "results" in _fetch(stubs)
+        assert stubs.calls().get("scorecard_failed", 0) > 0
+    assert RESILIENCE_EVENTS.value(upstream="scorecard", event="retry") > before
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(resilience, "RETRY_BASE_S", 0.2)
+    monkeypatch.setattr(resilience, "RETRY_MAX_S", 2)
+    first = [resilience.backoff_delay(1) for _ in range(200)]
+    late = [resilience.backoff_delay(10) for _ in range(200)]
+    assert all(0 <= d <= 0.2 for d in first) and len(set(first)) > 100
+    assert all(0 <= d <= 2 for d in late) and max(late) > 1
+
+    response = httpx.Response(429, headers={"retry-after": "1.5"}, request=httpx.Request("GET", "http://x"))
+    error = httpx.HTTPStatusError("busy", request=response.request, response=response)
+    assert resilience.backoff_delay(1, error) == 1.5
+
+
+def test_breaker_opens_fails_fast_then_half_opens_and_closes(monkeypatch):
+    monkeypatch.setattr(resilience, "RETRY_ATTEMPTS", 1)
+    monkeypatch.setattr(resilience, "BREAKER_FAILURES", 2)
+    monkeypatch.setattr(resilience, "BREAKER_COOLDOWN_S", 0.3)
+    with _stubs(fail_rate=1, fault_upstreams=["scorecard"]) as stubs:
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                _fetch(stubs)
+        assert resilience.stats()["scorecard"]["state"] == "open"
+
+        # Open: fails fast without reaching the upstream
+        with pytest.raises(CircuitOpenError):
+            _fetch(stubs)
+        assert stubs.calls()["scorecard"] == 2
+
+        # Half-open: one trial; a failure reopens the breaker
+        time.sleep(0.35)
+        with pytest.raises(httpx.HTTPStatusError):
+            _fetch(stubs)
+        assert resilience.stats()["scorecard"]["state"] == "open"
+        assert resilience.stats()["scorecard"]["times_opened"] == 2
+
+        # Half-open trial succeeds: closed again
+        time.sleep(0.35)
+        stubs.config.fail_rate = 0
+        assert "results" in _fetch(stubs)
+        assert resilience.stats()["scorecard"]["state"] == "closed"
+        assert stubs.calls()["scorecard"] == 4
+
+
+def test_hedge_beats_a_stalled_attempt(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_UPSTREAMS", {"stalls"})
+    monkeypatch.setattr(resilience, "HEDGE_MIN_SAMPLES", 5)
+    before = RESILIENCE_EVENTS.value(upstream="stalls", event="hedge_won")
+    attempts = []
+
+    async def first_attempt_stalls(timeout):
+        # The first attempt of each call stalls for 1.5s; its hedge answers at once
+        attempts.append(timeout)
+        if len(attempts) % 2:
+            await asyncio.sleep(1.5)
+        return {"results": []}
+
+    async def fast(timeout):
+        await asyncio.sleep(0.01)
+        return {"results": []}
+
+    async def main():
+        for _ in range(5):
+            await resilience.call("stalls", fast)
+        assert resilience.stats()["stalls"]["hedge_delay_s"] < 0.5
+        attempts.clear()
+        started = time.monotonic()
+        for _ in range(3):
+            assert "results" in await resilience.call("stalls", first_attempt_stalls)
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(main())
+    stalls = 3
+    assert len(attempts) == 2 * stalls
+    assert RESILIENCE_EVENTS.value(upstream="stalls", event="hedge_won") - before == stalls
+    # Each stalled call finished after its hedge delay, long before the 1.5s stall
+    assert elapsed < stalls * (resilience.stats()["stalls"]["hedge_delay_s"] + 0.2)
+
+
+def test_attempts_are_bounded_in_wall_clock_time():
+    async def trickle(timeout):
+        # Ignores its timeout, like a client whose per-read timeout keeps being reset
+        await asyncio.sleep(5)
+
+    async def main():
+        with deadline(0.3):
+            await resilience.call("slow", trickle, timeout=10)
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert time.monotonic() - started < 1
+
+
+def test_stream_consumption_is_bounded():
+    async def chunks():
+        yield "first"
+        await asyncio.sleep(5)
+        yield "never"
+
+    async def consume(timeout, deadline_s=None):
+        seen = []
+        with deadline(deadline_s):
+            async for chunk in resilience.bounded(chunks(), timeout):
+                seen.append(chunk)
+        return seen
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(consume(0.2))
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(consume(10, deadline_s=0.2))
+
+    async def short():
+        for chunk in ("a", "b"):
+            yield chunk
+
+    async def drain():
+        return [chunk async for chunk in resilience.bounded(short(), 1)]
+
+    assert asyncio.run(drain()) == ["a", "b"]
@@ -0,0 +1,19 @@
+import pytest
+
+from model.agent.runner import run_sync
+
+
+async def _answer():
+    return 42
+
+
+def test_run_sync_returns_result():
+    assert run_sync(_answer()) == 42
+
+
+def test_run_sync_from_background_loop_raises_instead_of_deadlocking():
+    async def nested():
+        return run_sync(_answer())
+
+    with pytest.raises(RuntimeError, match="background event loop"):
+        run_sync(nested())
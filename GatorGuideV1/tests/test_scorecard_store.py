@@ -0,0 +1,135 @@
+import asyncio
+import csv
+import os
+
+import pytest
+
+from model.agent import scorecard_store, tools
+from model.agent.scorecard_store import ScorecardStore, ingest, parse_range
+
+SAMPLE_CSV = os.path.join(os.path.dirname(__file__), "data", "scorecard_sample.csv")
+
+# Dotted API field -> bulk CSV column, written out independently of scorecard_store.FIELDS
+API_FIELDS = {
+    "id": "UNITID",
+    "school.name": "INSTNM",
+    "school.city": "CITY",
+    "school.state": "STABBR",
+    "location.lat": "LATITUDE",
+    "location.lon": "LONGITUDE",
+    "latest.admissions.admission_rate.overall": "ADM_RATE",
+    "latest.admissions.sat_scores.average.overall": "SAT_AVG",
+    "latest.cost.tuition.in_state": "TUITIONFEE_IN",
+    "latest.cost.tuition.out_of_state": "TUITIONFEE_OUT",
+    "latest.earnings.6_yrs_after_entry.median": "MD_EARN_WNE_P6",
+}
+TEXT_FIELDS = {"school.name", "school.city", "school.state"}
+REAL_FIELDS = {"location.lat", "location.lon", "latest.admissions.admission_rate.overall"}
+
+
+def api_rows(params):
+    """What api.data.gov answers for `params` over the sample: filtered, by name, limited."""
+    with open(SAMPLE_CSV, newline="") as f:
+        records = [r for r in csv.DictReader(f) if r["INSTNM"]]
+
+    def value(record, field):
+        raw = record[API_FIELDS[field]]
+        if raw in ("", "NULL", "PrivacySuppressed"):
+            return None
+        if field in TEXT_FIELDS:
+            return raw
+        return float(raw) if field in REAL_FIELDS else int(raw)
+
+    matches = []
+    for record in records:
+        if params.get("school.state") and record["STABBR"] != params["school.state"].upper():
+            continue
+        in_range = True
+        for name, bounds in params.items():
+            if name.endswith("__range"):
+                low, high = parse_range(bounds)
+                v = value(record, name[: -len("__range")])
+                in_range &= v is not None and (low is None or v >= low) and (high is None or v <= high)
+        if in_range:
+            matches.append(record)
+    if params.get("school.name"):
+        key = params["school.name"].casefold()
+        prefix = [r for r in matches if r["INSTNM"].casefold().startswith(key)]
+        matches = prefix or [r for r in matches if key in r["INSTNM"].casefold()]
+    matches.sort(key=lambda r: r["INSTNM"].casefold())
+    fields = [f.strip() for f in params["fields"].split(",")]
+    return [{f: value(r, f) for f in fields} for r in matches[: int(params.get("per_page") or 20)]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    db_path = str(tmp_path / "scorecard.db")
+    assert ingest(SAMPLE_CSV, db_path) == 8
+    return ScorecardStore(db_path)
+
+
+def test_ingest_skips_unnamed_rows_and_reads_missing_values_as_null(store):
+    row = store.fetch([237011], "school.name,latest.earnings.6_yrs_after_entry.median")[0]
+    assert row == {"school.name": "Western Washington University", "latest.earnings.6_yrs_after_entry.median": None}
+    assert store.fetch([999999]) == []
+
+
+def test_name_search_prefers_prefix_then_falls_back_to_contains(store):
+    prefix = store.search({"fields": "school.name", "school.name": "seattle"})
+    assert [r["school.name"] for r in prefix] == ["Seattle Pacific University", "Seattle University"]
+    contains = store.search({"fields": "school.name", "school.name": "washington university"})
+    assert [r["school.name"] for r in contains] == ["Eastern Washington University", "Western Washington University"]
+
+
+def test_range_filters_exclude_missing_values(store):
+    params = {
+        "fields": "school.name,latest.admissions.sat_scores.average.overall",
+        "school.state": "WA",
+        "latest.admissions.sat_scores.average.overall__range": "1200..",
+    }
+    assert store.search(params) == api_rows(params)
+    assert [r["school.name"] for r in store.search(params)] == [
+        "Seattle University",
+        "University of Washington-Seattle Campus",
+        "Western Washington University",
+    ]
+
+
+def test_fetch_keeps_the_order_of_ids(store):
+    rows = store.fetch([243744, 236948, 123, 110635], "id,school.name")
+    assert [r["id"] for r in rows] == [243744, 236948, 110635]
+
+
+def test_unknown_range_field_is_rejected(store):
+    with pytest.raises(scorecard_store.ScorecardStoreError):
+        store.search({"school.state": "WA", "latest.student.size__range": "..1000"})
+
+
+@pytest.mark.parametrize("args", [
+    {"state": "WA"},
+    {"state": "WA", "in_state_tuition_range": "..13000", "limit": 3},
+    {"state": "WA", "acceptance_rate_range": "0.8..", "sat_score_range": "1100..1300"},
+    {"state": "CA", "sat_score_range": "1000.."},
+    {"state": "OR"},
+])
+def test_local_backend_matches_the_api_path(store, monkeypatch, args):
+    async def fake_get_json(url, params, **kwargs):
+        return {"results": api_rows(params)}
+
+    monkeypatch.setattr(tools, "get_json", fake_get_json)
+    monkeypatch.setattr(tools, "columnar_search", lambda params: None)
+    monkeypatch.setattr(scorecard_store, "_store", store)
+    tools.scorecard_cache.clear()
+
+    monkeypatch.setattr(tools, "SCORECARD_BACKEND", "api")
+    from_api = asyncio.run(tools.state_search_colleges_async(**args))
+    monkeypatch.setattr(tools, "SCORECARD_BACKEND", "local")
+    from_store = asyncio.run(tools.state_search_colleges_async(**args))
+    assert from_store == from_api
+
+
+def test_ingest_cli_loads_the_csv(tmp_path, capsys):
+    db_path = str(tmp_path / "cli.db")
+    scorecard_store.main(["ingest", SAMPLE_CSV, "--db", db_path])
+    assert "Loaded 8 institutions" in capsys.readouterr().out
+    assert len(ScorecardStore(db_path).search({"school.state": "WA"})) == 6
@@ -0,0 +1,38 @@
+import pytest
+
+from model.agent import semantic_cache
+from model.agent.semantic_cache import SemanticCache, exact_terms
+from model.schemas.advisorResponse import AdvisorResponse
+from model.schemas.studentIntent import StudentIntent
+
+INTENT = StudentIntent(intent="school_search", state="CA", confidence_score=0.9)
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticCache("test", threshold=semantic_cache.SEMANTIC_CACHE_THRESHOLD, ttl_s=60,
+                          max_entries=16, max_bytes=1_000_000)
+    cache.set("top schools in California", INTENT, AdvisorResponse(response="cached", schools=[]))
+    return cache
+
+
+def test_paraphrase_hits(cache):
+    assert cache.get("best colleges in CA", INTENT).response == "cached"
+
+
+@pytest.mark.parametrize("query", [
+    "top schools not in California",
+    "top schools in California for international students",
+    "top schools in California with in-state tuition",
+    "top out-of-state schools in California",
+    "top cheap schools in California",
+    "top 10 schools in California",
+])
+def test_negations_qualifiers_and_numbers_must_match_exactly(cache, query):
+    assert cache.get(query, INTENT) is None
+
+
+def test_exact_terms():
+    assert exact_terms("Cheap out-of-state schools, not in Texas, under 30%") == (
+        ("30",), ("affordable", "not", "out-of-state"),
+    )
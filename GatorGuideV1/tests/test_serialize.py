@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from model.agent.serialize import round_value, serialize_tool_result, to_table
+from model.agent.usage import estimate_tokens, trim_tool_results
+
+
+def school(i, **extra):
+    return {
+        "name": f"School {i}",
+        "city": "Seattle",
+        "state": "WA",
+        "acceptance_rate": 0.43187,
+        "tuition_in_state": 12643,
+        "tuition_out_of_state": None,
+        "weather": {"temperature_celsius": 8.5321, "wind_speed_kmh": 12.04},
+        **extra,
+    }
+
+
+@pytest.mark.parametrize("value, rounded", [
+    (0.43187, 0.432),
+    (8.5321, 8.5),
+    (12345.6, 12346),
+    (-0.00049, -0.0),
+    (True, True),
+    (7, 7),
+    ("0.43187", "0.43187"),
+])
+def test_round_value(value, rounded):
+    assert round_value(value) == rounded
+
+
+def test_table_flattens_nested_fields_and_drops_empty_columns():
+    table = to_table([school(1), school(2, tuition_in_state=None)])
+    assert table["columns"] == [
+        "name", "city", "state", "acceptance_rate", "tuition_in_state",
+        "weather.temperature_celsius", "weather.wind_speed_kmh",
+    ]
+    assert table["rows"][0] == ["School 1", "Seattle", "WA", 0.432, 12643, 8.5, 12.0]
+    assert table["rows"][1][4] is None
+
+
+def test_search_results_keep_only_school_fields():
+    payload = json.loads(serialize_tool_result([school(1, **{"location.lat": 47.655, "id": 236948})], "search_colleges"))
+    assert "location.lat" not in payload["columns"] and "id" not in payload["columns"]
+    assert "weather.temperature_celsius" in payload["columns"]
+
+
+def test_rows_beyond_the_cap_are_counted_as_omitted():
+    payload = json.loads(serialize_tool_result([school(i) for i in range(25)], "search_colleges", max_rows=10))
+    assert len(payload["rows"]) == 10
+    assert (payload["total"], payload["omitted"]) == (25, 15)
+    assert payload["rows"][-1][0] == "School 9"
+
+
+def test_token_cap_cuts_rows_from_the_tail_but_keeps_one():
+    schools = [school(i) for i in range(10)]
+    text = serialize_tool_result(schools, "search_colleges", max_rows=10, max_tokens=80)
+    payload = json.loads(text)
+    assert estimate_tokens(text) <= 80
+    assert 1 <= len(payload["rows"]) < 10
+    assert payload["omitted"] == 10 - len(payload["rows"])
+    assert payload["rows"][0][0] == "School 0"
+
+    single = json.loads(serialize_tool_result(schools, "search_colleges", max_tokens=1))
+    assert len(single["rows"]) == 1
+
+
+def test_dicts_errors_and_scalars():
+    weather = {"temperature_2m": 8.5321, "wind_speed_10m": 3.0, "time": "2026-10-18T05:00"}
+    assert json.loads(serialize_tool_result(weather, "get_weather")) == {"temperature_2m": 8.5, "wind_speed_10m": 3.0}
+    assert serialize_tool_result({"error": ValueError("bad state")}) == '{"error":"bad state"}'
+    assert serialize_tool_result(0.43187) == "0.432"
+
+
+def test_trim_tool_results_fits_the_serialized_messages():
+    results = [[school(i) for i in range(20)], [school(i) for i in range(3)], {"error": "timeout"}]
+    names = ["state_search_colleges", "search_colleges", "get_weather"]
+
+    def render(i, result):
+        return serialize_tool_result(result, names[i])
+
+    full = sum(estimate_tokens(render(i, r)) for i, r in enumerate(results))
+    trimmed, dropped = trim_tool_results(results, full // 2, render)
+    assert sum(estimate_tokens(render(i, r)) for i, r in enumerate(trimmed)) <= full // 2
+    assert dropped == (20 - len(trimmed[0])) + (3 - len(trimmed[1]))
+    # The longest list is cut from its tail first; other results keep their ranked prefix
+    assert trimmed[0] == results[0][: len(trimmed[0])]
+    assert trimmed[1] == results[1][: len(trimmed[1])]
+    assert trimmed[2] == {"error": "timeout"}
@@ -0,0 +1,103 @@
+import asyncio
+from typing import Optional
+
+import pytest
+
+from model.agent import dispatcher
+from model.agent.dispatcher import SharedToolCalls, execute_tool_async, shared_tool_calls
+from model.agent.tools import range_contains
+
+ROWS = [
+    {"school.name": "A", "latest.cost.tuition.in_state": 9000, "latest.admissions.admission_rate.overall": 0.8},
+    {"school.name": "B", "latest.cost.tuition.in_state": 12000, "latest.admissions.admission_rate.overall": 0.5},
+    {"school.name": "C", "latest.cost.tuition.in_state": 40000, "latest.admissions.admission_rate.overall": 0.1},
+]
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    calls = []
+
+    async def fake_state_search(
+        state: str,
+        school_name: Optional[str] = None,
+        acceptance_rate_range: Optional[str] = None,
+        in_state_tuition_range: Optional[str] = None,
+        sat_score_range: Optional[str] = None,
+        limit: int = 5,
+    ) -> list:
+        calls.append((state, in_state_tuition_range, acceptance_rate_range))
+        return [dict(row) for row in ROWS[:limit]]
+
+    monkeypatch.setitem(dispatcher.ASYNC_TOOL_REGISTRY, "state_search_colleges", fake_state_search)
+    return calls
+
+
+def _run(shared, *calls):
+    async def main():
+        results = []
+        with shared_tool_calls(shared):
+            for args in calls:
+                results.append(await execute_tool_async("state_search_colleges", args))
+        return results
+
+    return asyncio.run(main())
+
+
+def test_narrower_follow_up_filters_stored_rows(searches):
+    shared = SharedToolCalls(ttl_s=600)
+    first, cheaper, selective = _run(
+        shared,
+        {"state": "WA"},
+        {"state": "wa", "in_state_tuition_range": "..15000"},
+        {"state": "WA", "acceptance_rate_range": "0..0.6", "limit": 1},
+    )
+    assert len(searches) == 1
+    assert [row["school.name"] for row in cheaper] == ["A", "B"]
+    assert [row["school.name"] for row in selective] == ["B"]
+    assert shared.filtered == 2
+
+
+def test_truncated_stored_search_refetches(searches):
+    shared = SharedToolCalls(ttl_s=600)
+    # The stored search hit its limit, so cheaper schools beyond it may exist
+    _, cheaper = _run(
+        shared,
+        {"state": "WA", "limit": 1},
+        {"state": "WA", "in_state_tuition_range": "..15000", "limit": 1},
+    )
+    assert len(searches) == 2
+    assert shared.filtered == 0
+    assert [row["school.name"] for row in cheaper] == ["A"]
+
+
+def test_different_state_or_wider_range_refetches(searches):
+    shared = SharedToolCalls(ttl_s=600)
+    _run(
+        shared,
+        {"state": "WA", "in_state_tuition_range": "..15000"},
+        {"state": "WA"},
+        {"state": "OR", "in_state_tuition_range": "..15000"},
+    )
+    assert len(searches) == 3
+
+
+def test_stored_results_expire(searches, monkeypatch):
+    shared = SharedToolCalls(ttl_s=600)
+    _run(shared, {"state": "WA"})
+    now = dispatcher.time.monotonic()
+    monkeypatch.setattr(dispatcher.time, "monotonic", lambda: now + 601)
+    _run(shared, {"state": "WA"}, {"state": "WA", "in_state_tuition_range": "..15000"})
+    assert len(searches) == 2
+
+
+@pytest.mark.parametrize("outer, inner, contained", [
+    (None, "..15000", True),
+    ("..20000", "..15000", True),
+    ("..15000", "..20000", False),
+    ("..15000", None, False),
+    ("0.1..0.5", "0.2..0.3", True),
+    ("0.1..0.5", "0..0.3", False),
+])
+def test_range_contains(outer, inner, contained):
+    assert range_contains(outer, inner) is contained
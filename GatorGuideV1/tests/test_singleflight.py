@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from model.agent.resilience import DeadlineExceeded, deadline, time_left
+from model.agent.singleflight import SingleFlight
+from model.agent.usage import track_usage, _current as current_tracker
+
+
+def test_concurrent_calls_with_one_key_run_once():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"rows": [1, 2]}
+
+    async def main():
+        return await asyncio.gather(*(flights.do("wa", fetch, label="search") for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    stats = flights.stats()
+    assert (stats["calls"], stats["coalesced"], stats["in_flight"]) == (1, 9, 0)
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        raise ValueError("upstream said no")
+
+    async def main():
+        first = await asyncio.gather(*(flights.do("k", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(error, ValueError) for error in first)
+        with pytest.raises(ValueError):
+            await flights.do("k", fail)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_flight_runs_in_a_clean_context():
+    flights = SingleFlight("test")
+    seen = {}
+
+    async def fetch():
+        seen["deadline"] = time_left()
+        seen["tracker"] = current_tracker.get()
+        return "ok"
+
+    async def main():
+        with deadline(0.5), track_usage(1000):
+            return await flights.do("k", fetch)
+
+    assert asyncio.run(main()) == "ok"
+    assert seen == {"deadline": None, "tracker": None}
+
+
+def test_each_waiter_applies_its_own_deadline():
+    flights = SingleFlight("test")
+
+    async def slow():
+        await asyncio.sleep(0.3)
+        return "done"
+
+    async def waiter(seconds):
+        with deadline(seconds):
+            return await flights.do("k", slow)
+
+    async def main():
+        # The impatient caller starts the flight; the patient one still gets the result
+        return await asyncio.gather(waiter(0.05), waiter(2), return_exceptions=True)
+
+    short, patient = asyncio.run(main())
+    assert isinstance(short, DeadlineExceeded)
+    assert patient == "done"
+
+
+def test_flight_has_its_own_timeout():
+    flights = SingleFlight("test", timeout_s=0.05)
+
+    async def hang():
+        await asyncio.sleep(5)
+
+    async def main():
+        with deadline(5):
+            await flights.do("k", hang)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(asyncio.wait_for(main(), 2))
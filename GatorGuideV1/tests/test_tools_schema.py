@@ -0,0 +1,30 @@
+from model.agent import tools_schema
+from model.agent.tools_schema import OFFERED_TOOLS, TOOLS_BY_NAME, tool_params, tools_for_intent
+from model.schemas.studentIntent import StudentIntent
+
+
+def _names(schemas):
+    return [tool["function"]["name"] for tool in schemas]
+
+
+def test_get_weather_is_never_sent():
+    assert tools_schema.TOOL_PRUNING == "allowed"
+    assert _names(OFFERED_TOOLS) == ["search_colleges", "state_search_colleges"]
+    assert _names(tool_params(tools_schema.tools)["tools"]) == _names(OFFERED_TOOLS)
+
+
+def test_allowed_pruning_keeps_one_prefix_and_restricts_calls():
+    named = tools_for_intent(StudentIntent(intent="school_search", school_name="MIT", confidence_score=0.9))
+    params = tool_params(named)
+    assert params["tools"] is OFFERED_TOOLS
+    assert params["tool_choice"]["allowed_tools"]["tools"] == [
+        {"type": "function", "function": {"name": "search_colleges"}}
+    ]
+    assert tool_params(named, final=True) == {"tools": OFFERED_TOOLS, "tool_choice": "none"}
+    assert tool_params(OFFERED_TOOLS) == {"tools": OFFERED_TOOLS}
+
+
+def test_general_advice_needs_no_tools():
+    assert tools_for_intent(StudentIntent(intent="general_advice", confidence_score=0.9)) == []
+    assert tool_params([])["tool_choice"] == "none"
+    assert TOOLS_BY_NAME["get_weather"] not in OFFERED_TOOLS
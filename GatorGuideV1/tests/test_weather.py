@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from model.agent import http_client, resilience, tools
+
+CELLS = [(47.7, -122.3), (34.1, -118.4), (40.7, -74.0)]
+
+
+@pytest.fixture(autouse=True)
+def fast_weather(monkeypatch):
+    monkeypatch.setattr(tools, "WEATHER_TIMEOUT_S", 0.4)
+    monkeypatch.setattr(resilience, "RETRY_BASE_S", 0.01)
+    monkeypatch.setattr(resilience, "RETRY_MAX_S", 0.02)
+    resilience.reset()
+    yield
+    resilience.reset()
+
+
+def fake_open_meteo(monkeypatch, batch_stalls, single_stalls):
+    requests = []
+
+    async def get_once(url, params, timeout):
+        batched = "," in str(params["latitude"])
+        requests.append("batch" if batched else "single")
+        if batch_stalls if batched else single_stalls:
+            await asyncio.sleep(10)
+        return {"current": {"temperature_2m": 8.5, "wind_speed_10m": 3.0}}
+
+    monkeypatch.setattr(http_client, "_get_once", get_once)
+    return requests
+
+
+def fetch(cells):
+    async def main():
+        started = time.monotonic()
+        weather = await tools._fetch_weather_cells(cells)
+        return weather, time.monotonic() - started
+
+    return asyncio.run(main())
+
+
+def test_stalled_batch_falls_back_within_one_timeout(monkeypatch):
+    requests = fake_open_meteo(monkeypatch, batch_stalls=True, single_stalls=False)
+    weather, elapsed = fetch(CELLS)
+    assert all(current == {"temperature_2m": 8.5, "wind_speed_10m": 3.0} for current in weather.values())
+    assert requests.count("batch") >= 1 and requests.count("single") == len(CELLS)
+    assert elapsed < tools.WEATHER_TIMEOUT_S + 0.1
+
+
+def test_lookup_ends_at_the_timeout_when_everything_stalls(monkeypatch):
+    fake_open_meteo(monkeypatch, batch_stalls=True, single_stalls=True)
+    weather, elapsed = fetch(CELLS)
+    assert weather == {cell: None for cell in CELLS}
+    assert elapsed < tools.WEATHER_TIMEOUT_S + 0.1
+
+
+def test_request_deadline_still_applies(monkeypatch):
+    fake_open_meteo(monkeypatch, batch_stalls=True, single_stalls=True)
+
+    async def main():
+        started = time.monotonic()
+        with resilience.deadline(0.1):
+            weather = await tools._fetch_weather_cells(CELLS)
+        return weather, time.monotonic() - started
+
+    weather, elapsed = asyncio.run(main())
+    assert weather == {cell: None for cell in CELLS}
+    assert elapsed < 0.2